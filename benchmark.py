@@ -0,0 +1,236 @@
+#!/usr/bin/python
+
+### benchmark.py
+### 2026_10_18
+
+### This script times fileize_by_column.py, folderize_by_column.py, and
+###  bash_sort end to end on synthetic eQTL and GWAS tables (see
+###  benchmark_functions.py), and writes the results as JSON, so runs on
+###  different commits can be compared.
+###
+###  For each run it reports the wall clock time, rows/s and MB/s (of the
+###  input file on disk), the peak RSS of its process (or largest child
+###  process), and how many files it created.
+###
+###  Arguments:
+###    work_directory/: where the synthetic tables, split output, and temporary
+###      files are written (it needs room for a few copies of the eQTL table)
+###
+###  Options:
+###    --genes #: genes in the eQTL table (default 1000)
+###    --snps_per_gene #: mean rows per gene (default 1000)
+###    --skew #: spread of the rows per gene, 0 = all the same (default 1)
+###    --chr #: chromosomes used, 1 to 22 (default 22)
+###    --order grouped|interleaved: whether each gene's rows are together in the
+###      eQTL table (default interleaved)
+###    --gwas_snps #: rows in the GWAS table (default 1000000, 0 = no GWAS table)
+###    --compress none|gzip|bgzip: compression of both tables (default none)
+###    --scripts fileize_by_column.py,folderize_by_column.py: splitters to time (default both)
+###    --modes sort,hash,parallel: splitter modes to time (default: those three)
+###    --format csv|bgzip|npz: splitter output format (default csv)
+###    --sort on|off: also time bash_sort on each table (default on)
+###    --n_procs #: --n_procs given to the splitters and bash_sort (default: all cores)
+###    --memory_mb #: --memory_mb given to the splitters and bash_sort (default 1024)
+###    --repeats #: times each run is repeated; the median is reported (default 1)
+###    --seed #: random seed of the tables (default 0)
+###    --reuse_data on: use the tables already in work_directory/ if they're there (default off)
+###    --keep_data on: leave the tables in work_directory/ afterwards (default off)
+###    --out results.json: where to write the results (default: work_directory/benchmark.json)
+###    --compare old_results.json: also print how much faster (or slower) each run was
+###
+###  Usage:
+###    python benchmark.py /scratch/bench/ --genes 20000 --snps_per_gene 2000 --compress gzip
+
+import sys
+import os
+import time
+import shutil
+import multiprocessing
+from helper_functions import get_command_args, open_input
+from benchmark_functions import write_synthetic_eqtls, write_synthetic_gwas, run_timed, count_files
+from benchmark_functions import write_results, compare_results, COMPRESSIONS, EQTL_ORDERS
+
+print "Initiating benchmark.py"
+print "Argument List:", str(sys.argv[1:])
+
+if (len(sys.argv) < 2):
+	raise Exception("Expected at least one command argument.")
+work_DIR = str(sys.argv[1])
+options = get_command_args(sys.argv[2:])
+N_genes = int(options.get("genes", 1000))
+Snps_per_gene = int(options.get("snps_per_gene", 1000))
+Skew = float(options.get("skew", 1))
+N_chr = int(options.get("chr", 22))
+Order = options.get("order", "interleaved")
+Gwas_snps = int(options.get("gwas_snps", 1000000))
+Compress = options.get("compress", "none")
+Scripts = options.get("scripts", "fileize_by_column.py,folderize_by_column.py").split(",")
+Modes = options.get("modes", "sort,hash,parallel").split(",")
+Format = options.get("format", "csv")
+Sort = options.get("sort", "on")
+N_procs = int(options.get("n_procs", multiprocessing.cpu_count()))
+Memory_mb = int(options.get("memory_mb", 1024))
+Repeats = int(options.get("repeats", 1))
+Seed = int(options.get("seed", 0))
+Reuse_data = options.get("reuse_data", "off")
+Keep_data = options.get("keep_data", "off")
+out_FILE = options.get("out", work_DIR+"benchmark.json")
+Compare = options.get("compare", "")
+
+if not (os.path.isdir(work_DIR)):
+	raise ValueError(work_DIR+" not found. Is it a valid directory?")
+if work_DIR[-1] != "/":
+	raise ValueError("The work directory needs to end with a forward slash.")
+if N_genes < 1 or Snps_per_gene < 1:
+	raise ValueError("--genes and --snps_per_gene need to be integers > 0.")
+if Skew < 0:
+	raise ValueError("--skew needs to be >= 0.")
+if Order not in EQTL_ORDERS:
+	raise ValueError("Expected --order to be one of "+str(EQTL_ORDERS)+", instead got: "+Order)
+if Gwas_snps < 0:
+	raise ValueError("--gwas_snps needs to be an integer >= 0.")
+if Compress not in COMPRESSIONS:
+	raise ValueError("Expected --compress to be one of "+str(COMPRESSIONS)+", instead got: "+Compress)
+for script in Scripts:
+	if script != "fileize_by_column.py" and script != "folderize_by_column.py":
+		raise ValueError("Expected --scripts to list fileize_by_column.py and/or folderize_by_column.py, instead got: "+script)
+for mode in Modes:
+	if mode not in ["sort", "presorted", "memory", "hash", "parallel", "auto"]:
+		raise ValueError("Expected --modes to list splitter modes, instead got: "+mode)
+if Sort != "on" and Sort != "off":
+	raise ValueError("Expected --sort to be on or off, instead got: "+Sort)
+if N_procs < 1 or Memory_mb < 1 or Repeats < 1:
+	raise ValueError("--n_procs, --memory_mb, and --repeats need to be integers > 0.")
+if Reuse_data != "on" and Reuse_data != "off":
+	raise ValueError("Expected --reuse_data to be on or off, instead got: "+Reuse_data)
+if Keep_data != "on" and Keep_data != "off":
+	raise ValueError("Expected --keep_data to be on or off, instead got: "+Keep_data)
+if len(Compare) > 0 and not os.path.isfile(Compare):
+	raise ValueError(Compare+" not found. Is it a *full* and valid file path?")
+
+print "Passed script checks."
+
+script_DIR = os.path.dirname(os.path.abspath(__file__))+"/"
+extension = ".txt" if Compress == "none" else ".txt.gz"
+eqtl_FILE = work_DIR+"synthetic_eqtls"+extension
+gwas_FILE = work_DIR+"synthetic_gwas"+extension
+settings = {"genes": N_genes, "snps_per_gene": Snps_per_gene, "skew": Skew, "chr": N_chr, "order": Order,
+	"gwas_snps": Gwas_snps, "compress": Compress, "format": Format, "n_procs": N_procs,
+	"memory_mb": Memory_mb, "repeats": Repeats, "seed": Seed}
+
+def count_rows(File):
+	""" Return the rows of a (possibly compressed) table after its header.
+	"""
+	f_IN = open_input(File)
+	try:
+		return sum(1 for line in f_IN) - 1
+	finally:
+		f_IN.close()
+
+# Dictionary of name, file, rows, bytes, and seconds to generate, for each table
+data = list()
+start_time = time.time()
+if Reuse_data == "on" and os.path.isfile(eqtl_FILE):
+	print "Using "+eqtl_FILE
+	n_rows = count_rows(eqtl_FILE)
+else:
+	print "Writing "+eqtl_FILE
+	n_rows = write_synthetic_eqtls(Out_file = eqtl_FILE,
+				N_genes = N_genes,
+				Snps_per_gene = Snps_per_gene,
+				Skew = Skew,
+				N_chr = N_chr,
+				Compress = Compress,
+				Order = Order,
+				Seed = Seed)[0]
+data.append({"name": "eqtls", "file": eqtl_FILE, "rows": n_rows,
+	"bytes": os.path.getsize(eqtl_FILE), "seconds": time.time() - start_time})
+if Gwas_snps > 0:
+	start_time = time.time()
+	if Reuse_data == "on" and os.path.isfile(gwas_FILE):
+		print "Using "+gwas_FILE
+		n_rows = count_rows(gwas_FILE)
+	else:
+		print "Writing "+gwas_FILE
+		n_rows = write_synthetic_gwas(Out_file = gwas_FILE,
+					N_snps = Gwas_snps,
+					N_chr = N_chr,
+					Compress = Compress,
+					Seed = Seed)
+	data.append({"name": "gwas", "file": gwas_FILE, "rows": n_rows,
+		"bytes": os.path.getsize(gwas_FILE), "seconds": time.time() - start_time})
+for table in data:
+	print table["name"]+": "+str(table["rows"])+" rows, "+"%.1f" % (table["bytes"]/1048576.0)+" MB"
+
+# [name, command, table, output directory] for each run
+runs = list()
+out_DIR = work_DIR+"benchmark_out/"
+for script in Scripts:
+	for mode in Modes:
+		runs.append([script+" --mode "+mode,
+			[sys.executable, script_DIR+script, eqtl_FILE, "0", out_DIR, "keep_0_1_2_3_8_9",
+				"--mode", mode, "--format", Format, "--cache", "off", "--n_procs", str(N_procs),
+				"--memory_mb", str(Memory_mb), "--temp_dir", work_DIR],
+			data[0], out_DIR])
+if Sort == "on":
+	# Sort the eQTL table by gene, and the GWAS table by rsid
+	for table, col in [[table, 1 if table["name"] == "eqtls" else 4] for table in data]:
+		runs.append(["bash_sort "+table["name"],
+			[sys.executable, "-c", "from helper_functions import bash_sort; bash_sort(File = '"
+				+os.path.basename(table["file"])+"', In_dir = '"+work_DIR+"', Out_dir = '"+out_DIR
+				+"', Col = "+str(col)+", Memory_mb = "+str(Memory_mb)+", Temp_dir = '"+work_DIR
+				+"', N_procs = "+str(N_procs)+")"],
+			table, out_DIR])
+
+results = list()
+for name, command, table, run_dir in runs:
+	timings = list()
+	for repeat_i in range(Repeats):
+		if os.path.isdir(run_dir):
+			shutil.rmtree(run_dir)
+		os.mkdir(run_dir)
+		timing = run_timed(command, Cwd = script_DIR)
+		timing["files_created"] = count_files(run_dir)
+		timings.append(timing)
+		# Sort mode leaves the sorted table next to the input
+		sorted_file = work_DIR+"synthetic_eqtls_sorted.txt"
+		if os.path.isfile(sorted_file):
+			os.remove(sorted_file)
+		if timing["exit_code"] != 0:
+			print timing["output"]
+			break
+	timings.sort(key=lambda timing: timing["seconds"])
+	timing = timings[len(timings)/2]
+	result = {"name": name,
+		"command": " ".join(command),
+		"seconds": timing["seconds"],
+		"all_seconds": [run_timing["seconds"] for run_timing in timings],
+		"user_seconds": timing["user_seconds"],
+		"system_seconds": timing["system_seconds"],
+		"rows_per_second": table["rows"]/timing["seconds"],
+		"mb_per_second": table["bytes"]/1048576.0/timing["seconds"],
+		"peak_rss_mb": max([run_timing["peak_rss_mb"] for run_timing in timings]),
+		"files_created": timing["files_created"],
+		"exit_code": max([run_timing["exit_code"] for run_timing in timings], key=abs)}
+	results.append(result)
+	print name+": "+"%.2f" % result["seconds"]+"s, " \
+		+"%.0f" % result["rows_per_second"]+" rows/s, " \
+		+"%.1f" % result["mb_per_second"]+" MB/s, peak RSS "+"%.0f" % result["peak_rss_mb"]+" MB, " \
+		+str(result["files_created"])+" file(s)"+("" if result["exit_code"] == 0 else
+			", FAILED with exit code "+str(result["exit_code"]))
+if os.path.isdir(out_DIR):
+	shutil.rmtree(out_DIR)
+if Keep_data == "off":
+	for table in data:
+		os.remove(table["file"])
+
+write_results(Out_file = out_FILE,
+			Settings = settings,
+			Data = data,
+			Results = results,
+			Script_dir = script_DIR)
+print "Wrote results to "+out_FILE
+if len(Compare) > 0:
+	for line in compare_results(Compare, results):
+		print line
+print "Completed benchmark.py"
@@ -0,0 +1,307 @@
+#/usr/bin/python
+
+# benchmark_functions.py
+# 2026_10_18
+
+### Functions for benchmarking the splitters and the sort (see benchmark.py):
+###  synthetic eQTL and GWAS tables, and timing a command in its own process.
+###
+###  Synthetic eQTL table (one row per gene-SNP pair, SNPs within 1 Mb of
+###  the gene's TSS; columns 0,1,2,3,8,9 are what coloc needs, as in
+###  Liver_genomewide_significant_eqtl.txt):
+###    gene	rsid	chr	pos	ref	alt	maf	n	beta	se	pval
+###  Synthetic GWAS table (sorted by chromosome and position, with a few
+###  association peaks):
+###    chr	pos	chr_pos	rsid	ref	alt	maf	n	beta	se	pval
+###
+###  Tables are written as they're generated, so they can be far bigger
+###  than memory.
+
+import os
+import sys
+import json
+import gzip
+import math
+import time
+import random
+import socket
+import tempfile
+from subprocess import Popen, PIPE, STDOUT
+from helper_functions import BgzfWriter
+
+# Chromosome lengths (GRCh37), in bp
+CHROMOSOME_LENGTHS = [249250621, 243199373, 198022430, 191154276, 180915260, 171115067,
+	159138663, 146364022, 141213431, 135534747, 135006516, 133851895, 115169878, 107349540,
+	102531392, 90354753, 81195210, 78077248, 59128983, 63025520, 48129895, 51304566]
+EQTL_COLUMNS = ["gene", "rsid", "chr", "pos", "ref", "alt", "maf", "n", "beta", "se", "pval"]
+GWAS_COLUMNS = ["chr", "pos", "chr_pos", "rsid", "ref", "alt", "maf", "n", "beta", "se", "pval"]
+# Compression of the tables written
+COMPRESSIONS = ["none", "gzip", "bgzip"]
+# Row order of the synthetic eQTL table
+EQTL_ORDERS = ["grouped", "interleaved"]
+# Half width of the cis window around each gene's TSS
+CIS_WINDOW = 1000000
+# Lines held before each write
+WRITE_LINES = 10000
+BASES = "ACGT"
+
+
+def open_output(Out_file, Compress="none"):
+	""" Open Out_file for writing, plain, gzip, or bgzip compressed (see COMPRESSIONS).
+	"""
+	if Compress == "none":
+		return open(Out_file, 'wb')
+	if Compress == "gzip":
+		return gzip.open(Out_file, 'wb')
+	if Compress == "bgzip":
+		return BgzfWriter(Out_file, 'wb')
+	raise ValueError("Expected Compress to be one of "+str(COMPRESSIONS)+", instead got: "+str(Compress))
+
+def group_sizes(N_groups, Mean_size, Skew, Rng):
+	""" Return N_groups group sizes (integers > 0) averaging about Mean_size.
+
+		Sizes are lognormal with sigma Skew (0 = every group the same size),
+		so a few groups are many times bigger than the rest.
+	"""
+	if Skew == 0:
+		return [Mean_size]*N_groups
+	# Lognormal mean is exp(mu + sigma^2/2)
+	mu = math.log(Mean_size) - Skew*Skew/2
+	return [max(1, int(round(Rng.lognormvariate(mu, Skew)))) for group_i in range(N_groups)]
+
+def _association_fields(Rng, Causal_z=0.0):
+	""" Return [maf, beta, se, pval] strings for one SNP, with a z score of about Causal_z plus noise.
+	"""
+	maf = Rng.uniform(0.01, 0.5)
+	se = Rng.uniform(0.02, 0.2)
+	z = Causal_z + Rng.gauss(0, 1)
+	beta = z*se
+	pval = math.erfc(abs(z)/math.sqrt(2))
+	return ["%.4f" % maf, "%.5f" % beta, "%.5f" % se, "%.4g" % max(pval, 1e-300)]
+
+def write_synthetic_eqtls(Out_file, N_genes=1000, Snps_per_gene=1000, Skew=1.0, N_chr=22,
+	Compress="none", Order="grouped", Seed=0):
+	""" Write a synthetic eQTL table (see EQTL_COLUMNS).
+
+		Genes are spread over the chromosomes in proportion to their length.
+		Each gene's SNPs are within CIS_WINDOW of its TSS, sorted by position.
+
+		Arguments:
+			Out_file:		"/my_directory/eqtls.txt[.gz]"
+			N_genes:		integer > 0
+			Snps_per_gene:	integer > 0. Mean rows per gene.
+			Skew:			number >= 0. Spread of the rows per gene (see group_sizes).
+			N_chr:			integer, 1 to 22. Chromosomes used.
+			Compress:		one of COMPRESSIONS
+			Order:			"grouped": each gene's rows together, genes in a random order.
+							"interleaved": rows of up to 64 genes at a time mixed together,
+								so the file isn't grouped by gene.
+			Seed:			random seed
+
+		Returns: [rows written, list of [gene, chr, TSS]]
+	"""
+	if type(N_genes) is not int or N_genes < 1 or type(Snps_per_gene) is not int or Snps_per_gene < 1:
+		raise ValueError("N_genes and Snps_per_gene need to be integers > 0.")
+	if Skew < 0:
+		raise ValueError("Skew needs to be >= 0.")
+	if type(N_chr) is not int or N_chr < 1 or N_chr > len(CHROMOSOME_LENGTHS):
+		raise ValueError("N_chr needs to be an integer from 1 to "+str(len(CHROMOSOME_LENGTHS))+".")
+	if Order not in EQTL_ORDERS:
+		raise ValueError("Expected Order to be one of "+str(EQTL_ORDERS)+", instead got: "+str(Order))
+	rng = random.Random(Seed)
+	sizes = group_sizes(N_genes, Snps_per_gene, Skew, rng)
+	lengths = CHROMOSOME_LENGTHS[:N_chr]
+	genes = list()
+	for gene_i in range(N_genes):
+		at = rng.uniform(0, sum(lengths))
+		chr_i = 0
+		while at > lengths[chr_i]:
+			at = at - lengths[chr_i]
+			chr_i = chr_i + 1
+		genes.append(["ENSG%011d" % gene_i, str(chr_i+1), int(at)])
+	rng.shuffle(genes)
+
+	def gene_rows(Gene, N_rows):
+		""" Yield one gene's rows, in position order.
+		"""
+		gene, chr, tss = Gene
+		window_start = max(1, tss - CIS_WINDOW)
+		window_end = min(lengths[int(chr)-1], tss + CIS_WINDOW)
+		positions = sorted([rng.randint(window_start, window_end) for row_i in range(N_rows)])
+		causal_z = rng.choice([0.0, 0.0, 0.0, 5.0])
+		for pos in positions:
+			ref, alt = rng.sample(BASES, 2)
+			# The signal falls off with distance from the TSS
+			maf, beta, se, pval = _association_fields(rng, causal_z*math.exp(-abs(pos - tss)/100000.0))
+			yield [gene, "rs%d" % (int(chr)*1000000000 + pos), chr, str(pos), ref, alt,
+				maf, "500", beta, se, pval]
+
+	if Order == "grouped":
+		streams = (row for gene_i in range(N_genes) for row in gene_rows(genes[gene_i], sizes[gene_i]))
+	else:
+		streams = _interleave([gene_rows(genes[gene_i], sizes[gene_i]) for gene_i in range(N_genes)], 64, rng)
+
+	n_rows = 0
+	f_OUT = open_output(Out_file, Compress)
+	try:
+		f_OUT.write("\t".join(EQTL_COLUMNS)+"\n")
+		lines = list()
+		for row in streams:
+			lines.append("\t".join(row)+"\n")
+			if len(lines) >= WRITE_LINES:
+				f_OUT.write("".join(lines))
+				n_rows = n_rows + len(lines)
+				lines = list()
+		f_OUT.write("".join(lines))
+		n_rows = n_rows + len(lines)
+	finally:
+		f_OUT.close()
+	return [n_rows, genes]
+
+def _interleave(Iterators, Width, Rng):
+	""" Yield items from up to Width of Iterators at a time, picking which at random.
+	"""
+	waiting = iter(Iterators)
+	active = list()
+	while True:
+		while len(active) < Width:
+			try:
+				active.append(next(waiting))
+			except StopIteration:
+				break
+		if len(active) == 0:
+			return
+		pick = Rng.randrange(len(active))
+		try:
+			yield next(active[pick])
+		except StopIteration:
+			active.pop(pick)
+
+def write_synthetic_gwas(Out_file, N_snps=1000000, N_chr=22, N_peaks=50, Compress="none", Seed=0):
+	""" Write a synthetic GWAS table (see GWAS_COLUMNS), sorted by chromosome and position.
+
+		SNPs are spread evenly over the chromosomes (in proportion to their
+		length). Around each of N_peaks random loci the p-values drop, as
+		they would near a real association.
+
+		Arguments:
+			Out_file:	"/my_directory/gwas.txt[.gz]"
+			N_snps:		integer > 0. Rows (about).
+			N_chr:		integer, 1 to 22. Chromosomes used.
+			N_peaks:	integer >= 0. Associated loci.
+			Compress:	one of COMPRESSIONS
+			Seed:		random seed
+
+		Returns: rows written
+	"""
+	if type(N_snps) is not int or N_snps < 1:
+		raise ValueError("N_snps needs to be an integer > 0.")
+	if type(N_chr) is not int or N_chr < 1 or N_chr > len(CHROMOSOME_LENGTHS):
+		raise ValueError("N_chr needs to be an integer from 1 to "+str(len(CHROMOSOME_LENGTHS))+".")
+	rng = random.Random(Seed)
+	lengths = CHROMOSOME_LENGTHS[:N_chr]
+	spacing = float(sum(lengths))/N_snps
+	peaks = dict()
+	for peak_i in range(N_peaks):
+		chr_i = rng.randrange(N_chr)
+		peaks.setdefault(chr_i, list()).append([rng.randint(1, lengths[chr_i]), rng.uniform(5, 12)])
+
+	n_rows = 0
+	f_OUT = open_output(Out_file, Compress)
+	try:
+		f_OUT.write("\t".join(GWAS_COLUMNS)+"\n")
+		lines = list()
+		for chr_i in range(N_chr):
+			chr = str(chr_i+1)
+			pos = 0
+			while True:
+				pos = pos + 1 + int(rng.expovariate(1/spacing))
+				if pos > lengths[chr_i]:
+					break
+				z = 0.0
+				for peak_pos, peak_z in peaks.get(chr_i, []):
+					z = max(z, peak_z*math.exp(-abs(pos - peak_pos)/50000.0))
+				ref, alt = rng.sample(BASES, 2)
+				maf, beta, se, pval = _association_fields(rng, z)
+				lines.append("\t".join([chr, str(pos), chr+":"+str(pos), "rs%d" % (int(chr)*1000000000 + pos),
+					ref, alt, maf, "10000", beta, se, pval])+"\n")
+				if len(lines) >= WRITE_LINES:
+					f_OUT.write("".join(lines))
+					n_rows = n_rows + len(lines)
+					lines = list()
+		f_OUT.write("".join(lines))
+		n_rows = n_rows + len(lines)
+	finally:
+		f_OUT.close()
+	return n_rows
+
+
+def count_files(Directory):
+	""" Return how many files are in Directory and its subdirectories.
+	"""
+	return sum([len(files) for root, dirs, files in os.walk(Directory)])
+
+def run_timed(Command, Cwd=None):
+	""" Run Command (a list of arguments) in its own process, and measure it.
+
+		Returns: dictionary of seconds (wall clock), user_seconds, system_seconds,
+			peak_rss_mb (of the process, or its largest child process), exit_code, and
+			output (the last 2000 characters of its stdout and stderr, together)
+	"""
+	with tempfile.TemporaryFile() as f_LOG:
+		start_time = time.time()
+		process = Popen(Command, cwd=Cwd, stdout=f_LOG, stderr=STDOUT)
+		# wait4 gives this process' own resource use, not that of everything run so far
+		pid, status, usage = os.wait4(process.pid, 0)
+		seconds = time.time() - start_time
+		if os.WIFEXITED(status):
+			process.returncode = os.WEXITSTATUS(status)
+		else:
+			process.returncode = -os.WTERMSIG(status)
+		f_LOG.seek(0, 2)
+		f_LOG.seek(max(0, f_LOG.tell()-2000))
+		output = f_LOG.read()
+	return {"seconds": seconds,
+		"user_seconds": usage.ru_utime,
+		"system_seconds": usage.ru_stime,
+		# ru_maxrss is in kilobytes on Linux, bytes on Mac OS
+		"peak_rss_mb": usage.ru_maxrss/(1024.0*1024 if sys.platform == "darwin" else 1024.0),
+		"exit_code": process.returncode,
+		"output": output}
+
+def git_commit(Directory):
+	""" Return the git commit Directory is checked out at, or "" if it isn't a git repository.
+	"""
+	try:
+		process = Popen(["git", "rev-parse", "HEAD"], cwd=Directory, stdout=PIPE, stderr=PIPE)
+		output = process.communicate()[0]
+	except OSError:
+		return ""
+	return output.strip() if process.returncode == 0 else ""
+
+def write_results(Out_file, Settings, Data, Results, Script_dir):
+	""" Write benchmark results as JSON, along with where and when they were measured.
+	"""
+	with open(Out_file, 'wb') as f_OUT:
+		json.dump({"commit": git_commit(Script_dir),
+			"host": socket.gethostname(),
+			"python": sys.version.split()[0],
+			"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+			"settings": Settings,
+			"data": Data,
+			"results": Results}, f_OUT, indent=1, sort_keys=True)
+
+def compare_results(Old_file, New_results):
+	""" Return printable lines comparing New_results to the results in Old_file (another run's JSON).
+	"""
+	with open(Old_file, 'rb') as f_IN:
+		old = json.load(f_IN)
+	old_results = dict([[result["name"], result] for result in old["results"]])
+	lines = ["Compared to "+Old_file+" (commit "+str(old.get("commit", ""))[:10]+"):"]
+	for result in New_results:
+		if result["name"] not in old_results:
+			continue
+		old_seconds = old_results[result["name"]]["seconds"]
+		lines.append("  "+result["name"]+": "+"%.2f" % old_seconds+"s -> "+"%.2f" % result["seconds"]
+			+"s ("+"%.2f" % (old_seconds/max(result["seconds"], 1e-9))+"x)")
+	return lines
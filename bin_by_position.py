@@ -0,0 +1,270 @@
+#!/usr/bin/python
+
+### bin_by_position.py
+### 2026_10_18
+
+### This script splits a GWAS table (or any table with a chromosome and
+###  position column) into fixed-size position bins on each chromosome, with
+###  the same splitters as folderize_by_column.py, and writes a bin index,
+###  bins.idx (an interval index: each bin's chromosome, first and last
+###  position, and where its rows are).
+###
+###  A window's rows can then be read without reading the rest of the table,
+###  with join_functions.BinnedTable, which only reads the bins overlapping it.
+###  join_gene_trait.py takes the output directory in place of a GWAS file.
+###
+###  Bins are named chr_bin, e.g. 1_109 holds chromosome 1, positions 109000000
+###  to 109999999 (with --bin_bp 1000000). Rows on chromosomes other than 1-22,
+###  X, Y, XY, and MT, or without a numeric position, are left out.
+###
+###  Arguments:
+###    input_file.txt: input txt (or txt.gz) file
+###	 valid filepath
+###    Chr_col#,Pos_col#: the chromosome and position columns
+###	 integers (0 = first column)
+###    output_directory/: where the bins and bins.idx are written
+###      Extant directory
+###    keep_*: which columns from the file to keep in the bins (they need to
+###      include the chromosome and position columns)
+###      keep_all = keep all columns
+###      keep_0_1_2 = keep first 3 columns
+###
+###  Options:
+###    --bin_bp #: width of each bin (default 1000000)
+###    --mode hash: split the file in a single pass, appending each row to its bin (default)
+###    --mode memory: read the whole file into memory, then write each bin once
+###    --mode parallel: split byte ranges of the file with several worker processes
+###      (needs a plain text or bgzip file)
+###    --n_procs #: with --mode parallel, the number of worker processes; otherwise, the
+###      number of processes decompressing a bgzip file (default: all cores)
+###    --max_open #: with --mode hash or parallel, the most files kept open at once (default 256)
+###    --flush_rows #: rows held in memory per open file before writing (default 1000)
+###    --format csv|bgzip|npz: format of the bins, as in folderize_by_column.py (default csv)
+###    --layout store: write every bin into a few large data files (store_#.dat) plus an
+###      index (store.idx), so a window's bins are read by seeking (default)
+###    --layout files: write one file per bin
+###    --store_file_mb #: with --layout store, start a new data file past this size (default 4096)
+###    --temp_dir /scratch_dir/: where temporary files are written (default: the system temp directory)
+###    --filter, --chromosomes, --drop_na: only keep some rows, as in folderize_by_column.py
+###      (e.g. --drop_na 8,9 to leave out rows without a beta or standard error)
+###    --variant_key chr#,pos#[,ref#,alt#]: also write each row's variant key as an extra
+###      last column, as in folderize_by_column.py
+###    --metrics on: log the split's time, progress, and memory to split.metrics.jsonl
+###      in the output directory (default)
+###    --metrics off: only print them
+###    --progress_seconds #: how often to report progress (default 60)
+###
+###  Usage:
+###    python bin_by_position.py LDL.txt.gz 2,3 /data/GWAS/LDL_bins/ keep_all --bin_bp 1000000
+
+import sys
+import os
+import multiprocessing
+from helper_functions import get_command_args, open_input
+from split_functions import hash_split, memory_split, parallel_split, OUTPUT_FORMATS
+from split_functions import GroupStoreWriter, parse_row_filter
+from genomic_index import GroupExtents, PositionBins, IntervalIndex, write_interval_index, parse_variant_key
+from join_functions import BIN_INDEX
+from metrics_functions import SplitMetrics
+
+print "Initiating bin_by_position.py"
+print "Argument List:", str(sys.argv[1:])
+
+if (len(sys.argv) < 5):
+	raise Exception("Expected at least four command arguments.")
+in_FILE = str(sys.argv[1])
+Position_cols = str(sys.argv[2])
+out_DIR = str(sys.argv[3])
+Keep = str(sys.argv[4])
+options = get_command_args(sys.argv[5:])
+Bin_bp = int(float(options.get("bin_bp", 1e6)))
+Mode = options.get("mode", "hash")
+Max_open = int(options.get("max_open", 256))
+Flush_rows = int(options.get("flush_rows", 1000))
+N_procs = int(options.get("n_procs", multiprocessing.cpu_count()))
+Temp_dir = options.get("temp_dir", "")
+Format = options.get("format", "csv")
+Layout = options.get("layout", "store")
+Store_file_mb = int(options.get("store_file_mb", 4096))
+Metrics = options.get("metrics", "on")
+Progress_seconds = float(options.get("progress_seconds", 60))
+Filter = options.get("filter", "")
+Chromosomes = options.get("chromosomes", "")
+Drop_na = options.get("drop_na", "")
+Variant_key = options.get("variant_key", "")
+
+if (in_FILE[-4:] != ".txt" and in_FILE[-3:] != ".gz" and in_FILE[-4:] != ".bgz"):
+	raise Exception("Expected 1st command argument to be a file name ending in '.txt', '.gz', or '.bgz'")
+if not (os.path.isfile(in_FILE)):
+	raise ValueError(in_FILE+" not found. Is it a *full* and valid file path?")
+split_cols = Position_cols.split(",")
+if len(split_cols) != 2 or not all(col.isdigit() for col in split_cols):
+	raise ValueError("Expected the 2nd command argument to look like Chr_col#,Pos_col#, instead got: "+Position_cols)
+chr_col, pos_col = [int(col) for col in split_cols]
+if not (os.path.isdir(out_DIR)):
+	raise ValueError(out_DIR+" not found. Is it a valid directory?")
+if out_DIR[-1] != "/":
+	raise ValueError("The out directory needs to end with a forward slash.")
+if not "keep_" in Keep:
+	raise ValueError("'keep_*' argument needs to start with 'keep_'")
+after_keep = Keep[len("keep_"):]
+f_IN = open_input(in_FILE)
+head = f_IN.readline().rstrip('\r\n').split('\t')
+f_IN.close()
+if after_keep == "all":
+	cols_to_keep = range(len(head))
+elif len(after_keep) > 0 and all(col.isdigit() for col in after_keep.split("_")):
+	cols_to_keep = [int(col) for col in after_keep.split("_")]
+else:
+	raise ValueError("'keep_*' argument isn't properly formatted. Looked like: "+Keep)
+if max(cols_to_keep + [chr_col, pos_col]) >= len(head):
+	raise ValueError("The header of "+in_FILE+" only has "+str(len(head))+" column(s).")
+if chr_col not in cols_to_keep or pos_col not in cols_to_keep:
+	raise ValueError("The kept columns need to include the chromosome and position columns.")
+if Bin_bp < 1:
+	raise ValueError("--bin_bp needs to be an integer > 0.")
+if Mode not in ["hash", "memory", "parallel"]:
+	raise ValueError("Expected --mode to be hash, memory, or parallel, instead got: "+Mode)
+if Max_open < 1:
+	raise ValueError("--max_open needs to be an integer > 0.")
+if Flush_rows < 1:
+	raise ValueError("--flush_rows needs to be an integer > 0.")
+if N_procs < 1:
+	raise ValueError("--n_procs needs to be an integer > 0.")
+if len(Temp_dir) > 0 and not os.path.isdir(Temp_dir):
+	raise ValueError(Temp_dir+" not found. Is it a valid directory?")
+if Format not in OUTPUT_FORMATS:
+	raise ValueError("Expected --format to be one of "+str(OUTPUT_FORMATS)+", instead got: "+Format)
+if Layout != "files" and Layout != "store":
+	raise ValueError("Expected --layout to be files or store, instead got: "+Layout)
+if Layout == "store" and Format == "npz":
+	raise ValueError("--layout store needs --format csv or bgzip.")
+if Store_file_mb < 1:
+	raise ValueError("--store_file_mb needs to be an integer > 0.")
+if Metrics != "on" and Metrics != "off":
+	raise ValueError("Expected --metrics to be on or off, instead got: "+Metrics)
+if Progress_seconds < 0:
+	raise ValueError("--progress_seconds needs to be >= 0.")
+row_filter = parse_row_filter(Filter = Filter,
+			Chromosomes = Chromosomes,
+			Drop_na = Drop_na,
+			Cols_to_keep = cols_to_keep,
+			In_file = in_FILE)
+variant_key = parse_variant_key(Variant_key) if len(Variant_key) > 0 else None
+
+print "Passed script checks."
+print "Keeping column(s): "+str(cols_to_keep)
+if row_filter is not None:
+	print "Keeping rows that pass: "+row_filter.describe()
+
+# File extension for each output format
+EXTENSIONS = {"csv": ".csv", "bgzip": ".tsv.gz", "npz": ".npz"}
+
+def group_path(row_bin):
+	""" Return the filepath the rows of row_bin are written to.
+	"""
+	return out_DIR+row_bin+EXTENSIONS[Format]
+
+# Bins of an earlier run that this one doesn't write would otherwise be left behind
+if os.path.isfile(out_DIR+BIN_INDEX):
+	old_index = IntervalIndex(out_DIR+BIN_INDEX)
+	for location in set(old_index.locations.values()):
+		if location == "store.idx":
+			# The bins were in a store: remove its data files (numbered from 0, the
+			#  first is made even if no bin is written to it), then its index
+			file_i = 0
+			while os.path.isfile(out_DIR+"store_"+str(file_i)+".dat"):
+				os.remove(out_DIR+"store_"+str(file_i)+".dat")
+				file_i = file_i + 1
+			if os.path.isfile(out_DIR+location):
+				os.remove(out_DIR+location)
+			continue
+		for path in [out_DIR+location, out_DIR+location+".gzi"]:
+			if not location.endswith(".idx") and os.path.isfile(path):
+				os.remove(path)
+	os.remove(out_DIR+BIN_INDEX)
+
+position_bins = PositionBins(Chr_col = chr_col, Pos_col = pos_col, Bin_bp = Bin_bp)
+extents = GroupExtents(Chr_col = chr_col, Pos_col = pos_col)
+if Layout == "store":
+	store = GroupStoreWriter(Out_dir = out_DIR,
+				Format = Format,
+				Max_file_mb = Store_file_mb)
+else:
+	store = None
+metrics = SplitMetrics(Log_file = out_DIR+"split.metrics.jsonl" if Metrics == "on" else None,
+			In_file = in_FILE,
+			Interval_seconds = Progress_seconds,
+			Fields = {"bin_bp": Bin_bp, "mode": Mode, "layout": Layout})
+
+metrics.start_stage("split")
+if Mode == "hash":
+	row_bin_counts = hash_split(In_file = in_FILE,
+				Column_index = chr_col,
+				Cols_to_keep = cols_to_keep,
+				Group_path = group_path,
+				Max_open = Max_open,
+				Flush_rows = Flush_rows,
+				N_procs = N_procs,
+				Format = Format,
+				Store = store,
+				Temp_dir = Temp_dir,
+				Extents = extents,
+				Progress = metrics.progress,
+				Row_filter = row_filter,
+				Group_key = position_bins,
+				Variant_key = variant_key)
+elif Mode == "memory":
+	row_bin_counts = memory_split(In_file = in_FILE,
+				Column_index = chr_col,
+				Cols_to_keep = cols_to_keep,
+				Group_path = group_path,
+				N_procs = N_procs,
+				Format = Format,
+				Store = store,
+				Extents = extents,
+				Progress = metrics.progress,
+				Row_filter = row_filter,
+				Group_key = position_bins,
+				Variant_key = variant_key)
+else:
+	row_bin_counts = parallel_split(In_file = in_FILE,
+				Column_index = chr_col,
+				Cols_to_keep = cols_to_keep,
+				Group_path = group_path,
+				N_procs = N_procs,
+				Temp_dir = Temp_dir,
+				Max_open = Max_open,
+				Flush_rows = Flush_rows,
+				Format = Format,
+				Store = store,
+				Extents = extents,
+				Progress = metrics.progress,
+				Row_filter = row_filter,
+				Group_key = position_bins,
+				Variant_key = variant_key)
+metrics.end_stage({"bins": len(row_bin_counts), "rows": sum([row_bin[1] for row_bin in row_bin_counts])})
+
+if store is not None:
+	print "Wrote store index: "+store.close()
+
+row_bins = [row_bin[0] for row_bin in row_bin_counts]
+if store is not None:
+	locations = dict([[row_bin, "store.idx"] for row_bin in row_bins])
+else:
+	locations = dict([[row_bin, group_path(row_bin)[len(out_DIR):]] for row_bin in row_bins])
+write_interval_index(Path = out_DIR+BIN_INDEX,
+			Groups = row_bins,
+			Locations = locations,
+			Extents = extents,
+			Meta = [["source", in_FILE],
+				["bin_bp", Bin_bp],
+				["chr_col", cols_to_keep.index(chr_col)],
+				["pos_col", cols_to_keep.index(pos_col)],
+				["columns"] + [head[col_i] for col_i in cols_to_keep]
+					+ ([variant_key.name] if variant_key is not None else [])])
+
+metrics.finish({"bins": len(row_bin_counts), "rows": sum([row_bin[1] for row_bin in row_bin_counts])})
+print "Wrote "+str(sum([row_bin[1] for row_bin in row_bin_counts]))+" row(s) into "+str(len(row_bins)) \
+	+" bin(s) of "+str(Bin_bp)+" bp: "+out_DIR+BIN_INDEX
+print "Completed bin_by_position.py"
@@ -0,0 +1,304 @@
+#/usr/bin/python
+
+# coloc_abf.py
+# 2026_10_18
+
+### Approximate Bayes factor colocalisation (as coloc.abf() in the coloc R
+###  package) for many gene/trait pairs at once, with NumPy.
+###
+###  Each pair's SNPs are padded into one row of a 2D array (with a mask of
+###  which entries are real SNPs), so per-SNP log ABFs, the H0-H4 posteriors,
+###  and credible sets are computed for a whole batch of pairs in a few array
+###  operations. Sums of ABFs are done as log-sum-exps, so nothing needs to be
+###  clamped (as not_too_tiny/not_too_big do in import.R).
+###
+###  Hypotheses:
+###    H0: no association with either trait
+###    H1: association with trait 1 (eQTL) only
+###    H2: association with trait 2 (GWAS) only
+###    H3: both traits associated, different causal SNPs
+###    H4: both traits associated, one shared causal SNP
+###
+###  Example usage:
+###    pairs = [read_merged_table(f) for f in analyze_me_files]
+###    for result in coloc_abf_batch(pairs):
+###      print result["nsnps"], result["pp"]
+
+import math
+
+try:
+	import numpy
+except ImportError:
+	raise ImportError("coloc_abf.py needs numpy. Please install it.")
+
+# Prior probabilities, as coloc.abf()'s defaults
+P1 = 1e-4
+P2 = 1e-4
+P12 = 1e-5
+# Prior standard deviation of the effect size of a quantitative trait (times sdY)
+SD_PRIOR_QUANT = 0.15
+# The two datasets of a merged (_analyze_me) table, by column suffix
+DATASETS = ["eQTL", "GWAS"]
+
+# Coefficients of Acklam's rational approximation of the inverse normal CDF
+_A = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+	1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+_B = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+	6.680131188771972e+01, -1.328068155288572e+01]
+_C = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+	-2.549671010229583e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+_D = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+	3.754408661907416e+00]
+
+
+_erfc = numpy.vectorize(math.erfc, otypes=[numpy.float64])
+
+def _polyval(Coefs, X):
+	value = numpy.zeros_like(X) + Coefs[0]
+	for coef in Coefs[1:]:
+		value = value*X + coef
+	return value
+
+def two_sided_z(Pvalues):
+	""" Return |z| for two sided p-values, i.e. R's qnorm(Pvalues/2, lower.tail=FALSE).
+
+		Uses Acklam's approximation with one Halley refinement step, so scipy isn't needed.
+		P-values of 0 (e.g. underflowed in a GWAS table) are taken as the smallest
+		normal double, so they give a large |z| (about 37.5) instead of nan.
+	"""
+	p = numpy.maximum(numpy.asarray(Pvalues, dtype=numpy.float64)/2.0, numpy.finfo(numpy.float64).tiny)
+	# p <= 0.5, so only the lower tail and central regions are needed
+	low = p < 0.02425
+	z = numpy.empty_like(p)
+	q = numpy.sqrt(-2.0*numpy.log(p[low]))
+	z[low] = _polyval(_C, q)/(_polyval(_D, q)*q + 1.0)
+	q = p[~low] - 0.5
+	r = q*q
+	z[~low] = _polyval(_A, r)*q/(_polyval(_B, r)*r + 1.0)
+	# Refine (z is the lower tail quantile here, so p = erfc(-z/sqrt(2))/2)
+	error = 0.5*_erfc(-z/math.sqrt(2.0)) - p
+	with numpy.errstate(over="ignore", invalid="ignore"):
+		u = error*math.sqrt(2.0*math.pi)*numpy.exp(z*z/2.0)
+		z = numpy.where(numpy.isfinite(u), z - u/(1.0 + z*u/2.0), z)
+	return -z
+
+
+def labf_from_estimates(Beta, Varbeta, Sd_prior):
+	""" Return Wakefield's log approximate Bayes factor for each SNP, from effect estimates.
+
+		Arguments:
+			Beta:		array of effect sizes
+			Varbeta:	array of the variances of Beta
+			Sd_prior:	prior standard deviation of the effect size (array or float)
+	"""
+	z2 = Beta**2/Varbeta
+	r = Sd_prior**2/(Sd_prior**2 + Varbeta)
+	return 0.5*(numpy.log(1.0 - r) + r*z2)
+
+def labf_from_pvalues(Pvalues, MAF, N, Sd_prior=SD_PRIOR_QUANT):
+	""" Return Wakefield's log approximate Bayes factor for each SNP of a quantitative
+		trait, from p-values (variance of beta estimated from MAF and N).
+	"""
+	z = two_sided_z(Pvalues)
+	varbeta = 1.0/(2.0*N*MAF*(1.0 - MAF))
+	r = Sd_prior**2/(Sd_prior**2 + varbeta)
+	return 0.5*(numpy.log(1.0 - r) + r*z**2)
+
+def sdY_estimate(Varbeta, MAF, N, Mask):
+	""" Return the estimated standard deviation of each pair's trait (as coloc's sdY.est).
+
+		Fits 2*N*MAF*(1-MAF) ~ 1/Varbeta through the origin, over each row's masked SNPs.
+
+		Returns: array with one value per row (per pair)
+	"""
+	oneover = numpy.where(Mask, 1.0/Varbeta, 0.0)
+	nvx = numpy.where(Mask, 2.0*N*MAF*(1.0 - MAF), 0.0)
+	return numpy.sqrt((oneover*nvx).sum(axis=-1)/(oneover**2).sum(axis=-1))
+
+
+def logsum(X, Mask=None):
+	""" Return log(sum(exp(X))) along the last axis, without overflow. Unmasked entries are left out.
+	"""
+	if Mask is not None:
+		X = numpy.where(Mask, X, -numpy.inf)
+	top = X.max(axis=-1)
+	safe_top = numpy.where(numpy.isfinite(top), top, 0.0)
+	with numpy.errstate(divide="ignore"):
+		return safe_top + numpy.log(numpy.exp(X - safe_top[..., numpy.newaxis]).sum(axis=-1))
+
+def logdiff(X, Y):
+	""" Return log(exp(X) - exp(Y)), for X > Y, without overflow.
+	"""
+	top = numpy.maximum(X, Y)
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		return top + numpy.log(numpy.exp(X - top) - numpy.exp(Y - top))
+
+
+def combine_abf(lABF1, lABF2, Mask, P1=P1, P2=P2, P12=P12):
+	""" Return the posterior probabilities of H0-H4 from the per-SNP log ABFs of two traits.
+
+		Arguments:
+			lABF1, lABF2:	2D arrays, one row per pair, of each SNP's log ABF
+			Mask:			2D boolean array, True where a row has a SNP
+			P1, P2, P12:	prior probability of a SNP being associated with trait 1,
+								trait 2, or both
+
+		Returns: [pp, snp_pp_h4]
+			pp:			array (n pairs x 5) of the posteriors of H0, H1, H2, H3, H4
+			snp_pp_h4:	array (like lABF1) of each SNP's posterior of being the
+							shared causal SNP, given H4
+	"""
+	lsum = lABF1 + lABF2
+	logsum_1 = logsum(lABF1, Mask)
+	logsum_2 = logsum(lABF2, Mask)
+	logsum_12 = logsum(lsum, Mask)
+	lH = numpy.empty((lABF1.shape[0], 5))
+	lH[:, 0] = 0.0
+	lH[:, 1] = math.log(P1) + logsum_1
+	lH[:, 2] = math.log(P2) + logsum_2
+	lH[:, 3] = math.log(P1) + math.log(P2) + logdiff(logsum_1 + logsum_2, logsum_12)
+	lH[:, 4] = math.log(P12) + logsum_12
+	pp = numpy.exp(lH - logsum(lH)[:, numpy.newaxis])
+	snp_pp_h4 = numpy.where(Mask, numpy.exp(lsum - logsum_12[:, numpy.newaxis]), 0.0)
+	return [pp, snp_pp_h4]
+
+
+def credible_sets(lABF, Mask, Cutoff=0.95):
+	""" Return each row's credible set: the fewest SNPs that, as a set, are at least Cutoff likely
+		to include the causal SNP (Maller et al. 2012), from per-SNP log ABFs.
+
+		Returns: list, one per row, of [probability, array of SNP indeces (most likely first)]
+	"""
+	posterior = numpy.where(Mask, numpy.exp(lABF - logsum(lABF, Mask)[:, numpy.newaxis]), 0.0)
+	order = numpy.argsort(-posterior, axis=-1, kind="mergesort")
+	cumulative = numpy.cumsum(numpy.take_along_axis(posterior, order, axis=-1), axis=-1)
+	n_snps = Mask.sum(axis=-1)
+	n_in_set = numpy.minimum((cumulative < Cutoff).sum(axis=-1) + 1, n_snps)
+	sets = list()
+	for row_i in range(lABF.shape[0]):
+		if n_in_set[row_i] == 0:
+			sets.append([0.0, order[row_i, :0]])
+		else:
+			sets.append([cumulative[row_i, n_in_set[row_i]-1], order[row_i, :n_in_set[row_i]]])
+	return sets
+
+
+def pad_rows(Arrays, Fill=numpy.nan):
+	""" Stack 1D arrays of different lengths into a 2D array, padding with Fill.
+
+		Returns: [2D array, 2D boolean mask of the real entries]
+	"""
+	width = max([len(values) for values in Arrays] + [1])
+	padded = numpy.empty((len(Arrays), width))
+	padded.fill(Fill)
+	mask = numpy.zeros((len(Arrays), width), dtype=bool)
+	for row_i, values in enumerate(Arrays):
+		padded[row_i, :len(values)] = values
+		mask[row_i, :len(values)] = True
+	return [padded, mask]
+
+def _dataset_labf(Pairs, Dataset, MAF, Mask, Sd_prior):
+	""" Return the padded per-SNP log ABFs of one dataset (see DATASETS) of every pair.
+
+		Uses beta and varbeta (with sdY estimated from varbeta, MAF, and N) if
+		every pair has them, as get_coloc_summaries.R does, otherwise p-values.
+	"""
+	N = pad_rows([pair["N_"+Dataset] for pair in Pairs])[0]
+	if all(["beta_"+Dataset in pair and "varbeta_"+Dataset in pair for pair in Pairs]):
+		beta = pad_rows([pair["beta_"+Dataset] for pair in Pairs])[0]
+		varbeta = pad_rows([pair["varbeta_"+Dataset] for pair in Pairs])[0]
+		sdY = sdY_estimate(varbeta, MAF, N, Mask)
+		with numpy.errstate(invalid="ignore"):
+			return labf_from_estimates(beta, varbeta, Sd_prior*sdY[:, numpy.newaxis])
+	pvalues = pad_rows([pair["PV_"+Dataset] for pair in Pairs], Fill=1.0)[0]
+	with numpy.errstate(invalid="ignore", divide="ignore"):
+		return labf_from_pvalues(pvalues, MAF, N, Sd_prior)
+
+def coloc_abf_batch(Pairs, P1=P1, P2=P2, P12=P12, Cutoff=0.95, Sd_prior=SD_PRIOR_QUANT):
+	""" Run colocalisation on a batch of gene/trait pairs of quantitative traits.
+
+		Arguments:
+			Pairs:		list of dictionaries of column -> array, with the columns of a
+							merged table (see read_merged_table): MAF, and for each of
+							eQTL and GWAS, N_* and either beta_* and varbeta_* or PV_*
+			P1, P2, P12:	priors, see combine_abf
+			Cutoff:		credible set probability
+			Sd_prior:	prior standard deviation of effect sizes (times sdY)
+
+		Returns: list, one per pair, of dictionaries with:
+			nsnps:			number of SNPs
+			pp:				array of the posteriors of H0, H1, H2, H3, H4
+			lABF_eQTL, lABF_GWAS, snp_pp_h4:	per-SNP arrays
+			credible_eQTL, credible_GWAS:	[probability, array of SNP indeces]
+	"""
+	if len(Pairs) == 0:
+		return []
+	MAF, mask = pad_rows([pair["MAF"] for pair in Pairs])
+	labf = dict()
+	for dataset in DATASETS:
+		labf[dataset] = _dataset_labf(Pairs, dataset, MAF, mask, Sd_prior)
+	pp, snp_pp_h4 = combine_abf(labf["eQTL"], labf["GWAS"], mask, P1, P2, P12)
+	credible = dict()
+	for dataset in DATASETS:
+		credible[dataset] = credible_sets(labf[dataset], mask, Cutoff)
+	results = list()
+	for pair_i in range(len(Pairs)):
+		n_snps = int(mask[pair_i].sum())
+		results.append({"nsnps": n_snps,
+				"pp": pp[pair_i],
+				"lABF_eQTL": labf["eQTL"][pair_i, :n_snps],
+				"lABF_GWAS": labf["GWAS"][pair_i, :n_snps],
+				"snp_pp_h4": snp_pp_h4[pair_i, :n_snps],
+				"credible_eQTL": credible["eQTL"][pair_i],
+				"credible_GWAS": credible["GWAS"][pair_i]})
+	return results
+
+
+def read_merged_table(File):
+	""" Read a merged gene/trait table (an _analyze_me file, as written by R's write.table).
+
+		Accepts R's default write.table output (space separated, quoted, with
+		row names) or a plain tab separated table.
+
+		Returns: dictionary of column -> array (numeric columns) or list (chr_pos, rsid, ...)
+	"""
+	with open(File, 'rb') as f_IN:
+		lines = f_IN.read().splitlines()
+	if len(lines) == 0:
+		return dict()
+	sep = "\t" if "\t" in lines[0] else None
+	head = [name.strip('"') for name in lines[0].split(sep)]
+	rows = [[value.strip('"') for value in line.split(sep)] for line in lines[1:] if len(line) > 0]
+	# write.table adds row names, which have no header
+	offset = 1 if len(rows) > 0 and len(rows[0]) == len(head)+1 else 0
+	table = dict()
+	for col_i, name in enumerate(head):
+		values = [row[col_i+offset] for row in rows]
+		try:
+			table[name] = numpy.array([float(value) for value in values])
+		except ValueError:
+			table[name] = values
+	return table
+
+def score_merged_tables(Files, Out_file, Batch_size=1000, P1=P1, P2=P2, P12=P12):
+	""" Run colocalisation on merged gene/trait tables, Batch_size at a time, and write
+		one summary line per table (the columns get_coloc_summaries.R writes).
+
+		Empty tables are written with nsnps 0 and NA posteriors.
+
+		Returns: number of tables scored
+	"""
+	with open(Out_file, 'wb') as f_OUT:
+		f_OUT.write("\t".join(["file", "nsnps", "hyp0", "hyp1", "hyp2", "hyp3", "hyp4"])+"\n")
+		for batch_start in range(0, len(Files), Batch_size):
+			batch_files = Files[batch_start:batch_start+Batch_size]
+			tables = [read_merged_table(merged_file) for merged_file in batch_files]
+			filled = [table_i for table_i, table in enumerate(tables) if len(table.get("MAF", [])) > 0]
+			results = dict(zip(filled, coloc_abf_batch([tables[table_i] for table_i in filled], P1, P2, P12)))
+			for table_i, merged_file in enumerate(batch_files):
+				if table_i in results:
+					summary = [str(results[table_i]["nsnps"])] + ["%.6g" % pp for pp in results[table_i]["pp"]]
+				else:
+					summary = ["0"] + ["NA"]*5
+				f_OUT.write("\t".join([merged_file] + summary)+"\n")
+	return len(Files)
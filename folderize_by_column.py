@@ -8,7 +8,8 @@
 ###  file groups of rows that match. Files are named by their row group. 
 ###
 ###  Arguments:
-###    input_file.txt: input txt file
+###    input_file.txt: input txt (or txt.gz) file, or the store.idx of a split
+###      written with --layout store (see --groups)
 ###	 valid filepath   
 ###    Column_#: which column to group by
 ###	 integer
@@ -20,39 +21,145 @@
 ###      keep_6_2_4 = keep the 7th, 3rd, and 5th columns..
 ###
 ###  Assumptions:
-###    The file is bash-sortable by the column of interest
 ###    The 'Column_#' command line argument is a valid column index
 ###	Type = <int>
 ###     (0 = first column)
 ###    The column of interest has no empty values
-###    The column of interest does not have any rows with value='INITIATED'
-###    The file is not zipped/compressed
-###    The file is a .txt file
+###    The file is a .txt file, or a gzip/bgzip compressed .gz or .bgz file
+###      (--mode parallel needs bgzip, not plain gzip, compression)
 ###    There is a single line header
 ###
+###  Options:
+###    --mode sort: sort the file by the column (see bash_sort), then scan it (default)
+###    --mode presorted: scan the file without sorting it (its rows need to be grouped
+###      by the column already)
+###    --mode memory: read the whole file into memory, then write each group once
+###    --mode hash: split the file in a single pass without sorting it,
+###      appending each row to its group's file
+###    --mode parallel: split byte ranges of the file with several worker
+###      processes, then merge each group's pieces
+###    --mode auto: profile a sample of the file (see profile_functions.profile_file)
+###      and pick one of the modes above from it, --memory_mb, --max_open and --n_procs
+###    --n_procs #: with --mode parallel, the number of worker processes; with --mode sort,
+###      the number of processes making sorted runs; with --mode hash, the number of
+###      processes decompressing a bgzip file (default: all cores)
+###    --memory_mb #: with --mode sort, the sort's memory budget; with --mode auto,
+###      the most memory --mode memory may be picked for (default 1024)
+###    --max_open #: with --mode hash or parallel, the most files kept open at once
+###      per process (default 256)
+###    --flush_rows #: rows held in memory per open file before writing (default 1000)
+###    --format csv: write comma separated files (default)
+###    --format bgzip: write bgzip compressed, tab separated files with a .gzi block index
+###    --format npz: write a NumPy .npz file of typed columns per group (needs numpy)
+###    --layout files: write one file per group (default)
+###    --layout store: write every group into a few large data files (store_#.dat)
+###      plus an index (store.idx) of each group's file, offset, length, and row count.
+###      Read it with split_functions.GroupStore. Needs --format csv or bgzip.
+###    --store_file_mb #: with --layout store, start a new data file past this size (default 4096)
+###    --temp_dir /scratch_dir/: where temporary pieces (sorted runs, partial files)
+###      are written (default: the system temp directory)
+###    --interval_cols #,#: the chromosome and position columns. Writes intervals.idx,
+###      an index of each group's chromosome, first and last position, and where its
+###      rows were written. Read it with genomic_index.IntervalIndex.
+###    --gene_table genes.txt: tab delimited gene, chr, TSS, TES table (with a header).
+###      Writes intervals.idx, using the TSS to TES interval of the groups listed
+###      (other groups fall back to --interval_cols, if given).
+###    --cache on: record the input's fingerprint, the settings, and a hash of each
+###      group's rows in split.manifest. A rerun with the same input and settings does
+###      nothing; if the input changed, only the groups whose rows changed are
+###      rewritten (with --layout store, everything is). The rows are hashed as they're
+###      split, except that finding the changed groups of a changed input takes one extra
+###      read of it. (default)
+###    --cache off: always split everything, without a manifest
+###    --checkpoint_seconds #: with --mode sort, how often to record progress in
+###      split.checkpoint (at the start of a group; default 300, 0 = never)
+###    --resume on: with --mode sort and --layout files, pick up from split.checkpoint
+###      (skipping the sort, and the groups already written) if it matches the input
+###      and settings; otherwise start over (default off)
+###    --metrics on: log each stage's time, progress, memory, and open files to
+###      split.metrics.jsonl in the output directory, one JSON object per line (default)
+###    --metrics off: only print them
+###    --progress_seconds #: how often to report progress (default 60)
+###    --filter "#<=number,#>number": only keep rows whose (input) column # passes every
+###      threshold (operators <=, >=, <, >, =, !=); a row whose value isn't a number (e.g. NA)
+###      is dropped. e.g. --filter "10<=1e-5,7>0" for p-value <= 1e-5 and MAF > 0
+###    --chromosomes #:chromosome,chromosome: only keep rows whose column # is one of
+###      these chromosomes ('chr1' and '1' match; a-b is a range), e.g. --chromosomes 2:1-22,X
+###    --drop_na #,#: drop rows with an empty or NA value in any of these columns
+###    --drop_na kept: drop rows with an empty or NA value in any kept column
+###      (rows are filtered as they're read, before anything is written)
+###    --variant_key chr#,pos#: also write each row's variant key, its chromosome and position
+###      (input) columns packed into one integer (see genomic_index.variant_key), as an extra
+###      last column, variant_key (an int64 array with --format npz). Rows without a usable
+###      chromosome and position get -1.
+###    --variant_key chr#,pos#,ref#,alt#: the same, with a hash of the alleles in the key
+###    --groups keys.txt: only split out these groups, one per line (the first tab separated
+###      field; "-" reads them from stdin). Other groups' rows are skipped before the rest
+###      of their line is split. --mode sort and auto use --mode hash instead, and there's
+###      no cache (--cache off).
+###      With a store.idx as the input file, the groups are read straight out of the store,
+###      seeking to each one, without reading the rest (all groups, if --groups isn't given).
+###      Column_# is then ignored, and keep_*, --filter, --chromosomes, --drop_na,
+###      --variant_key, and --interval_cols refer to the store's columns.
+###
 ###  Usage:
-###    python folderize_by_gene.py input_file.txt Column_# output_directory/ keep_*
+###    python folderize_by_gene.py input_file.txt Column_# output_directory/ keep_* [--mode hash|parallel]
 
 import sys
 import os
+import errno
 import gzip
 import csv
+import multiprocessing
 from subprocess import call
+from helper_functions import get_command_args
+from split_functions import OUTPUT_FORMATS, GroupStore, read_group_list, parse_row_filter
+from split_functions import split_settings, split_by_column
+from genomic_index import GroupExtents, parse_variant_key
+from metrics_functions import SplitMetrics
 
 print "Initiating folderize_by_column.py"
 print "Argument List:", str(sys.argv[1:])
 
-if (len(sys.argv) != 5):
-	raise Exception("Expected four command arguments.")
+if (len(sys.argv) < 5):
+	raise Exception("Expected at least four command arguments.")
 in_FILE = str(sys.argv[1])
 Column_index = int(sys.argv[2])
 out_DIR = str(sys.argv[3])
 Keep = str(sys.argv[4])
+options = get_command_args(sys.argv[5:])
+Mode = options.get("mode", "sort")
+Max_open = int(options.get("max_open", 256))
+Flush_rows = int(options.get("flush_rows", 1000))
+N_procs = int(options.get("n_procs", multiprocessing.cpu_count()))
+Temp_dir = options.get("temp_dir", "")
+Memory_mb = int(options.get("memory_mb", 1024))
+Format = options.get("format", "csv")
+Layout = options.get("layout", "files")
+Store_file_mb = int(options.get("store_file_mb", 4096))
+Interval_cols = options.get("interval_cols", "")
+Gene_table = options.get("gene_table", "")
+Groups = options.get("groups", "")
+Cache = options.get("cache", "off" if len(Groups) > 0 or in_FILE[-4:] == ".idx" else "on")
+Checkpoint_seconds = int(options.get("checkpoint_seconds", 300))
+Resume = options.get("resume", "off")
+Metrics = options.get("metrics", "on")
+Progress_seconds = float(options.get("progress_seconds", 60))
+Filter = options.get("filter", "")
+Chromosomes = options.get("chromosomes", "")
+Drop_na = options.get("drop_na", "")
+Variant_key = options.get("variant_key", "")
 
-if (in_FILE[-4:] != ".txt"):
-	raise Exception("Expected 1st command argument to be a file name ending in '.txt'")
+if (in_FILE[-4:] != ".txt" and in_FILE[-3:] != ".gz" and in_FILE[-4:] != ".bgz" and in_FILE[-4:] != ".idx"):
+	raise Exception("Expected 1st command argument to be a file name ending in '.txt', '.gz', '.bgz', or '.idx'")
 if not (os.path.isfile(in_FILE)):
 	raise ValueError(in_FILE+" not found. Is it a *full* and valid file path?")
+if in_FILE[-4:] == ".idx":
+	# Split a store's groups out of it
+	store_in = GroupStore(Store_dir = os.path.dirname(in_FILE),
+				Name = os.path.basename(in_FILE)[:-len(".idx")])
+else:
+	store_in = None
 if not type(Column_index) is int or Column_index < 0:
 	raise Exception("Column index needs to be an integer >= 0.")
 if not (os.path.isdir(out_DIR)):
@@ -83,157 +190,128 @@ elif any(char.isdigit() for char in after_keep):
 		cols_to_keep.append(int(keep_col))
 else:
 	raise ValueError("'keep_*' argument isn't properly formatted. Looked like: "+Keep)
+if Mode not in ["sort", "presorted", "memory", "hash", "parallel", "auto"]:
+	raise ValueError("Expected --mode to be sort, presorted, memory, hash, parallel, or auto, instead got: "+Mode)
+if Max_open < 1:
+	raise ValueError("--max_open needs to be an integer > 0.")
+if Flush_rows < 1:
+	raise ValueError("--flush_rows needs to be an integer > 0.")
+if N_procs < 1:
+	raise ValueError("--n_procs needs to be an integer > 0.")
+if len(Temp_dir) > 0 and not os.path.isdir(Temp_dir):
+	raise ValueError(Temp_dir+" not found. Is it a valid directory?")
+if Memory_mb < 1:
+	raise ValueError("--memory_mb needs to be an integer > 0.")
+if Format not in OUTPUT_FORMATS:
+	raise ValueError("Expected --format to be one of "+str(OUTPUT_FORMATS)+", instead got: "+Format)
+if Layout != "files" and Layout != "store":
+	raise ValueError("Expected --layout to be files or store, instead got: "+Layout)
+if Layout == "store" and Format == "npz":
+	raise ValueError("--layout store needs --format csv or bgzip.")
+if Store_file_mb < 1:
+	raise ValueError("--store_file_mb needs to be an integer > 0.")
+if len(Interval_cols) > 0:
+	split_cols = Interval_cols.split(",")
+	if len(split_cols) != 2 or not all(col.isdigit() for col in split_cols):
+		raise ValueError("Expected --interval_cols to look like chr#,pos#, instead got: "+Interval_cols)
+	extents = GroupExtents(Chr_col = int(split_cols[0]), Pos_col = int(split_cols[1]))
+else:
+	extents = None
+if len(Gene_table) > 0 and not os.path.isfile(Gene_table):
+	raise ValueError(Gene_table+" not found. Is it a *full* and valid file path?")
+if Cache != "on" and Cache != "off":
+	raise ValueError("Expected --cache to be on or off, instead got: "+Cache)
+if Checkpoint_seconds < 0:
+	raise ValueError("--checkpoint_seconds needs to be an integer >= 0.")
+if Resume != "on" and Resume != "off":
+	raise ValueError("Expected --resume to be on or off, instead got: "+Resume)
+if Resume == "on" and (Mode != "sort" or Layout != "files"):
+	raise ValueError("--resume needs --mode sort and --layout files.")
+if Metrics != "on" and Metrics != "off":
+	raise ValueError("Expected --metrics to be on or off, instead got: "+Metrics)
+if Progress_seconds < 0:
+	raise ValueError("--progress_seconds needs to be >= 0.")
+if len(Groups) > 0:
+	if Cache == "on":
+		raise ValueError("--cache can't be on with --groups.")
+	if Resume == "on":
+		raise ValueError("--resume can't be used with --groups.")
+	group_list = read_group_list(Groups)
+	if len(group_list) == 0:
+		raise ValueError("No groups listed in "+Groups)
+else:
+	group_list = None
+if store_in is not None:
+	if Cache == "on" or Resume == "on" or Layout == "store":
+		raise ValueError("With a store.idx as the input, --cache and --resume can't be on, and --layout needs to be files.")
+	if cols_to_keep == "all":
+		cols_to_keep = range(len(store_in.head))
+row_filter = parse_row_filter(Filter = Filter,
+			Chromosomes = Chromosomes,
+			Drop_na = Drop_na,
+			Cols_to_keep = cols_to_keep,
+			In_file = in_FILE)
+variant_key = parse_variant_key(Variant_key) if len(Variant_key) > 0 else None
 		
 print "Passed script checks."
 print "Keeping column(s): "+str(cols_to_keep)
+if row_filter is not None:
+	print "Keeping rows that pass: "+row_filter.describe()
 
-all_row_groups = list()
-row_group = "INITIATED"
-
-def bash_sort(File, In_dir, Out_dir, Col, Header = True):
-	""" Bash sort a file, return location of sorted file.
+# File extension for each output format
+EXTENSIONS = {"csv": ".BED.csv", "bgzip": ".BED.tsv.gz", "npz": ".BED.npz"}
 
-		Arguments:
-			File: 	"my_fav_file.txt"
-			In_dir: "/my_directory/" [optional, you may make File a the full filepath instead
-			Out_dir:"/some_dir" where sorted file is saved
-			Col:	integer. Which column to sort by? [1 = first column]
-			Header: boolean. Does the file have a header?
-
-		Assumptions:
-			File is not gz-zipped (or compressed at all)
-			File ends in '.'txt'
-			File has a single lined header, or no header
-
-		Returns: filepath of the sorted file
+def group_path(row_group):
+	""" Return the filepath the rows of row_group are written to, making its directory.
 	"""
-	if type(File) is not str or type(In_dir) is not str or type(Out_dir) is not str:
-		raise ValueError("File, In_dir, and Out_dir need to be strings.")
-	if type(Col) is not int or Col < 0:
-		raise ValueError("Col needs to be an integer > 0.")
-	if len(In_dir) > 0:	
-		if not (os.path.isdir(In_dir)):
-			raise ValueError(In_dir+" not found.")
-		if In_dir[-1] != "/":
-			raise ValueError("In_dir needs to end with a forward slash.")
-	if len(Out_dir) > 0:	
-		if not (os.path.isdir(Out_dir)):
-			raise ValueError(Out_dir+" not found.")
-		if Out_dir[-1] != "/":
-			raise ValueError("Out_dir needs to end with a forward slash.")
-	if File[-4:] != ".txt":
-		raise ValueError("Please only use this function on .txt files.")
-	if not os.path.isfile(In_dir+File):
-		raise ValueError(File+" not found in directory\n"+In_dir)
-
-	print "Passed bash_sort checks."
-
-	in_file_path = In_dir + File
-	out_file_path = Out_dir + File[:-4]+"_sorted.txt"
-	if Header:
-		# Save the header to out_file
-		command = "head " + in_file_path + " -n 1 > " + out_file_path
-		call([command], shell= True)
-		# Which column will be sorted by
-		sort_at = str(Col)+","+str(Col)
-		# This sorts the file, but skips the header when sorting it, and writes teh result to file
-		command = "tail -n +2 " + in_file_path + " | sort -k " + sort_at + " >> " + out_file_path
-		call([command], shell = True)
-	# Else no header
-	else:
-		# Sort the file at specified column
-		sort_at = str(Col)+","+str(Col)
-		command = "sort "+in_file_path + " -k " + sort_at + " > " + out_file_path
-		call([command], shell=True)
-
-	return out_file_path
-
-try:
-	in_FILE = bash_sort(File = in_FILE, 
-				In_dir = "",
-				Out_dir = "",
-				Col = Column_index+1,
-				Header = True)
-except BaseException:
-	raise StandardError("bash_sort failed.")
-
-f_IN = open(in_FILE, 'rb')
-line_i = 1
-for line in f_IN:
-	# Remove newline chars and split by tab
-	split_line = line.rstrip('\r\n').split('\t')
-	# First line is header, save it and look at the next line
-	if line_i == 1:
-		# If you want to keep all columns:
-		if cols_to_keep == "all":
-			# Get number of columns in header of file
-			n_cols = len(split_line)
-			# make keep_col a list of all column indeces
-			cols_to_keep = range(n_cols)
-		# For each # in keep_col list, add the corresponding column from split_line to head
-		head = [split_line[col_i] for col_i in cols_to_keep]
-		line_i = line_i + 1
-		continue
-
-	if split_line[Column_index] == "":
-		raise ValueError("Row value was empty at line: "+str(line_i)+". That's not cool.")
-
-	if row_group == "INITIATED":
-		# Initialize row_group list
-		row_group_list = list()
-		
-		# Extract the value of the first row in the col of interest
-		row_group = split_line[Column_index]
-		# Add row_group to list
-		row_group_list.append(row_group)
-		# Add which line we're at to the list
-		row_group_list.append(line_i)
-
-		# Start saving the head and 1st line of data to row_group file list
-		row_group_file = list()
-		row_group_file.append(head)
-		kept_cols = [split_line[col_i] for col_i in cols_to_keep]
-		row_group_file.append(kept_cols)
-
-	# If this line's row_group is the same as the last, add it to the row_group file list
-	elif split_line[Column_index] == row_group:
-		kept_cols = [split_line[col_i] for col_i in cols_to_keep]
-		row_group_file.append(kept_cols)
-
-	# Check if current line of file's row_group is different from the last line checked
-	elif split_line[Column_index] != row_group:
-		# Add which line was last added (now we have the first and last lines)
-		row_group_list.append(line_i-1)
-		all_row_groups.append(row_group_list)
-
-		# Write the contents of the row_group file list to a csv in its own directory
-		filename = out_DIR+row_group+"/"+row_group+".BED.csv"
-		if not os.path.exists(os.path.dirname(filename)):
-			try:
-				os.makedirs(os.path.dirname(filename))
-			except OSError as exc: # Guard against race condition
-				if exc.errno != errno.EEXIST:
-					raise
-		with open(filename, "wb") as f:
-			writer = csv.writer(f)
-			writer.writerows(row_group_file)
-
-		# Re-initialize summary list
-		row_group_list = list()
-		# Add the first row_group row to the row_group list
-		row_group = split_line[Column_index]
-		row_group_list.append(row_group)
-		row_group_list.append(line_i)
+	filename = out_DIR+row_group+"/"+row_group+EXTENSIONS[Format]
+	if not os.path.exists(os.path.dirname(filename)):
+		try:
+			os.makedirs(os.path.dirname(filename))
+		except OSError as exc: # Guard against race condition
+			if exc.errno != errno.EEXIST:
+				raise
+	return filename
 
-		# Re-initialize file list
-		row_group_file = list()
-		row_group_file.append(head)
-		kept_cols = [split_line[col_i] for col_i in cols_to_keep]
-		row_group_file.append(kept_cols)
+settings = split_settings(Column_index = Column_index,
+			Keep = Keep,
+			Format = Format,
+			Layout = Layout,
+			Interval_cols = Interval_cols,
+			Gene_table = Gene_table,
+			Row_filter = row_filter,
+			Variant_key = variant_key)
+metrics = SplitMetrics(Log_file = out_DIR+"split.metrics.jsonl" if Metrics == "on" else None,
+			In_file = in_FILE,
+			Interval_seconds = Progress_seconds,
+			Fields = {"settings": settings, "mode": Mode})
 
-	line_i = line_i + 1
-f_IN.close()
+row_group_counts, Mode, only_groups, skipped = split_by_column(In_file = in_FILE,
+			Column_index = Column_index,
+			Cols_to_keep = cols_to_keep,
+			Out_dir = out_DIR,
+			Group_path = group_path,
+			Settings = settings,
+			Metrics = metrics,
+			Mode = Mode,
+			Max_open = Max_open,
+			Flush_rows = Flush_rows,
+			N_procs = N_procs,
+			Temp_dir = Temp_dir,
+			Memory_mb = Memory_mb,
+			Format = Format,
+			Layout = Layout,
+			Store_file_mb = Store_file_mb,
+			Extents = extents,
+			Gene_table = Gene_table,
+			Store_in = store_in,
+			Groups = group_list,
+			Cache = Cache == "on",
+			Checkpoint_seconds = Checkpoint_seconds,
+			Resume = Resume == "on",
+			Row_filter = row_filter,
+			Variant_key = variant_key)
 
-for row_group in all_row_groups:
-	print row_group[0]+": "+str(row_group[2]-row_group[1]+1)+" element(s)."
+for row_group in row_group_counts:
+	print row_group[0]+": "+str(row_group[1])+" element(s)."
 print "Completed folderize_by_column.py"
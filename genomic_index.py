@@ -0,0 +1,487 @@
+#/usr/bin/python
+
+# genomic_index.py
+# 2026_10_18
+
+### Genomic interval index over split eQTL shards.
+###
+###  The splitters (see fileize_by_column.py --interval_cols) write an index
+###  with one line per gene:
+###    chr	start	end	tss	group	location
+###  sorted by chromosome, then start. IntervalIndex loads it and answers
+###  "which genes are within Window bp of these positions?" with bisect,
+###  instead of looping over every gene.
+###
+###  Example usage:
+###    index = IntervalIndex("/my_directory/eQTLs/Liver/intervals.idx")
+###    genes = index.genes_near("1", [109817590, 109274570], Window=1e5)
+###
+###  Variant keys pack a variant's chromosome, position, and (optionally) a hash
+###  of its alleles into one 64-bit integer (see variant_key), so joins and range
+###  filters compare integers instead of "chr:pos" strings. The splitters can
+###  write them as an extra column (see VariantKey).
+###
+###  PositionBins groups rows by chromosome and fixed-size position bin instead,
+###  for splitting a GWAS table into bins (see bin_by_position.py); its
+###  bins.idx is an interval index too, with one line per bin.
+
+import zlib
+from bisect import bisect_left, bisect_right
+from helper_functions import chromosome_rank
+
+INTERVAL_INDEX_COLUMNS = ["chr", "start", "end", "tss", "group", "location"]
+# Names of the chromosomes past 22 (see chromosome_code)
+CHROMOSOME_NAMES = {23: "X", 24: "Y", 25: "XY", 26: "MT"}
+# Variant key bits, from the top: chromosome code, position, allele hash (see variant_key)
+KEY_CHR_SHIFT = 58
+KEY_POSITION_BITS = 30
+KEY_ALLELE_BITS = 28
+# Key written for rows without a usable chromosome and position
+MISSING_KEY = -1
+
+
+def normalize_chromosome(Chr):
+	""" Return a chromosome name without a leading 'chr' (so 'chr1' and '1' match).
+	"""
+	if Chr[:3].lower() == "chr":
+		return Chr[3:]
+	return Chr
+
+def chromosome_code(Chr):
+	""" Return a chromosome's number (1-22, X = 23, Y = 24, XY = 25, MT = 26), or None if it isn't one.
+	"""
+	rank = chromosome_rank(Chr)
+	if rank[1] != "":
+		return None
+	return rank[0]
+
+def chromosome_name(Code):
+	""" Return the name of a chromosome number from chromosome_code ("1" to "22", "X", "Y", "XY", or "MT").
+	"""
+	return CHROMOSOME_NAMES.get(Code, str(Code))
+
+
+def allele_hash(Ref, Alt):
+	""" Return a KEY_ALLELE_BITS bit hash of a variant's alleles (case doesn't matter).
+	"""
+	return zlib.crc32(Ref.upper()+">"+Alt.upper()) & ((1 << KEY_ALLELE_BITS) - 1)
+
+def variant_key(Chr, Pos, Ref=None, Alt=None):
+	""" Return the 64-bit integer key of a variant, or None if its chromosome or position isn't usable.
+
+		The chromosome code (see chromosome_code) is in the top bits, then the
+		position, then a hash of the alleles (0 if Ref and Alt aren't given), so
+		keys sort by chromosome, then position. Positions need to be < 2^30.
+	"""
+	code = chromosome_code(Chr)
+	try:
+		pos = int(Pos)
+	except ValueError:
+		return None
+	if code is None or pos < 0 or pos >= 1 << KEY_POSITION_BITS:
+		return None
+	key = (code << KEY_CHR_SHIFT) | (pos << KEY_ALLELE_BITS)
+	if Ref is not None and Alt is not None:
+		key = key | allele_hash(Ref, Alt)
+	return key
+
+def key_code(Key):
+	""" Return the chromosome code of a variant key.
+	"""
+	return Key >> KEY_CHR_SHIFT
+
+def key_chromosome(Key):
+	""" Return the chromosome name of a variant key ("1" to "22", "X", "Y", "XY", or "MT").
+	"""
+	return chromosome_name(Key >> KEY_CHR_SHIFT)
+
+def key_position(Key):
+	return (Key >> KEY_ALLELE_BITS) & ((1 << KEY_POSITION_BITS) - 1)
+
+def key_range(Chr, Start, End):
+	""" Return [lowest, highest] variant key at positions Start to End on Chr (whatever
+		the alleles), so a range filter is lowest <= key <= highest, or None if Chr isn't usable.
+	"""
+	lowest = variant_key(Chr, max(Start, 0))
+	if lowest is None:
+		return None
+	highest = variant_key(Chr, min(End, (1 << KEY_POSITION_BITS) - 1))
+	return [lowest, highest | ((1 << KEY_ALLELE_BITS) - 1)]
+
+
+class VariantKey(object):
+	""" Derive each row's variant key (see variant_key) from its columns.
+
+		Pass as the Variant_key of the splitters (see split_functions.row_projection)
+		to write the key as an extra, last column. Rows without a usable
+		chromosome and position get MISSING_KEY, so the column stays integers
+		(an int64 array in npz output).
+
+		Arguments:
+			Chr_col:	integer. Column with the chromosome [0 = first column]
+			Pos_col:	integer. Column with the position
+			Ref_col:	integer or None. Column with the reference allele
+			Alt_col:	integer or None. Column with the alternate allele (the key
+							includes a hash of the alleles if both are given)
+			Name:		name of the key column
+	"""
+	def __init__(self, Chr_col, Pos_col, Ref_col=None, Alt_col=None, Name="variant_key"):
+		for col_i in [Chr_col, Pos_col] + [col_i for col_i in [Ref_col, Alt_col] if col_i is not None]:
+			if type(col_i) is not int or col_i < 0:
+				raise ValueError("Variant key columns need to be integers >= 0, instead got: "+str(col_i))
+		if (Ref_col is None) != (Alt_col is None):
+			raise ValueError("Please give both allele columns, or neither.")
+		self.chr_col = Chr_col
+		self.pos_col = Pos_col
+		self.ref_col = Ref_col
+		self.alt_col = Alt_col
+		self.name = Name
+		# Chromosome value -> its key bits, or None (there are few distinct values)
+		self.chr_bits = dict()
+
+	def columns(self):
+		""" Return the columns a row's key is read from.
+		"""
+		cols = [self.chr_col, self.pos_col]
+		if self.ref_col is not None:
+			cols = cols + [self.ref_col, self.alt_col]
+		return cols
+
+	def key(self, Split_line):
+		""" Return the key of a row (a list of its fields), or MISSING_KEY if it has none.
+		"""
+		chrom = Split_line[self.chr_col]
+		if chrom in self.chr_bits:
+			chr_bits = self.chr_bits[chrom]
+		else:
+			code = chromosome_code(chrom)
+			chr_bits = code << KEY_CHR_SHIFT if code is not None else None
+			self.chr_bits[chrom] = chr_bits
+		if chr_bits is None:
+			return MISSING_KEY
+		try:
+			pos = int(Split_line[self.pos_col])
+		except ValueError:
+			return MISSING_KEY
+		if pos < 0 or pos >= 1 << KEY_POSITION_BITS:
+			return MISSING_KEY
+		if self.ref_col is None:
+			return chr_bits | (pos << KEY_ALLELE_BITS)
+		return chr_bits | (pos << KEY_ALLELE_BITS) | allele_hash(Split_line[self.ref_col], Split_line[self.alt_col])
+
+	def text(self, Split_line):
+		""" Return the key of a row as a string, for writing.
+		"""
+		return str(self.key(Split_line))
+
+	def describe(self):
+		""" Return the key's columns as a string, e.g. for a split's settings.
+		"""
+		return ",".join([str(col_i) for col_i in self.columns()])
+
+def parse_variant_key(Spec):
+	""" Make a VariantKey from a command line option: "chr#,pos#" or "chr#,pos#,ref#,alt#".
+	"""
+	split_cols = Spec.split(",")
+	if len(split_cols) not in [2, 4] or not all(col.isdigit() for col in split_cols):
+		raise ValueError("Expected the variant key columns to look like chr#,pos# or chr#,pos#,ref#,alt#, instead got: "+Spec)
+	cols = [int(col) for col in split_cols]
+	if len(cols) == 2:
+		return VariantKey(Chr_col = cols[0], Pos_col = cols[1])
+	return VariantKey(Chr_col = cols[0], Pos_col = cols[1], Ref_col = cols[2], Alt_col = cols[3])
+
+
+class PositionBins(object):
+	""" Group rows by chromosome and fixed-size position bin.
+
+		Pass as the Group_key of the splitters (see split_functions.hash_split)
+		to split a table into bins. A row's group is "chr_bin", e.g. "1_109" for
+		chromosome 1, positions 109000000 to 109999999 (with Bin_bp 1000000).
+		Chromosomes are named as chromosome_name does, so 'chr23', '23' and 'X'
+		share bins. Rows on other chromosomes (e.g. unplaced contigs), or whose
+		position isn't a number, have no group.
+
+		Arguments:
+			Chr_col:	integer. Column with the chromosome [0 = first column]
+			Pos_col:	integer. Column with the position
+			Bin_bp:		integer > 0. Width of each bin.
+	"""
+	def __init__(self, Chr_col, Pos_col, Bin_bp=1000000):
+		if type(Chr_col) is not int or Chr_col < 0 or type(Pos_col) is not int or Pos_col < 0:
+			raise ValueError("Chr_col and Pos_col need to be integers >= 0.")
+		if type(Bin_bp) is not int or Bin_bp < 1:
+			raise ValueError("Bin_bp needs to be an integer > 0.")
+		self.chr_col = Chr_col
+		self.pos_col = Pos_col
+		self.bin_bp = Bin_bp
+		# Chromosome value -> its name, or None (there are few distinct values)
+		self.chr_names = dict()
+
+	def columns(self):
+		""" Return the columns a row's bin is read from.
+		"""
+		return [self.chr_col, self.pos_col]
+
+	def key(self, Split_line):
+		""" Return the bin of a row (a list of its fields), or None if it has none.
+		"""
+		chrom = Split_line[self.chr_col]
+		if chrom in self.chr_names:
+			name = self.chr_names[chrom]
+		else:
+			code = chromosome_code(chrom)
+			name = chromosome_name(code) if code is not None else None
+			self.chr_names[chrom] = name
+		if name is None:
+			return None
+		try:
+			pos = int(Split_line[self.pos_col])
+		except ValueError:
+			return None
+		if pos < 0:
+			return None
+		return name+"_"+str(pos/self.bin_bp)
+
+	def bin_name(self, Code, Bin_i):
+		""" Return the name of bin Bin_i (position/Bin_bp) on chromosome number Code.
+		"""
+		return chromosome_name(Code)+"_"+str(Bin_i)
+
+	def bins(self, Chr, Start, End):
+		""" Return the names of the bins overlapping [Start, End] on Chr, in order
+			(an empty list if Chr isn't a chromosome chromosome_code knows).
+		"""
+		code = chromosome_code(Chr)
+		if code is None or End < Start:
+			return []
+		return [self.bin_name(code, bin_i) for bin_i in range(max(Start, 0)/self.bin_bp, End/self.bin_bp + 1)]
+
+
+class GroupExtents(object):
+	""" Track the chromosome and the smallest and largest position of each group's rows.
+
+		The splitters call add() on every row. If a group's rows fall on more
+		than one chromosome, the chromosome with the most rows is used.
+
+		Arguments:
+			Chr_col:	integer. Input column with the chromosome [0 = first column]
+			Pos_col:	integer. Input column with the position
+	"""
+	def __init__(self, Chr_col, Pos_col):
+		if type(Chr_col) is not int or Chr_col < 0 or type(Pos_col) is not int or Pos_col < 0:
+			raise ValueError("Chr_col and Pos_col need to be integers >= 0.")
+		self.chr_col = Chr_col
+		self.pos_col = Pos_col
+		# group -> {chr: [min position, max position, n_rows]}
+		self.extents = dict()
+
+	def add(self, Group, Split_line):
+		try:
+			pos = int(Split_line[self.pos_col])
+		except ValueError:
+			# e.g. NA positions
+			return
+		chr_extents = self.extents.setdefault(Group, dict())
+		chrom = normalize_chromosome(Split_line[self.chr_col])
+		if chrom not in chr_extents:
+			chr_extents[chrom] = [pos, pos, 1]
+		else:
+			extent = chr_extents[chrom]
+			if pos < extent[0]:
+				extent[0] = pos
+			if pos > extent[1]:
+				extent[1] = pos
+			extent[2] = extent[2] + 1
+
+	def update(self, Other):
+		""" Add the extents tracked by another GroupExtents (e.g. from a worker process).
+		"""
+		for group, chr_extents in Other.extents.items():
+			mine = self.extents.setdefault(group, dict())
+			for chrom, extent in chr_extents.items():
+				if chrom not in mine:
+					mine[chrom] = list(extent)
+				else:
+					mine[chrom] = [min(mine[chrom][0], extent[0]), max(mine[chrom][1], extent[1]),
+						mine[chrom][2] + extent[2]]
+
+	def add_extent(self, Group, Chr, Start, End, N_rows):
+		""" Add a chromosome extent (e.g. one saved with extent_rows) to Group.
+		"""
+		other = GroupExtents(self.chr_col, self.pos_col)
+		other.extents[Group] = {Chr: [Start, End, N_rows]}
+		self.update(other)
+
+	def extent_rows(self):
+		""" Return every extent as [group, chr, start, end, n_rows].
+		"""
+		return [[group, chrom] + extent for group, chr_extents in self.extents.items()
+			for chrom, extent in chr_extents.items()]
+
+	def get(self, Group):
+		""" Return [chr, start, end] for Group, or None if it had no usable positions.
+		"""
+		if Group not in self.extents or len(self.extents[Group]) == 0:
+			return None
+		chr_extents = self.extents[Group]
+		chrom = max(chr_extents.keys(), key=lambda chrom: chr_extents[chrom][2])
+		return [chrom, chr_extents[chrom][0], chr_extents[chrom][1]]
+
+	def split_chromosome_groups(self):
+		""" Return the groups whose rows fall on more than one chromosome.
+		"""
+		return [group for group, chr_extents in self.extents.items() if len(chr_extents) > 1]
+
+
+def read_gene_table(File):
+	""" Read a tab delimited gene table with a header and columns: gene, chr, TSS, TES.
+
+		If a gene is listed more than once, its most common TSS is used
+		(as make_gene_trait_tables.R does), with the TES from that row.
+
+		Returns: dictionary of gene -> [chr, TSS, TES]
+	"""
+	rows = dict()
+	with open(File, 'rb') as f_IN:
+		f_IN.readline()
+		for line in f_IN:
+			split_line = line.rstrip('\r\n').split('\t')
+			try:
+				tss = int(split_line[2])
+				tes = int(split_line[3])
+			except (ValueError, IndexError):
+				continue
+			rows.setdefault(split_line[0], list()).append([normalize_chromosome(split_line[1]), tss, tes])
+	genes = dict()
+	for gene, gene_rows in rows.items():
+		tss_counts = dict()
+		for row in gene_rows:
+			tss_counts[row[1]] = tss_counts.get(row[1], 0) + 1
+		tss = max(tss_counts.keys(), key=lambda tss: tss_counts[tss])
+		genes[gene] = [row for row in gene_rows if row[1] == tss][0]
+	return genes
+
+
+def write_interval_index(Path, Groups, Locations, Extents=None, Gene_table=None, Meta=None):
+	""" Write the interval index for the split groups.
+
+		A group's interval comes from Gene_table (TSS to TES) if it is listed
+		there, otherwise from the positions of its rows (Extents). Groups with
+		neither are left out.
+
+		Meta lines (e.g. how a table was binned) go before the header, as
+		"#name	value	..." (see IntervalIndex.meta).
+
+		Arguments:
+			Path:		"/my_directory/intervals.idx" file to write
+			Groups:		list of groups that were split out
+			Locations:	dictionary of group -> where its rows are (e.g. a shard filepath)
+			Extents:	GroupExtents or None
+			Gene_table:	dictionary from read_gene_table or None
+			Meta:		list of [name, value, ...] or None
+
+		Returns: the number of groups written to the index
+	"""
+	entries = list()
+	for group in Groups:
+		if Gene_table is not None and group in Gene_table:
+			chrom, tss, tes = Gene_table[group]
+			entry = [chrom, min(tss, tes), max(tss, tes), tss]
+		elif Extents is not None and Extents.get(group) is not None:
+			chrom, start, end = Extents.get(group)
+			entry = [chrom, start, end, "NA"]
+		else:
+			continue
+		entries.append(entry + [group, Locations[group]])
+	entries.sort(key=lambda entry: (chromosome_rank(entry[0]), entry[1], entry[2]))
+	with open(Path, 'wb') as f_OUT:
+		for meta in (Meta if Meta is not None else list()):
+			f_OUT.write("#"+"\t".join([str(value) for value in meta])+"\n")
+		f_OUT.write("\t".join(INTERVAL_INDEX_COLUMNS)+"\n")
+		for entry in entries:
+			f_OUT.write("\t".join([str(value) for value in entry])+"\n")
+	return len(entries)
+
+
+class IntervalIndex(object):
+	""" Look up groups (genes) by genomic position, from an index written by write_interval_index.
+
+		Arguments:
+			Path:		"/my_directory/intervals.idx"
+			Use_tss:	boolean. If True, each gene's interval is just its TSS (as in
+							make_gene_trait_tables.R); genes without a TSS are left out.
+	"""
+	def __init__(self, Path, Use_tss=False):
+		# chr -> lists sorted by start
+		self.starts = dict()
+		self.ends = dict()
+		self.groups = dict()
+		# chr -> longest interval, bounds how far back a bisect has to look
+		self.max_length = dict()
+		self.locations = dict()
+		# group -> [chr, start, end]
+		self.intervals = dict()
+		# name -> list of values, from the meta lines before the header
+		self.meta = dict()
+		with open(Path, 'rb') as f_IN:
+			head = f_IN.readline().rstrip('\r\n').split('\t')
+			while head[0][:1] == "#":
+				self.meta[head[0][1:]] = head[1:]
+				head = f_IN.readline().rstrip('\r\n').split('\t')
+			if head != INTERVAL_INDEX_COLUMNS:
+				raise ValueError(Path+" doesn't look like an interval index. Header was: "+str(head))
+			entries = list()
+			for line in f_IN:
+				chrom, start, end, tss, group, location = line.rstrip('\r\n').split('\t')
+				if Use_tss:
+					if tss == "NA":
+						continue
+					start = end = tss
+				entries.append([chrom, int(start), int(end), group])
+				self.locations[group] = location
+				self.intervals[group] = [chrom, int(start), int(end)]
+		entries.sort(key=lambda entry: (entry[0], entry[1]))
+		for chrom, start, end, group in entries:
+			if chrom not in self.starts:
+				self.starts[chrom] = list()
+				self.ends[chrom] = list()
+				self.groups[chrom] = list()
+				self.max_length[chrom] = 0
+			self.starts[chrom].append(start)
+			self.ends[chrom].append(end)
+			self.groups[chrom].append(group)
+			self.max_length[chrom] = max(self.max_length[chrom], end - start)
+
+	def overlapping(self, Chr, Start, End):
+		""" Return the groups whose interval overlaps [Start, End] on Chr, ordered by start.
+		"""
+		chrom = normalize_chromosome(Chr)
+		if chrom not in self.starts:
+			return []
+		starts = self.starts[chrom]
+		ends = self.ends[chrom]
+		lo = bisect_left(starts, Start - self.max_length[chrom])
+		hi = bisect_right(starts, End)
+		return [self.groups[chrom][i] for i in range(lo, hi) if ends[i] >= Start]
+
+	def genes_near(self, Chr, Positions, Window):
+		""" Return the groups within Window bp of any of Positions on Chr (each group once).
+		"""
+		found = list()
+		seen = set()
+		for pos in sorted(Positions):
+			for group in self.overlapping(Chr, pos - Window, pos + Window):
+				if group not in seen:
+					seen.add(group)
+					found.append(group)
+		return found
+
+	def interval(self, Group):
+		""" Return [chr, start, end] of Group, or None if it isn't in the index.
+		"""
+		return self.intervals.get(Group)
+
+	def location(self, Group):
+		""" Return where Group's rows are (as recorded when the index was written).
+		"""
+		return self.locations[Group]
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+
+### get_sentinel_snps.py
+### 2026_10_18
+
+### This script finds the sentinel SNPs of a GWAS file: the SNPs with the
+###  smallest p-value in each region of the genome, each at least --range bp
+###  from the others (the same greedy rule as get_sentinal_snp_regions in import.R).
+###  The file is read once, and only its significant rows are held in memory.
+###
+###  Arguments:
+###    input_file.txt: GWAS summary statistics txt (or txt.gz) file
+###	 valid filepath
+###    Chr_col#,Pos_col#,PV_col#: the chromosome, position, and p-value columns
+###	 integers (0 = first column)
+###    output_file.txt: where the sentinel SNP rows are written
+###      (header, then rows ordered by chromosome then p-value)
+###
+###  Assumptions:
+###    There is a single line header
+###
+###  Options:
+###    --range #: how far apart sentinel SNPs need to be (default 900000)
+###    --cutoff #: largest p-value considered genome-wide significant (default 5e-8)
+###    --sep tab|space|comma: column separator; space splits on any whitespace (default tab)
+###    --n_procs #: with a bgzip input file, the number of processes decompressing it (default 1)
+###
+###  Usage:
+###    python get_sentinel_snps.py gwas.txt.gz 0,1,7 sentinels.txt [--range 100000]
+
+import sys
+import os
+from helper_functions import get_command_args
+from sentinel_functions import read_significant_snps, clump_sentinel_snps
+
+SEPARATORS = {"tab": "\t", "space": None, "comma": ","}
+
+print "Initiating get_sentinel_snps.py"
+print "Argument List:", str(sys.argv[1:])
+
+if (len(sys.argv) < 4):
+	raise Exception("Expected at least three command arguments.")
+in_FILE = str(sys.argv[1])
+Cols = str(sys.argv[2])
+out_FILE = str(sys.argv[3])
+options = get_command_args(sys.argv[4:])
+Range = float(options.get("range", 9e5))
+Cutoff_PV = float(options.get("cutoff", 5e-8))
+Sep = options.get("sep", "tab")
+N_procs = int(options.get("n_procs", 1))
+
+if not (os.path.isfile(in_FILE)):
+	raise ValueError(in_FILE+" not found. Is it a *full* and valid file path?")
+split_cols = Cols.split(",")
+if len(split_cols) != 3 or not all(col.isdigit() for col in split_cols):
+	raise ValueError("Expected 2nd command argument to look like Chr_col#,Pos_col#,PV_col#, instead got: "+Cols)
+chr_col, pos_col, pv_col = [int(col) for col in split_cols]
+if not os.path.isdir(os.path.dirname(os.path.abspath(out_FILE))):
+	raise ValueError("The directory of "+out_FILE+" wasn't found.")
+if Range < 0:
+	raise ValueError("--range needs to be >= 0.")
+if Sep not in SEPARATORS:
+	raise ValueError("Expected --sep to be one of "+str(SEPARATORS.keys())+", instead got: "+Sep)
+if N_procs < 1:
+	raise ValueError("--n_procs needs to be an integer > 0.")
+
+print "Passed script checks."
+
+snps = read_significant_snps(File = in_FILE,
+			Chr_col = chr_col,
+			Pos_col = pos_col,
+			PV_col = pv_col,
+			Cutoff_PV = Cutoff_PV,
+			Sep = SEPARATORS[Sep],
+			N_procs = N_procs)
+print str(len(snps))+" SNP(s) with p-value <= "+str(Cutoff_PV)+"."
+
+sentinels = clump_sentinel_snps(Snps = snps, Range = Range)
+
+with open(out_FILE, 'wb') as f_OUT:
+	f_OUT.write(snps.head)
+	for i in sentinels:
+		f_OUT.write(snps.lines[i])
+print "Wrote "+str(len(sentinels))+" sentinel SNP(s) to "+out_FILE
+print "Completed get_sentinel_snps.py"
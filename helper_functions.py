@@ -9,6 +9,14 @@
 import os
 from subprocess import call
 import gzip
+import zlib
+import heapq
+import shutil
+import struct
+import tempfile
+import multiprocessing
+from collections import deque
+from job_functions import get_executor
 
 
 def remove_all(array, element):
@@ -38,6 +46,31 @@ def index_all(array, element):
 	matched_indices = [i for i, x in enumerate(array)if x == element]
 	return matched_indices
 
+def get_command_args(Args):
+	""" Return '--option value' command line arguments as a dictionary.
+
+		If a script is called as such:
+		>python my_fav_script.py --option1 value1 --option2 value2
+
+		and passes sys.argv[1:] into this function, the values may be
+		extracted by: dictionary["option1"]
+
+		Arguments:
+			Args: list of strings, e.g. sys.argv[1:]
+	"""
+	if type(Args) is not list:
+		raise ValueError("Args needs to be a list of strings.")
+	options = dict()
+	i = 0
+	while i < len(Args):
+		if Args[i][:2] != "--" or len(Args[i]) == 2:
+			raise ValueError("Expected '--option value', but saw: "+Args[i])
+		if i+1 == len(Args) or Args[i+1][:2] == "--":
+			raise ValueError("No value given for: "+Args[i])
+		options[Args[i][2:]] = Args[i+1]
+		i = i + 2
+	return options
+
 def make_scisub_job_command(
 	Script,
 	ScriptDir,
@@ -138,8 +171,8 @@ def submit_scisub_job(Command):
 	if Command[1] != "IS_SCISUB_COMMAND":
 		raise ValueError("Command isn't from make_scisub_job_command...(where is 'IS_SCISUB_COMMAND'?)")
 
-	# Submit a system command
-	call([Command[0]],shell=True)
+	# Submit through the current executor (bsub by default, see job_functions.set_executor)
+	get_executor().submit(Command[0])
 
 def make_consign_job_command(
 	Script,
@@ -227,8 +260,8 @@ def submit_consign_job(Command):
 	if Command[1] != "IS_CONSIGN_COMMAND":
 		raise ValueError("Command isn't from make_consign_job_command...(where is 'IS_CONSIGN_COMMAND'?)")
 
-	# Submit a system command
-	call([Command[0]],shell=True)
+	# Submit through the current executor (bsub by default, see job_functions.set_executor)
+	get_executor().submit(Command[0])
 
 def gz_head(File, Dir="", Lines=10):
 	""" Preview top Lines of a file.gz
@@ -290,8 +323,8 @@ def my_head(File, Dir="", Lines=10):
 
 	path = Dir+File
 	with open(path, 'rb') as the_file:
-		content = the_file.readlines()
-		for line in content:
+		# Read lazily, only as far as needed
+		for line in the_file:
 			if Lines == 0:
 				break
 			# Remove newline chars and split by tab
@@ -299,8 +332,11 @@ def my_head(File, Dir="", Lines=10):
 			print line
 			Lines = Lines-1
 
-def bash_sort(File, In_dir, Out_dir, Col, Header = True):
-	""" Bash sort a file, return location of sorted file.
+def bash_sort(File, In_dir, Out_dir, Col, Header = True, Memory_mb = 1024, Temp_dir = "", N_procs = 1):
+	""" Sort a file by a column, return location of sorted file.
+
+		(This used to shell out to 'sort'. It now uses external_sort, so it
+		works on paths with spaces and has a memory budget.)
 
 		Arguments:
 			File: 	"my_fav_file.txt"
@@ -308,17 +344,21 @@ def bash_sort(File, In_dir, Out_dir, Col, Header = True):
 			Out_dir:"/some_dir" where sorted file is saved
 			Col:	integer. Which column to sort by? [1 = first column]
 			Header: boolean. Does the file have a header?
+			Memory_mb:	integer > 0. See external_sort.
+			Temp_dir:	"/scratch_dir/" See external_sort.
+			N_procs:	integer > 0. See external_sort.
 
 		Assumptions:
-			File is not gz-zipped (or compressed at all)
-			File ends in '.'txt'
+			File ends in '.txt', '.gz', or '.bgz' (gzip and bgzip files are decompressed
+				on the fly, the sorted file is not compressed)
+			File is tab delimited
 			File has a single lined header, or no header
 
 		Returns: filepath of the sorted file
 	"""
 	if type(File) is not str or type(In_dir) is not str or type(Out_dir) is not str:
 		raise ValueError("File, In_dir, and Out_dir need to be strings.")
-	if type(Col) is not int or Col < 0:
+	if type(Col) is not int or Col < 1:
 		raise ValueError("Col needs to be an integer > 0.")
 	if len(In_dir) > 0:	
 		if not (os.path.isdir(In_dir)):
@@ -330,34 +370,664 @@ def bash_sort(File, In_dir, Out_dir, Col, Header = True):
 			raise ValueError(Out_dir+" not found.")
 		if Out_dir[-1] != "/":
 			raise ValueError("Out_dir needs to end with a forward slash.")
-	if File[-4:] != ".txt":
-		raise ValueError("Please only use this function on .txt files.")
+	if File[-4:] != ".txt" and File[-3:] != ".gz" and File[-4:] != ".bgz":
+		raise ValueError("Please only use this function on .txt, .gz, or .bgz files.")
 	if not os.path.isfile(In_dir+File):
 		raise ValueError(File+" not found in directory\n"+In_dir)
 
 	print "Passed bash_sort checks."
 
 	in_file_path = In_dir + File
-	out_file_path = Out_dir + File[:-4]+"_sorted.txt"
+	out_file_path = Out_dir + strip_extension(File)+"_sorted.txt"
 	print out_file_path
-	if Header:
-		# Save the header to out_file
-		command = "head " + in_file_path + " -n 1 > " + out_file_path
-		print "bash_sort command looks like: \n"+command
-		call([command], shell= True)
-		# Which column will be sorted by
-		sort_at = str(Col)+","+str(Col)
-		# This sorts the file, but skips the header when sorting it, and writes teh result to file
-		command = "tail -n +2 " + in_file_path + " | sort -k " + sort_at + " >> " + out_file_path
-		print "bash_sort command looks like: \n"+command
-		call([command], shell = True)
-	# Else no header
-	else:
-		# Sort the file at specified column
-		sort_at = str(Col)+","+str(Col)
-		command = "sort "+in_file_path + " -k " + sort_at + " > " + out_file_path
-		print "bash_sort command looks like: \n"+command
-		call([command], shell=True)
+	external_sort(File = in_file_path,
+		Out_file = out_file_path,
+		Key_cols = [Col-1],
+		Header = Header,
+		Memory_mb = Memory_mb,
+		Temp_dir = Temp_dir,
+		N_procs = N_procs)
 
 	return out_file_path
 
+def strip_extension(File):
+	""" Return File without its '.txt', '.gz', '.bgz', or '.txt.gz' extension.
+	"""
+	for extension in [".gz", ".bgz"]:
+		if File[-len(extension):] == extension:
+			File = File[:-len(extension)]
+			break
+	if File[-4:] == ".txt":
+		File = File[:-4]
+	return File
+
+def is_gzipped(File):
+	""" Return True if File starts with the gzip magic number (this includes bgzip files).
+	"""
+	with open(File, 'rb') as f:
+		return f.read(2) == "\x1f\x8b"
+
+def is_bgzf(File):
+	""" Return True if File is a bgzip (BGZF) file, made by e.g. 'bgzip' or 'tabix'.
+	"""
+	with open(File, 'rb') as f:
+		header = f.read(18)
+	# gzip magic, deflate, FEXTRA flag, and a 'BC' extra subfield
+	return (len(header) == 18 and header[:4] == "\x1f\x8b\x08\x04"
+			and header[12:14] == "BC")
+
+def read_bgzf_block(f_IN):
+	""" Read the next BGZF block from an open file.
+
+		Returns: [compressed_data, uncompressed_size], or None at the end of the file.
+	"""
+	header = f_IN.read(12)
+	if len(header) < 12:
+		return None
+	if header[:4] != "\x1f\x8b\x08\x04":
+		raise ValueError("Not a BGZF block at byte: "+str(f_IN.tell()-len(header)))
+	xlen = struct.unpack("<H", header[10:12])[0]
+	extra = f_IN.read(xlen)
+	block_size = None
+	i = 0
+	while i < xlen:
+		# Each extra subfield: SI1, SI2, SLEN, data
+		slen = struct.unpack("<H", extra[i+2:i+4])[0]
+		if extra[i:i+2] == "BC":
+			block_size = struct.unpack("<H", extra[i+4:i+6])[0] + 1
+		i = i + 4 + slen
+	if block_size is None:
+		raise ValueError("BGZF block is missing its BC subfield.")
+	cdata = f_IN.read(block_size - 12 - xlen - 8)
+	isize = struct.unpack("<I", f_IN.read(8)[4:])[0]
+	return [cdata, isize]
+
+def get_bgzf_blocks(File):
+	""" Return the byte offset of every BGZF block in File (only block headers are read).
+	"""
+	offsets = list()
+	size = os.path.getsize(File)
+	with open(File, 'rb') as f_IN:
+		at = 0
+		while at < size:
+			offsets.append(at)
+			header = f_IN.read(12)
+			xlen = struct.unpack("<H", header[10:12])[0]
+			extra = f_IN.read(xlen)
+			block_size = None
+			i = 0
+			while i < xlen:
+				slen = struct.unpack("<H", extra[i+2:i+4])[0]
+				if extra[i:i+2] == "BC":
+					block_size = struct.unpack("<H", extra[i+4:i+6])[0] + 1
+				i = i + 4 + slen
+			if block_size is None:
+				raise ValueError(File+" has a block without a BC subfield. Is it a bgzip file?")
+			at = at + block_size
+			f_IN.seek(at)
+	return offsets
+
+def _inflate_bgzf_blocks(Blocks):
+	""" Decompress a list of BGZF block payloads, return the joined data.
+	"""
+	return "".join([zlib.decompress(cdata, -15) for cdata in Blocks])
+
+def read_bgzf_lines(File, Start, End):
+	""" Yield the lines of a bgzip file that belong to the blocks in [Start, End).
+
+		Start and End are block offsets (see get_bgzf_blocks). The line that
+		begins a range belongs to the range before it, and a range reads past
+		End to finish its last line, so splitting a file into consecutive
+		ranges yields every line exactly once. The very first line of the
+		file (the header) is never yielded.
+	"""
+	with open(File, 'rb') as f_IN:
+		f_IN.seek(Start)
+		at = Start
+		# Uncompressed bytes in the blocks this range owns (final once at >= End)
+		owned = 0
+		# Uncompressed position of buffer[0], relative to the start of the range
+		buffer_at = 0
+		buffer = ""
+		skipped_first = False
+		while True:
+			block = read_bgzf_block(f_IN)
+			if block is not None:
+				data = zlib.decompress(block[0], -15)
+				if at < End:
+					owned = owned + len(data)
+				at = f_IN.tell()
+				buffer = buffer + data
+			lines = buffer.split("\n")
+			# The last piece is unfinished unless the file has ended
+			if block is not None:
+				buffer = lines.pop()
+			else:
+				buffer = ""
+				if lines[-1] == "":
+					lines.pop()
+			for line in lines:
+				line_at = buffer_at
+				buffer_at = buffer_at + len(line) + 1
+				if not skipped_first:
+					skipped_first = True
+					continue
+				if line_at > owned:
+					return
+				yield line + "\n"
+			if block is None:
+				return
+
+# The empty block that marks the end of a bgzip file
+BGZF_EOF = ("\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00\x1b\x00"
+			+"\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00")
+# Most uncompressed bytes put in one BGZF block (same as bgzip)
+BGZF_BLOCK_SIZE = 0xff00
+
+def make_bgzf_block(Data):
+	""" Compress Data (at most BGZF_BLOCK_SIZE bytes) into one BGZF block.
+	"""
+	compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+	cdata = compressor.compress(Data) + compressor.flush()
+	# BSIZE is the total block size minus 1 (header 18 + data + footer 8)
+	header = ("\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+			+struct.pack("<H", 18+len(cdata)+8-1))
+	footer = struct.pack("<II", zlib.crc32(Data) & 0xffffffff, len(Data))
+	return header + cdata + footer
+
+class BgzfWriter(object):
+	""" Write a bgzip (BGZF) file, readable by zcat, bgzip, tabix, and R.
+
+		Arguments:
+			File:	"/my_directory/my_fav_file.txt.gz", or a file opened for writing
+						(which is left open by close())
+			Mode:	"wb" to start a new file, "ab" to append to an existing bgzip file
+	"""
+	def __init__(self, File, Mode="wb"):
+		self.owns_file = not hasattr(File, "write")
+		if not self.owns_file:
+			self.f = File
+		elif Mode == "ab" and os.path.isfile(File):
+			self.f = open(File, "r+b")
+			self.f.seek(0, 2)
+			# Drop the end of file marker, it is written again on close()
+			if self.f.tell() >= len(BGZF_EOF):
+				self.f.seek(-len(BGZF_EOF), 2)
+				if self.f.read() == BGZF_EOF:
+					self.f.seek(-len(BGZF_EOF), 2)
+					self.f.truncate()
+			self.f.seek(0, 2)
+		else:
+			self.f = open(File, "wb")
+		self.buffer = ""
+
+	def write(self, Data):
+		self.buffer = self.buffer + Data
+		while len(self.buffer) >= BGZF_BLOCK_SIZE:
+			self.f.write(make_bgzf_block(self.buffer[:BGZF_BLOCK_SIZE]))
+			self.buffer = self.buffer[BGZF_BLOCK_SIZE:]
+
+	def close(self):
+		if len(self.buffer) > 0:
+			self.f.write(make_bgzf_block(self.buffer))
+			self.buffer = ""
+		self.f.write(BGZF_EOF)
+		if self.owns_file:
+			self.f.close()
+
+def write_bgzf_index(File):
+	""" Write File.gzi, the block index 'bgzip -r' makes, for a bgzip file.
+
+		The index lets 'bgzip -b' (and htslib) seek to any uncompressed offset.
+
+		Returns: filepath of the index
+	"""
+	entries = list()
+	uncompressed = 0
+	with open(File, 'rb') as f_IN:
+		while True:
+			at = f_IN.tell()
+			block = read_bgzf_block(f_IN)
+			if block is None:
+				break
+			# The first block is implied
+			if at > 0:
+				entries.append(struct.pack("<QQ", at, uncompressed))
+			uncompressed = uncompressed + block[1]
+	with open(File+".gzi", 'wb') as f_OUT:
+		f_OUT.write(struct.pack("<Q", len(entries)))
+		f_OUT.write("".join(entries))
+	return File+".gzi"
+
+class BgzfReader(object):
+	""" Read a bgzip file line by line, decompressing blocks with N_procs processes.
+
+		Up to Read_ahead batches of Batch_blocks blocks are decompressed ahead
+		of the lines being read, so memory use stays bounded.
+
+		Arguments:
+			File:			"/my_directory/my_fav_file.txt.gz" bgzip file
+			N_procs:		integer > 0. Number of decompression processes.
+			Batch_blocks:	integer > 0. BGZF blocks (~64 KB each) per decompression task.
+			Read_ahead:		integer > 0. Decompression tasks kept in flight.
+	"""
+	def __init__(self, File, N_procs=multiprocessing.cpu_count(), Batch_blocks=64, Read_ahead=None):
+		if type(N_procs) is not int or N_procs < 1:
+			raise ValueError("N_procs needs to be an integer > 0.")
+		self.f = open(File, 'rb')
+		self.pool = multiprocessing.Pool(N_procs)
+		self.batch_blocks = Batch_blocks
+		if Read_ahead is None:
+			Read_ahead = 2*N_procs
+		self.pending = deque()
+		self.eof = False
+		# Compressed bytes read through the end of the batch being read
+		self.position = 0
+		self.lines = None
+		for i in range(Read_ahead):
+			self._submit()
+
+	def _submit(self):
+		""" Send the next batch of blocks to be decompressed.
+		"""
+		if self.eof:
+			return
+		blocks = list()
+		while len(blocks) < self.batch_blocks:
+			block = read_bgzf_block(self.f)
+			if block is None:
+				self.eof = True
+				break
+			blocks.append(block[0])
+		if len(blocks) > 0:
+			self.pending.append([self.f.tell(), self.pool.apply_async(_inflate_bgzf_blocks, [blocks])])
+
+	def _lines(self):
+		leftover = ""
+		while len(self.pending) > 0:
+			position, result = self.pending.popleft()
+			data = result.get()
+			self.position = position
+			self._submit()
+			lines = (leftover + data).split("\n")
+			leftover = lines.pop()
+			for line in lines:
+				yield line + "\n"
+		if len(leftover) > 0:
+			yield leftover
+
+	def __iter__(self):
+		if self.lines is None:
+			self.lines = self._lines()
+		return self.lines
+
+	def readline(self):
+		""" Return the next line, or "" at the end of the file.
+		"""
+		return next(iter(self), "")
+
+	def close(self):
+		self.pool.terminate()
+		self.pool.join()
+		self.f.close()
+
+class BlockLineReader(object):
+	""" Read the lines of an open file in large blocks.
+
+		Much faster than a gzip file's own line reading, which goes a line at a time.
+
+		Arguments:
+			F:				file object opened for reading
+			Block_bytes:	integer > 0. Bytes read at a time.
+	"""
+	def __init__(self, F, Block_bytes=1048576):
+		self.f = F
+		self.block_bytes = Block_bytes
+		self.lines = None
+
+	def _lines(self):
+		leftover = ""
+		while True:
+			block = self.f.read(self.block_bytes)
+			if block == "":
+				break
+			lines = (leftover + block).split("\n")
+			leftover = lines.pop()
+			for line in lines:
+				yield line + "\n"
+		if len(leftover) > 0:
+			yield leftover
+
+	def __iter__(self):
+		if self.lines is None:
+			self.lines = self._lines()
+		return self.lines
+
+	def readline(self):
+		""" Return the next line, or "" at the end of the file.
+		"""
+		return next(iter(self), "")
+
+	def close(self):
+		self.f.close()
+
+def open_input(File, N_procs=1):
+	""" Open a plain, gzip, or bgzip file for reading lines.
+
+		Arguments:
+			File:		"/my_directory/my_fav_file.txt[.gz]"
+			N_procs:	integer > 0. If File is a bgzip file and N_procs > 1,
+							its blocks are decompressed by N_procs processes.
+
+		Returns: an object with line iteration, readline(), and close()
+	"""
+	if is_bgzf(File) and N_procs > 1:
+		return BgzfReader(File, N_procs)
+	if is_gzipped(File):
+		return BlockLineReader(gzip.open(File, 'rb'))
+	return open(File, 'rb')
+
+def input_position(F):
+	""" Return about how many bytes of a file opened by open_input have been read (compressed bytes,
+		for a gzip or bgzip file), e.g. for reporting progress.
+	"""
+	if isinstance(F, BgzfReader):
+		return F.position
+	if isinstance(F, BlockLineReader):
+		F = F.f
+	if isinstance(F, gzip.GzipFile):
+		return F.fileobj.tell()
+	return F.tell()
+
+def get_byte_ranges(In_file, Start, N_ranges):
+	""" Divide a file into N_ranges byte ranges that begin and end on line boundaries.
+
+		Arguments:
+			In_file:	"/my_directory/my_fav_file.txt"
+			Start:		integer. Byte offset the first range begins at (e.g. just after the header).
+			N_ranges:	integer > 0.
+
+		Returns: list of [start, end] byte offsets. Empty ranges are left out.
+	"""
+	if type(N_ranges) is not int or N_ranges < 1:
+		raise ValueError("N_ranges needs to be an integer > 0.")
+	size = os.path.getsize(In_file)
+	step = max((size-Start)/N_ranges, 1)
+	boundaries = [Start]
+	f_IN = open(In_file, 'rb')
+	try:
+		for i in range(1, N_ranges):
+			at = Start + i*step
+			if at <= boundaries[-1]:
+				continue
+			if at >= size:
+				break
+			# Move forward to the start of the next line
+			f_IN.seek(at-1)
+			f_IN.readline()
+			boundaries.append(f_IN.tell())
+	finally:
+		f_IN.close()
+	boundaries.append(size)
+	return [[boundaries[i], boundaries[i+1]] for i in range(len(boundaries)-1)
+			if boundaries[i+1] > boundaries[i]]
+
+def read_byte_range_lines(In_file, Start, End):
+	""" Yield the lines of a (not compressed) file that start in the byte range [Start, End).
+	"""
+	f_IN = open(In_file, 'rb')
+	try:
+		f_IN.seek(Start)
+		at = Start
+		leftover = ""
+		while at < End:
+			# Read in large blocks, a line at a time is much slower
+			block = f_IN.read(1048576)
+			if block == "":
+				if len(leftover) > 0:
+					yield leftover
+				break
+			lines = (leftover + block).split("\n")
+			leftover = lines.pop()
+			for line in lines:
+				if at >= End:
+					return
+				at = at + len(line) + 1
+				yield line + "\n"
+	finally:
+		f_IN.close()
+
+# Key types understood by external_sort
+SORT_KEY_TYPES = ["str", "int", "float", "chr"]
+# Where the non-numbered chromosomes go, after 1-22
+CHROMOSOME_ORDER = {"X": 23, "Y": 24, "XY": 25, "M": 26, "MT": 26}
+
+def chromosome_rank(Chr):
+	""" Return a sortable value for a chromosome name: 1 < 2 < ... < 22 < X < Y < XY < MT.
+
+		A leading 'chr' is ignored. Unrecognized names sort after all of these, by name.
+	"""
+	name = Chr
+	if name[:3].lower() == "chr":
+		name = name[3:]
+	if name.isdigit():
+		return (int(name), "")
+	if name.upper() in CHROMOSOME_ORDER:
+		return (CHROMOSOME_ORDER[name.upper()], "")
+	return (1000, name)
+
+def make_sort_key(Key_cols, Key_types=None, Delimiter="\t"):
+	""" Return a function that, given a line, returns its sort key for external_sort.
+
+		Numbers that can't be parsed (e.g. NA) sort after all numbers.
+
+		Arguments:
+			Key_cols:	list of column indeces, most significant first [0 = first column]
+			Key_types:	list, one of SORT_KEY_TYPES per Key_col [default: all "str"]
+			Delimiter:	column delimiter
+	"""
+	if type(Key_cols) is not list or len(Key_cols) == 0:
+		raise ValueError("Key_cols needs to be a list of column indeces.")
+	if Key_types is None:
+		Key_types = ["str"]*len(Key_cols)
+	if type(Key_types) is not list or len(Key_types) != len(Key_cols):
+		raise ValueError("Key_types needs to be a list the same length as Key_cols.")
+	for key_type in Key_types:
+		if key_type not in SORT_KEY_TYPES:
+			raise ValueError("Expected key types from "+str(SORT_KEY_TYPES)+", instead got: "+str(key_type))
+	max_col = max(Key_cols)
+	# Only string keys on one column: skip building tuples
+	if Key_types == ["str"]:
+		col = Key_cols[0]
+		return lambda line: line.rstrip('\r\n').split(Delimiter, max_col+1)[col]
+
+	def number(value, parse):
+		try:
+			return (0, parse(value))
+		except ValueError:
+			return (1, value)
+	parsers = {"str": lambda value: value,
+		"int": lambda value: number(value, int),
+		"float": lambda value: number(value, float),
+		"chr": chromosome_rank}
+	cols_parsers = [[Key_cols[i], parsers[Key_types[i]]] for i in range(len(Key_cols))]
+
+	def sort_key(line):
+		split_line = line.rstrip('\r\n').split(Delimiter, max_col+1)
+		return tuple([parse(split_line[col]) for col, parse in cols_parsers])
+	return sort_key
+
+def _write_sorted_run(Lines, Key, Run_dir, Run_i):
+	""" Sort Lines by Key, write them to a new run file, return its filepath.
+	"""
+	Lines.sort(key=Key)
+	path = os.path.join(Run_dir, "run_"+str(Run_i))
+	with open(path, 'wb') as f_OUT:
+		f_OUT.writelines(Lines)
+	return path
+
+def _make_sorted_runs(Args):
+	""" Worker for external_sort: split lines into sorted run files of at most Memory_bytes each.
+
+		Lines is either an iterable of lines, or a tuple (File, Start, End, Bgzf) describing
+		a byte range to read (see read_byte_range_lines and read_bgzf_lines).
+
+		Returns: list of run filepaths
+	"""
+	Lines, Key_cols, Key_types, Delimiter, Memory_bytes, Run_dir = Args
+	if type(Lines) is tuple:
+		File, Start, End, Bgzf = Lines
+		if Bgzf:
+			Lines = read_bgzf_lines(File, Start, End)
+		else:
+			Lines = read_byte_range_lines(File, Start, End)
+	key = make_sort_key(Key_cols, Key_types, Delimiter)
+	runs = list()
+	held = list()
+	held_bytes = 0
+	for line in Lines:
+		if line[-1:] != "\n":
+			line = line + "\n"
+		held.append(line)
+		# Rough cost of holding a line (and its key, while sorting) in memory
+		held_bytes = held_bytes + 2*len(line) + 100
+		if held_bytes >= Memory_bytes:
+			runs.append(_write_sorted_run(held, key, Run_dir, len(runs)))
+			held = list()
+			held_bytes = 0
+	if len(held) > 0:
+		runs.append(_write_sorted_run(held, key, Run_dir, len(runs)))
+	return runs
+
+def _merge_runs(Runs, Key, f_OUT):
+	""" k-way merge sorted run files into an open file, with a heap.
+	"""
+	run_files = [open(run, 'rb') for run in Runs]
+	try:
+		def keyed(f_IN, run_i):
+			# The run number breaks ties, so equal keys keep their run order
+			for line in f_IN:
+				yield (Key(line), run_i, line)
+		merged = heapq.merge(*[keyed(run_files[run_i], run_i) for run_i in range(len(run_files))])
+		for key, run_i, line in merged:
+			f_OUT.write(line)
+	finally:
+		for f_IN in run_files:
+			f_IN.close()
+
+def external_sort(File, Out_file, Key_cols, Key_types=None, Header=True, Memory_mb=1024,
+	Temp_dir="", N_procs=1, Delimiter="\t", Max_merge=256):
+	""" Sort a file that may not fit in memory, return location of the sorted file.
+
+		Sorted runs of at most Memory_mb are written to a temporary directory,
+		then merged with a k-way heap merge. If there are more than Max_merge
+		runs, they are merged in rounds so only Max_merge files are open at once.
+
+		Example usage (sort an eQTL file by chromosome, then position):
+			external_sort(File="/my_directory/eqtl.txt.gz",
+				Out_file="/my_directory/eqtl_chr_pos_sorted.txt",
+				Key_cols=[2, 3],
+				Key_types=["chr", "int"])
+
+		Arguments:
+			File:		"/my_directory/my_fav_file.txt" (may be gzip or bgzip compressed)
+			Out_file:	"/my_directory/my_fav_file_sorted.txt" (not compressed)
+			Key_cols:	list of column indeces to sort by, most significant first [0 = first column]
+			Key_types:	list, one of SORT_KEY_TYPES per Key_col [default: all "str"]
+							str: by bytes, int/float: numerically, chr: 1, 2, ..., 22, X, Y, MT
+			Header:		boolean. Does the file have a single line header? (kept at the top)
+			Memory_mb:	integer > 0. Memory budget for holding lines, split between processes.
+			Temp_dir:	"/scratch_dir/" where runs are written
+							[optional, defaults to the system temp directory]
+			N_procs:	integer > 0. Processes making sorted runs (a gzip, but not
+							bgzip, compressed file is read by one process)
+			Delimiter:	column delimiter
+			Max_merge:	integer > 1. Most runs merged at once.
+
+		Returns: Out_file
+	"""
+	if type(Memory_mb) is not int or Memory_mb < 1:
+		raise ValueError("Memory_mb needs to be an integer > 0.")
+	if type(N_procs) is not int or N_procs < 1:
+		raise ValueError("N_procs needs to be an integer > 0.")
+	if type(Max_merge) is not int or Max_merge < 2:
+		raise ValueError("Max_merge needs to be an integer > 1.")
+	if len(Temp_dir) > 0 and not os.path.isdir(Temp_dir):
+		raise ValueError(Temp_dir+" not found.")
+	if not os.path.isfile(File):
+		raise ValueError(File+" not found.")
+	# Check the key arguments before doing any work
+	key = make_sort_key(Key_cols, Key_types, Delimiter)
+
+	run_dir = tempfile.mkdtemp(prefix="sort_", dir=Temp_dir if len(Temp_dir) > 0 else None)
+	try:
+		f_IN = open_input(File)
+		header = f_IN.readline() if Header else ""
+		if Header and header[-1:] != "\n":
+			header = header + "\n"
+
+		bgzf = is_bgzf(File)
+		if N_procs > 1 and (bgzf or not is_gzipped(File)):
+			f_IN.close()
+			if bgzf:
+				blocks = get_bgzf_blocks(File)
+				blocks.append(os.path.getsize(File))
+				step = max((len(blocks)-1+N_procs-1)/N_procs, 1)
+				ranges = [(File, blocks[i], blocks[min(i+step, len(blocks)-1)], True)
+						for i in range(0, len(blocks)-1, step)]
+				if not Header:
+					# read_bgzf_lines skips the first line of the file, so read it here
+					f_IN = open_input(File)
+					first_line = f_IN.readline()
+					f_IN.close()
+				else:
+					first_line = None
+			else:
+				ranges = [(File, start, end, False)
+						for start, end in get_byte_ranges(File, len(header), N_procs)]
+				first_line = None
+			jobs = list()
+			for range_i, byte_range in enumerate(ranges):
+				range_dir = os.path.join(run_dir, "range_"+str(range_i))
+				os.mkdir(range_dir)
+				jobs.append([byte_range, Key_cols, Key_types, Delimiter,
+					Memory_mb*1024*1024/N_procs, range_dir])
+			if first_line is not None and len(first_line) > 0:
+				first_dir = os.path.join(run_dir, "first_line")
+				os.mkdir(first_dir)
+				# First, so lines with equal keys stay in file order
+				jobs.insert(0, [[first_line], Key_cols, Key_types, Delimiter, Memory_mb*1024*1024, first_dir])
+			workers = multiprocessing.Pool(N_procs)
+			try:
+				runs = sum(workers.map(_make_sorted_runs, jobs), [])
+			finally:
+				workers.close()
+				workers.join()
+		else:
+			try:
+				runs = _make_sorted_runs([f_IN, Key_cols, Key_types, Delimiter,
+					Memory_mb*1024*1024, run_dir])
+			finally:
+				f_IN.close()
+
+		# Merge in rounds until few enough runs are left to merge into Out_file
+		round_i = 0
+		while len(runs) > Max_merge:
+			merged_runs = list()
+			for batch_i in range(0, len(runs), Max_merge):
+				path = os.path.join(run_dir, "merge_"+str(round_i)+"_"+str(batch_i))
+				with open(path, 'wb') as f_OUT:
+					_merge_runs(runs[batch_i:batch_i+Max_merge], key, f_OUT)
+				for run in runs[batch_i:batch_i+Max_merge]:
+					os.remove(run)
+				merged_runs.append(path)
+			runs = merged_runs
+			round_i = round_i + 1
+
+		with open(Out_file, 'wb') as f_OUT:
+			f_OUT.write(header)
+			_merge_runs(runs, key, f_OUT)
+	finally:
+		shutil.rmtree(run_dir)
+
+	return Out_file
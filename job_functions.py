@@ -0,0 +1,612 @@
+#/usr/bin/python
+
+# job_functions.py
+# 2026_10_18
+
+### Functions for submitting many small tasks to LSF as a few batched jobs,
+###  instead of one bsub per task (see make_consign_job_command in
+###  helper_functions.py for single jobs).
+###
+###  The tasks' commands are written to a manifest, one per line:
+###    task_#	command
+###  and each job (or job array element) runs its slice of the manifest with
+###  run_task_array.py.
+###
+###  Example usage:
+###    tasks = [["/scripts/get_coloc_summaries.R", "--file "+f] for f in merged_files]
+###    commands = make_job_array_commands(Tasks=tasks,
+###			Manifest_file="/my_directory/log/coloc_tasks.manifest",
+###			ScriptDir="/my_directory/script/",
+###			Tasks_per_element=50,
+###			ErrOutDir="/my_directory/log/")
+###    submit_job_arrays(commands)
+###
+###  Jobs are submitted through an executor: LsfExecutor (bsub, the default)
+###  or LocalExecutor, which runs the same bsub commands on a local process
+###  pool. Choose one with set_executor(), e.g.:
+###    set_executor(LocalExecutor(N_procs=64))
+###    submit_consign_job(command)
+###    get_executor().wait()
+###
+###  Task states (submitted, running, done, failed, lost) and exit codes can be
+###  tracked in an SQLite database (see JobTracker), so a stage can wait for
+###  its tasks with wait_all() instead of polling for marker files. A running
+###  task sends a heartbeat every HEARTBEAT_SECONDS; one that stops (e.g. LSF
+###  killed its job for running out of memory or time) is marked lost.
+###
+###  submit_with_limits submits jobs gradually instead, so that at most so
+###  many of them use a resource (like a filesystem, see mount_point) at once.
+
+import os
+import time
+import shlex
+import pipes
+import socket
+import sqlite3
+import multiprocessing
+from subprocess import call
+
+TASK_ARRAY_RUNNER = "run_task_array.py"
+# LSF's default MAX_JOB_ARRAY_SIZE
+MAX_ARRAY_SIZE = 1000
+# Interpreter for each script extension (other scripts are run directly)
+INTERPRETERS = {".py": "python", ".R": "Rscript"}
+# How often a running task records that it's still alive (see JobTracker.heartbeat)
+HEARTBEAT_SECONDS = 60
+# A running task without a heartbeat for this long is lost (its job was killed)
+STALE_SECONDS = 600
+# bsub options that take a value (the rest are flags)
+BSUB_VALUE_OPTIONS = set(["-e", "-o", "-eo", "-oo", "-q", "-J", "-n", "-R", "-M", "-W", "-P", "-G",
+	"-u", "-w", "-m", "-cwd", "-g", "-sla", "-app", "-E", "-Ep", "-Jd", "-L", "-c", "-F", "-v"])
+
+
+def make_task_command(Script, Extra=""):
+	""" Return the command line that runs Script with the arguments in Extra.
+
+		.py scripts are run with python, .R scripts with Rscript.
+	"""
+	if type(Script) is not str or type(Extra) is not str:
+		raise ValueError("Script and Extra need to be strings.")
+	if not os.path.isfile(Script):
+		raise ValueError(Script+" not found.")
+	interpreter = INTERPRETERS.get(os.path.splitext(Script)[1], "")
+	command = Script
+	if len(interpreter) > 0:
+		command = interpreter+" "+command
+	if len(Extra) > 0:
+		command = command+" "+Extra
+	return command
+
+def write_task_manifest(Commands, Manifest_file):
+	""" Write one command per line to Manifest_file, numbered from 0.
+	"""
+	with open(Manifest_file, 'wb') as f_OUT:
+		for task_i, command in enumerate(Commands):
+			if "\n" in command:
+				raise ValueError("Task "+str(task_i)+"'s command has a newline in it: "+command)
+			f_OUT.write(str(task_i)+"\t"+command+"\n")
+
+def read_task_manifest(Manifest_file):
+	""" Return the list of commands in Manifest_file, in task order.
+	"""
+	commands = list()
+	with open(Manifest_file, 'rb') as f_IN:
+		for line in f_IN:
+			task_i, command = line.rstrip('\r\n').split('\t', 1)
+			if int(task_i) != len(commands):
+				raise ValueError(Manifest_file+" is out of order at task "+task_i)
+			commands.append(command)
+	return commands
+
+def task_slice(N_tasks, Tasks_per_element, Element, Offset=0):
+	""" Return the task indeces run by one job array element.
+
+		Arguments:
+			N_tasks:			total tasks in the manifest
+			Tasks_per_element:	integer > 0
+			Element:			the element's LSB_JOBINDEX (1 = first)
+			Offset:				elements before this job array's first element
+	"""
+	if Element < 1:
+		raise ValueError("Element needs to be an integer > 0.")
+	start = (Offset+Element-1)*Tasks_per_element
+	return range(min(start, N_tasks), min(start+Tasks_per_element, N_tasks))
+
+
+def make_job_array_commands(
+	Tasks,
+	Manifest_file,
+	ScriptDir,
+	Tasks_per_element=1,
+	Max_array_size=MAX_ARRAY_SIZE,
+	Job_name="tasks",
+	ErrOut=True,
+	ErrOutDir="",
+	Queue="",
+	Use_arrays=True,
+	Bsub="bsub",
+	Status_db=""):
+	"""Write a task manifest and generate the bsub commands that run every task in it.
+
+	Arguments:
+		Tasks:				list of [Script, Extra]: "/directory_with_script/script.py" (or .R)
+								and its command line arguments
+		Manifest_file:		"/directory/tasks.manifest" to write
+		ScriptDir:			"/directory_with_script/" that has run_task_array.py
+		Tasks_per_element:	integer > 0. Tasks run, one after the other, by each job
+								(or job array element).
+		Max_array_size:		integer > 0. Most elements per job array; more tasks are
+								split across several job arrays.
+		Job_name:			LSF job name
+		ErrOut:				Boolean. Should the jobs save log files? (one per element)
+		ErrOutDir:			"/directory_for_log_files/"
+		Queue:				Optional bsub -q queue.
+		Use_arrays:			Boolean. If False, submit one ordinary job per chunk of
+								Tasks_per_element tasks instead of job arrays.
+		Bsub:				The bsub command (e.g. a stub script, for testing).
+		Status_db:			Optional "/directory/status.db". If given, the tasks are added
+								to this JobTracker database, and each records its state
+								there as it runs (see manifest_task_keys for their keys).
+
+	Returns a list of commands formatted for submit_job_arrays.
+
+		Example output (with 2500 tasks, Tasks_per_element=1, Max_array_size=1000,
+			broken into lines to ease visualization):
+
+		[['bsub -J "tasks[1-1000]" -e /.../log/tasks_0.%I.err -o /.../log/tasks_0.%I.out
+			python /.../script/run_task_array.py /.../tasks.manifest --tasks_per_element 1 --offset 0',
+		'IS_JOB_ARRAY_COMMAND'],
+		['bsub -J "tasks[1-1000]" ... --offset 1000', 'IS_JOB_ARRAY_COMMAND'],
+		['bsub -J "tasks[1-500]" ... --offset 2000', 'IS_JOB_ARRAY_COMMAND']]
+	"""
+	if type(Tasks) is not list:
+		raise ValueError("Tasks needs to be a list of [Script, Extra].")
+	if (type(Manifest_file) is not str
+		or type(ScriptDir) is not str
+		or type(Job_name) is not str
+		or type(ErrOutDir) is not str
+		or type(Queue) is not str
+		or type(Bsub) is not str
+		or type(Status_db) is not str):
+		raise ValueError("Manifest_file, ScriptDir, Job_name, ErrOutDir, Queue, Bsub, and Status_db need to be strings.")
+	if type(ErrOut) is not bool or type(Use_arrays) is not bool:
+		raise ValueError("ErrOut and Use_arrays need to be booleans.")
+	if type(Tasks_per_element) is not int or Tasks_per_element < 1:
+		raise ValueError("Tasks_per_element needs to be an integer > 0.")
+	if type(Max_array_size) is not int or Max_array_size < 1:
+		raise ValueError("Max_array_size needs to be an integer > 0.")
+	if not (os.path.isdir(ScriptDir)):
+		raise ValueError(ScriptDir+" not found.")
+	if ScriptDir[-1] != "/":
+		raise ValueError("ScriptDir needs to end with a forward slash.")
+	if not os.path.isfile(ScriptDir+TASK_ARRAY_RUNNER):
+		raise ValueError(TASK_ARRAY_RUNNER+" not found in "+ScriptDir)
+	if len(ErrOutDir) > 0:
+		if not (os.path.isdir(ErrOutDir)):
+			raise ValueError(ErrOutDir+" not found.")
+		if ErrOutDir[-1] != "/":
+			raise ValueError("ErrOutDir needs to end with a forward slash.")
+
+	write_task_manifest([make_task_command(task[0], task[1]) for task in Tasks], Manifest_file)
+
+	n_elements = (len(Tasks)+Tasks_per_element-1)/Tasks_per_element
+	runner = " python "+ScriptDir+TASK_ARRAY_RUNNER+" "+Manifest_file \
+		+" --tasks_per_element "+str(Tasks_per_element)
+	if len(Status_db) > 0:
+		JobTracker(Status_db).add(manifest_task_keys(Manifest_file, len(Tasks)))
+		runner = runner+" --status_db "+Status_db
+	queue = " -q "+Queue if len(Queue) > 0 else ""
+
+	commands = list()
+	if Use_arrays:
+		for offset in range(0, n_elements, Max_array_size):
+			size = min(Max_array_size, n_elements-offset)
+			command = Bsub+" -J \""+Job_name+"[1-"+str(size)+"]\""+queue
+			if ErrOut:
+				log = ErrOutDir+Job_name+"_"+str(offset)+".%I"
+				command = command+" -e "+log+".err -o "+log+".out"
+			commands.append([command+runner+" --offset "+str(offset), "IS_JOB_ARRAY_COMMAND"])
+	else:
+		for element in range(1, n_elements+1):
+			command = Bsub+" -J "+Job_name+"_"+str(element)+queue
+			if ErrOut:
+				log = ErrOutDir+Job_name+"."+str(element)
+				command = command+" -e "+log+".err -o "+log+".out"
+			commands.append([command+runner+" --element "+str(element), "IS_JOB_ARRAY_COMMAND"])
+	return commands
+
+def submit_job_arrays(Commands):
+	""" Given the output from make_job_array_commands, submit the jobs.
+	"""
+	if type(Commands) is not list:
+		raise ValueError("Commands aren't from make_job_array_commands...(not a list)")
+	for command in Commands:
+		if type(command) is not list or command[1] != "IS_JOB_ARRAY_COMMAND":
+			raise ValueError("Commands aren't from make_job_array_commands...(where is 'IS_JOB_ARRAY_COMMAND'?)")
+	executor = get_executor()
+	for command in Commands:
+		executor.submit(command[0])
+
+
+def parse_bsub_command(Command):
+	""" Split a bsub command into its options and the job's command.
+
+		Returns: [dictionary of bsub option -> value (True for flags), job command]
+	"""
+	tokens = shlex.split(Command)
+	if len(tokens) == 0 or os.path.basename(tokens[0]) != "bsub":
+		raise ValueError("Expected a bsub command, instead got: "+Command)
+	options = dict()
+	i = 1
+	while i < len(tokens) and tokens[i][0] == "-":
+		if tokens[i] in BSUB_VALUE_OPTIONS:
+			if i+1 >= len(tokens):
+				raise ValueError("No value given for bsub option "+tokens[i]+" in: "+Command)
+			options[tokens[i]] = tokens[i+1]
+			i = i + 2
+		else:
+			options[tokens[i]] = True
+			i = i + 1
+	if i >= len(tokens):
+		raise ValueError("No job command in: "+Command)
+	return [options, " ".join([pipes.quote(token) for token in tokens[i:]])]
+
+def _run_local_job(Args):
+	""" Worker for LocalExecutor: run one job, writing its output where bsub would.
+
+		Like LSF, a summary line is added to the end of the -o file.
+
+		Returns: the job's exit code
+	"""
+	Command, Out_file, Err_file, Append, Env = Args
+	mode = "ab" if Append else "wb"
+	f_OUT = open(Out_file, mode) if Out_file is not None else None
+	if Err_file is not None and Err_file != Out_file:
+		f_ERR = open(Err_file, mode)
+	else:
+		f_ERR = f_OUT
+	try:
+		exit_code = call(Command, shell=True, stdout=f_OUT, stderr=f_ERR, env=Env)
+		if f_OUT is not None:
+			f_OUT.flush()
+			if exit_code == 0:
+				f_OUT.write("\nSuccessfully completed.\n")
+			else:
+				f_OUT.write("\nExited with exit code "+str(exit_code)+".\n")
+	finally:
+		if f_OUT is not None:
+			f_OUT.close()
+		if f_ERR is not None and f_ERR is not f_OUT:
+			f_ERR.close()
+	return exit_code
+
+
+class LsfExecutor(object):
+	""" Submit jobs with bsub (the job's exit code isn't known here, LSF reports it in the -o file).
+	"""
+	def submit(self, Command):
+		""" Submit a bsub command. Returns bsub's exit code.
+		"""
+		return call([Command], shell=True)
+
+	def wait(self):
+		""" Nothing to wait for, jobs run on the cluster. Returns [].
+		"""
+		return []
+
+
+class LocalExecutor(object):
+	""" Run bsub commands on a local pool of N_procs processes instead of submitting them.
+
+		The -e and -o files are written as LSF would (-eo/-oo overwrite them),
+		%J and %I in their names are filled in, and each element of a job
+		array ("name[1-N]") is run with $LSB_JOBINDEX set. Other bsub options
+		(-q, -M, ...) are ignored.
+
+		Arguments:
+			N_procs:	integer > 0. Jobs run at once (default: all cores)
+	"""
+	def __init__(self, N_procs=multiprocessing.cpu_count()):
+		if type(N_procs) is not int or N_procs < 1:
+			raise ValueError("N_procs needs to be an integer > 0.")
+		self.n_procs = N_procs
+		self.pool = None
+		self.n_jobs = 0
+		# [job command, AsyncResult] for each job submitted since the last wait()
+		self.jobs = list()
+
+	def submit(self, Command):
+		""" Queue a bsub command's job (every element, for a job array). Returns 0.
+		"""
+		options, job_command = parse_bsub_command(Command)
+		indeces = [None]
+		job_name = options.get("-J", "")
+		if type(job_name) is str and job_name.endswith("]") and "[" in job_name:
+			first, last = job_name[job_name.index("[")+1:-1].split("-")
+			indeces = range(int(first), int(last)+1)
+		if self.pool is None:
+			self.pool = multiprocessing.Pool(self.n_procs)
+		self.n_jobs = self.n_jobs + 1
+		for index in indeces:
+			env = dict(os.environ)
+			env["LSB_JOBID"] = str(self.n_jobs)
+			if index is not None:
+				env["LSB_JOBINDEX"] = str(index)
+			logs = list()
+			for option in ["-o", "-e"]:
+				log = options.get(option+option[1], options.get(option, None))
+				if log is not None:
+					log = log.replace("%J", str(self.n_jobs)).replace("%I", str(index if index is not None else 0))
+				logs.append(log)
+			append = "-oo" not in options and "-eo" not in options
+			self.jobs.append([job_command, self.pool.apply_async(_run_local_job,
+				[[job_command, logs[0], logs[1], append, env]])])
+		return 0
+
+	def wait(self):
+		""" Wait for every submitted job to finish.
+
+			Returns: list of [job command, exit code], in the order they were submitted
+		"""
+		if self.pool is not None:
+			self.pool.close()
+			self.pool.join()
+			self.pool = None
+		exit_codes = [[command, result.get()] for command, result in self.jobs]
+		self.jobs = list()
+		return exit_codes
+
+
+_executor = [LsfExecutor()]
+
+def set_executor(Executor):
+	""" Set the executor the submit_* functions use (LsfExecutor or LocalExecutor).
+	"""
+	if not hasattr(Executor, "submit") or not hasattr(Executor, "wait"):
+		raise ValueError("Expected an executor (like LsfExecutor or LocalExecutor), instead got: "+str(Executor))
+	_executor[0] = Executor
+
+def get_executor():
+	""" Return the executor the submit_* functions use.
+	"""
+	return _executor[0]
+
+def make_executor(Name, N_procs=multiprocessing.cpu_count()):
+	""" Return a new executor by name: "lsf" or "local".
+	"""
+	if Name == "lsf":
+		return LsfExecutor()
+	if Name == "local":
+		return LocalExecutor(N_procs)
+	raise ValueError("Expected the executor to be lsf or local, instead got: "+str(Name))
+
+
+def mount_point(Path):
+	""" Return the mount point of the filesystem Path (or its nearest existing parent) is on.
+	"""
+	path = os.path.realpath(Path)
+	while not os.path.exists(path):
+		path = os.path.dirname(path)
+	while not os.path.ismount(path):
+		path = os.path.dirname(path)
+	return path
+
+def submit_with_limits(Commands, Task_keys, Task_resources, Limits, Tracker,
+	Poll_seconds=5.0, Fail_fast=False, Timeout=None, Stale_seconds=STALE_SECONDS):
+	""" Submit jobs through the current executor, keeping how many run at once within limits.
+
+		Each job uses some resources (e.g. "read:/mnt/data", the filesystem it
+		reads from), and at most Limits[resource] jobs using a resource run at
+		once. Jobs are submitted in order, except that a job waiting on a busy
+		resource doesn't hold up the jobs after it. A job has finished once its
+		state in Tracker is done or failed, or it's lost (see JobTracker.mark_lost),
+		so a killed job doesn't keep its resources forever.
+
+		Arguments:
+			Commands:		list of bsub commands, one per task (e.g. from make_job_array_commands
+								with Tasks_per_element=1 and Use_arrays=False)
+			Task_keys:		list of each command's JobTracker key (see manifest_task_keys)
+			Task_resources:	list of each command's list of resources
+			Limits:			dictionary of resource -> integer > 0 (resources not in it are unlimited)
+			Tracker:		JobTracker the jobs record their state in
+			Poll_seconds:	how often to check for finished jobs
+			Fail_fast:		Boolean. Raise as soon as any job fails, instead of running the rest.
+			Timeout:		seconds to wait before giving up, or None to wait forever
+			Stale_seconds:	a running job without a heartbeat for this long is lost
+								(None to never mark jobs lost)
+
+		Returns: dictionary of task key -> exit code (None for lost jobs)
+	"""
+	if len(Commands) != len(Task_keys) or len(Commands) != len(Task_resources):
+		raise ValueError("Commands, Task_keys, and Task_resources need to be the same length.")
+	for resource, limit in Limits.items():
+		if type(limit) is not int or limit < 1:
+			raise ValueError("The limit for "+resource+" needs to be an integer > 0, instead got: "+str(limit))
+	executor = get_executor()
+	pending = range(len(Commands))
+	running = list()
+	exit_codes = dict()
+	start_time = time.time()
+	while True:
+		if len(running) > 0:
+			running_keys = [Task_keys[task_i] for task_i in running]
+			if Stale_seconds is not None:
+				for task in Tracker.mark_lost(running_keys, Stale_seconds):
+					print "Warning: "+task+" stopped sending heartbeats (was its job killed?), counting it as failed."
+			states = Tracker.states(running_keys)
+			for task_i in list(running):
+				state = states[Task_keys[task_i]]
+				if state is None or state[0] not in JobTracker.FINISHED:
+					continue
+				running.remove(task_i)
+				exit_codes[Task_keys[task_i]] = state[1]
+				if state[0] != "done" and Fail_fast:
+					raise StandardError(Task_keys[task_i]+" "+state[0]+" with exit code "+str(state[1]))
+		in_use = dict()
+		for task_i in running:
+			for resource in Task_resources[task_i]:
+				in_use[resource] = in_use.get(resource, 0) + 1
+		for task_i in list(pending):
+			if any([in_use.get(resource, 0) >= Limits[resource]
+				for resource in Task_resources[task_i] if resource in Limits]):
+				continue
+			executor.submit(Commands[task_i])
+			pending.remove(task_i)
+			running.append(task_i)
+			for resource in Task_resources[task_i]:
+				in_use[resource] = in_use.get(resource, 0) + 1
+		if len(pending) == 0 and len(running) == 0:
+			return exit_codes
+		if Timeout is not None and time.time() - start_time > Timeout:
+			raise StandardError("Timed out after "+str(Timeout)+" seconds with "+str(len(running))
+				+" job(s) running and "+str(len(pending))+" not submitted yet.")
+		time.sleep(Poll_seconds)
+
+
+def manifest_task_keys(Manifest_file, N_tasks):
+	""" Return the JobTracker keys of a manifest's tasks: "/full/path/tasks.manifest:task_#".
+	"""
+	manifest = os.path.abspath(Manifest_file)
+	return [manifest+":"+str(task_i) for task_i in range(N_tasks)]
+
+
+class JobTracker(object):
+	""" Record each task's state and exit code in an SQLite database, and wait for tasks to finish.
+
+		Tasks are added as "submitted"; the task (e.g. run_task_array.py) marks
+		itself "running" with start(), calls heartbeat() while it runs, then marks
+		itself "done" or "failed" with finish(). A job LSF kills never gets to
+		finish(), so a running task whose last heartbeat is older than the
+		stale cutoff is marked "lost" (see mark_lost) and counts as failed.
+		Put the database on a filesystem with working locks (a local disk, if
+		every job runs on this machine).
+
+		Example usage:
+			tracker = JobTracker("/my_directory/log/status.db")
+			exit_codes = tracker.wait_all(manifest_task_keys(manifest, n_tasks), Timeout=3600)
+
+		Arguments:
+			Db_file:	"/my_directory/status.db", created if it doesn't exist
+	"""
+	STATES = ["submitted", "running", "done", "failed", "lost"]
+	FINISHED = ["done", "failed", "lost"]
+	# Most tasks looked up per query (SQLite's default limit is 999 parameters)
+	QUERY_CHUNK = 500
+
+	def __init__(self, Db_file):
+		self.db_file = Db_file
+		connection = self._connect()
+		try:
+			connection.execute("CREATE TABLE IF NOT EXISTS tasks (task TEXT PRIMARY KEY, state TEXT NOT NULL, "
+				+"exit_code INTEGER, host TEXT, updated REAL NOT NULL)")
+			connection.commit()
+		finally:
+			connection.close()
+
+	def _connect(self):
+		# Wait up to a minute for other jobs' writes to finish
+		return sqlite3.connect(self.db_file, timeout=60)
+
+	def _set(self, Tasks, State, Exit_code=None):
+		connection = self._connect()
+		try:
+			connection.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?)",
+				[(task, State, Exit_code, socket.gethostname(), time.time()) for task in Tasks])
+			connection.commit()
+		finally:
+			connection.close()
+
+	def add(self, Tasks):
+		""" Add (or reset) Tasks as submitted.
+		"""
+		self._set(Tasks, "submitted")
+
+	def start(self, Task):
+		self._set([Task], "running")
+
+	def heartbeat(self, Task):
+		""" Record that a running Task is still alive.
+		"""
+		connection = self._connect()
+		try:
+			connection.execute("UPDATE tasks SET updated = ? WHERE task = ? AND state = 'running'",
+				(time.time(), Task))
+			connection.commit()
+		finally:
+			connection.close()
+
+	def mark_lost(self, Tasks, Stale_seconds=STALE_SECONDS):
+		""" Mark those of Tasks that are running, but haven't sent a heartbeat in
+			Stale_seconds, as lost (e.g. LSF killed their job).
+
+			Returns: list of the tasks marked lost
+		"""
+		cutoff = time.time() - Stale_seconds
+		stale = [task for task, state in self.states(Tasks).items()
+			if state is not None and state[0] == "running" and state[2] < cutoff]
+		if len(stale) == 0:
+			return []
+		connection = self._connect()
+		try:
+			# Only if it's still running, it may have just finished
+			connection.executemany("UPDATE tasks SET state = 'lost' WHERE task = ? AND state = 'running' "
+				+"AND updated < ?", [(task, cutoff) for task in stale])
+			connection.commit()
+		finally:
+			connection.close()
+		return stale
+
+	def finish(self, Task, Exit_code):
+		""" Mark Task done (Exit_code 0) or failed (anything else).
+		"""
+		self._set([Task], "done" if Exit_code == 0 else "failed", Exit_code)
+
+	def states(self, Tasks):
+		""" Return a dictionary of task -> [state, exit code, time of the last update]
+			(None for tasks never added).
+		"""
+		found = dict()
+		tasks = list(set(Tasks))
+		connection = self._connect()
+		try:
+			# Only the tasks asked about, QUERY_CHUNK at a time
+			for chunk_i in range(0, len(tasks), self.QUERY_CHUNK):
+				chunk = tasks[chunk_i:chunk_i+self.QUERY_CHUNK]
+				for task, state, exit_code, updated in connection.execute("SELECT task, state, exit_code, updated "
+					+"FROM tasks WHERE task IN ("+",".join(["?"]*len(chunk))+")", chunk):
+					found[task] = [state, exit_code, updated]
+		finally:
+			connection.close()
+		return dict([[task, found.get(task, None)] for task in Tasks])
+
+	def wait_all(self, Tasks, Timeout=None, Fail_fast=True, Poll_seconds=1.0, Stale_seconds=STALE_SECONDS):
+		""" Block until every task has finished (or is lost).
+
+			Arguments:
+				Tasks:			list of task keys
+				Timeout:		seconds to wait before giving up, or None to wait forever
+				Fail_fast:		Boolean. Raise as soon as any task fails (or is lost),
+									instead of waiting for the rest.
+				Poll_seconds:	how often to check the database
+				Stale_seconds:	a running task without a heartbeat for this long is lost
+									(None to never mark tasks lost)
+
+			Returns: dictionary of task -> exit code (None for lost tasks)
+		"""
+		start_time = time.time()
+		while True:
+			if Stale_seconds is not None:
+				self.mark_lost(Tasks, Stale_seconds)
+			states = self.states(Tasks)
+			failed = [task for task in Tasks if states[task] is not None and states[task][0] in ["failed", "lost"]]
+			if Fail_fast and len(failed) > 0:
+				raise StandardError(str(len(failed))+" task(s) failed, e.g. "+failed[0]+" ("+states[failed[0]][0]
+					+", exit code "+str(states[failed[0]][1])+")")
+			unfinished = [task for task in Tasks if states[task] is None or states[task][0] not in self.FINISHED]
+			if len(unfinished) == 0:
+				return dict([[task, states[task][1]] for task in Tasks])
+			if Timeout is not None and time.time() - start_time > Timeout:
+				never_started = [task for task in unfinished if states[task] is None or states[task][0] == "submitted"]
+				raise StandardError("Timed out after "+str(Timeout)+" seconds with "+str(len(unfinished))
+					+" task(s) unfinished ("+str(len(never_started))+" never started), e.g. "+unfinished[0])
+			time.sleep(Poll_seconds)
@@ -0,0 +1,607 @@
+#/usr/bin/python
+
+# join_functions.py
+# 2026_10_18
+
+### Functions for joining split eQTL shards to a GWAS table on an integer
+###  variant key (see genomic_index.variant_key, and join_gene_trait.py): what
+###  make_gene_trait_tables.R does with merge() and one _analyze_me text file
+###  per gene and trait.
+###
+###  The GWAS table is read once, and its rows in the position bins the genes
+###  need are written to a small binary file per bin (see partition_gwas).
+###  The genes are then taken in order along each chromosome: each bin is
+###  loaded once, into a dictionary of variant key -> rows, and probed with the
+###  rows of every gene shard that overlaps it (see join_gene_trait).
+###
+###  A GWAS table already split into position bins (see bin_by_position.py)
+###  isn't read whole at all: BinnedTable reads only the bins a window overlaps,
+###  and join_gene_trait loads only the bins its genes need.
+###
+###  Output is one binary batch (see JoinBatchWriter and JoinBatch):
+###    Name.bin: each gene/trait pair's rows, as little-endian int64 variant
+###      keys, then each value column as float64
+###    Name.idx: where each pair is in Name.bin, like:
+###      #columns	key	beta_eQTL	varbeta_eQTL	...
+###      group	trait	chr	offset	n_rows
+###      ENSG0001	LDL	1	0	412
+###      ...
+###
+###  Example usage:
+###    batch = JoinBatch("/my_directory/LDL")
+###    tables = [batch.table(pair) for pair in batch.pairs()]
+###    results = coloc_abf.coloc_abf_batch([table for table in tables if len(table["key"]) > 0])
+
+import os
+import csv
+import gzip
+import struct
+import shutil
+import tempfile
+from collections import OrderedDict
+from helper_functions import open_input, input_position
+from split_functions import split_row, NA_VALUES, GroupStore, PROGRESS_ROWS
+from genomic_index import IntervalIndex, PositionBins, normalize_chromosome, chromosome_code
+from genomic_index import variant_key, key_code, key_chromosome, key_position
+
+# Interval index of a table split into position bins (see bin_by_position.py)
+BIN_INDEX = "bins.idx"
+# GWAS rows held per bin before they're written to its file
+FLUSH_ROWS = 10000
+
+
+def parse_value_columns(Spec):
+	""" Parse which values a join carries from a table: "name:#,name:#^2,name=number".
+
+		name:#		the number in column #
+		name:#^2	its square (e.g. varbeta from a standard error column)
+		name=number	the same number for every row (e.g. a sample size)
+
+		Returns: list of [name, column (or None), square (True/False), number (or None)]
+	"""
+	values = list()
+	for part in Spec.split(","):
+		if len(part) == 0:
+			continue
+		if "=" in part:
+			name, number = part.split("=", 1)
+			try:
+				values.append([name, None, False, float(number)])
+			except ValueError:
+				raise ValueError("Expected name=number, instead got: "+part)
+			continue
+		name, sep, col = part.partition(":")
+		square = col.endswith("^2")
+		if square:
+			col = col[:-len("^2")]
+		if len(name) == 0 or not col.isdigit():
+			raise ValueError("Expected name:#, name:#^2, or name=number, instead got: "+part)
+		values.append([name, int(col), square, None])
+	if len(values) == 0:
+		raise ValueError("No value columns given in: "+Spec)
+	return values
+
+def row_values(Split_line, Values):
+	""" Return a row's values (see parse_value_columns) as floats, or None if any is missing (NA).
+
+		A value that's neither a number nor missing raises a ValueError, since it
+		usually means the wrong column was given.
+	"""
+	numbers = list()
+	for name, col_i, square, number in Values:
+		if col_i is None:
+			numbers.append(number)
+			continue
+		value = Split_line[col_i]
+		if value in NA_VALUES:
+			return None
+		try:
+			number = float(value)
+		except ValueError:
+			raise ValueError("Expected "+name+" (column "+str(col_i)+") to be a number or NA, instead got: '"
+				+value+"'. Is it the right column?")
+		numbers.append(number*number if square else number)
+	return numbers
+
+
+def _write_chunk(F, Keys, Values):
+	""" Write rows to an open binary file: the row count, the keys, then each value column.
+	"""
+	n_rows = len(Keys)
+	F.write(struct.pack("<q", n_rows))
+	F.write(struct.pack("<%dq" % n_rows, *Keys))
+	for col_i in range(len(Values[0]) if n_rows > 0 else 0):
+		F.write(struct.pack("<%dd" % n_rows, *[values[col_i] for values in Values]))
+
+def partition_gwas(In_file, Chr_col, Pos_col, Values, Bins, Bin_bp, Work_dir, N_procs=1, Progress=None):
+	""" Read a GWAS table once, writing its rows in Bins to a binary file per bin.
+
+		Rows that are in no bin in Bins, or have a missing value, are skipped.
+
+		Arguments:
+			In_file:	"/my_directory/gwas.txt[.gz]" tab delimited, single line header
+			Chr_col:	integer. Column with the chromosome [0 = first column]
+			Pos_col:	integer. Column with the position
+			Values:		what to carry from each row (see parse_value_columns)
+			Bins:		set of [chromosome code, position/Bin_bp] tuples to keep
+			Bin_bp:		integer > 0. Width of each bin.
+			Work_dir:	"/my_directory/" where the bin files are written
+			N_procs:	integer > 0. If In_file is a bgzip file, the number of
+							processes decompressing it.
+			Progress:	function or None. Called every PROGRESS_ROWS rows with the rows
+							read so far and the bytes of In_file read (see input_position).
+
+		Returns: [dictionary of bin -> [bin file, n_rows], rows read]
+	"""
+	if type(Bin_bp) is not int or Bin_bp < 1:
+		raise ValueError("Bin_bp needs to be an integer > 0.")
+	n_fields = max([Chr_col, Pos_col] + [col_i for name, col_i, square, number in Values
+		if col_i is not None]) + 1
+	bins = dict()
+	# bin -> [keys, rows of values] not yet written
+	held = dict()
+
+	def flush(Bin):
+		keys, values = held.pop(Bin)
+		with open(bins[Bin][0], 'ab') as f_OUT:
+			_write_chunk(f_OUT, keys, values)
+
+	f_IN = open_input(In_file, N_procs)
+	try:
+		f_IN.readline()
+		row_i = -1
+		for row_i, line in enumerate(f_IN):
+			if Progress is not None and row_i % PROGRESS_ROWS == 0:
+				Progress(row_i, input_position(f_IN))
+			split_line = split_row(line, n_fields)
+			key = variant_key(split_line[Chr_col], split_line[Pos_col])
+			if key is None:
+				continue
+			row_bin = (key_code(key), key_position(key)/Bin_bp)
+			if row_bin not in Bins:
+				continue
+			values = row_values(split_line, Values)
+			if values is None:
+				continue
+			if row_bin not in held:
+				if row_bin not in bins:
+					bins[row_bin] = [os.path.join(Work_dir, "bin_"+str(row_bin[0])+"_"+str(row_bin[1])), 0]
+				held[row_bin] = [list(), list()]
+			held[row_bin][0].append(key)
+			held[row_bin][1].append(values)
+			bins[row_bin][1] = bins[row_bin][1] + 1
+			if len(held[row_bin][0]) >= FLUSH_ROWS:
+				flush(row_bin)
+	finally:
+		f_IN.close()
+	for row_bin in held.keys():
+		flush(row_bin)
+	return [bins, row_i + 1]
+
+def load_bin(Path, N_values):
+	""" Read a bin file written by partition_gwas.
+
+		Returns: dictionary of variant key -> list of rows of values (more than one
+			if the table has the variant more than once)
+	"""
+	rows = dict()
+	with open(Path, 'rb') as f_IN:
+		while True:
+			count = f_IN.read(8)
+			if len(count) < 8:
+				break
+			n_rows = struct.unpack("<q", count)[0]
+			keys = struct.unpack("<%dq" % n_rows, f_IN.read(8*n_rows))
+			columns = [struct.unpack("<%dd" % n_rows, f_IN.read(8*n_rows)) for col_i in range(N_values)]
+			for row_i in range(n_rows):
+				values = [column[row_i] for column in columns]
+				if keys[row_i] in rows:
+					rows[keys[row_i]].append(values)
+				else:
+					rows[keys[row_i]] = [values]
+	return rows
+
+def key_rows(Rows, Chr_col, Pos_col, Values):
+	""" Key rows (lists of strings, e.g. from BinnedTable.bin_rows) by variant, as load_bin does.
+
+		Rows without a usable chromosome and position, or with a missing value, are left out.
+
+		Returns: [dictionary of variant key -> list of rows of values, rows kept]
+	"""
+	rows = dict()
+	n_kept = 0
+	n_fields = max([Chr_col, Pos_col] + [col_i for name, col_i, square, number in Values
+		if col_i is not None]) + 1
+	for row in Rows:
+		if len(row) < n_fields:
+			continue
+		key = variant_key(row[Chr_col], row[Pos_col])
+		if key is None:
+			continue
+		values = row_values(row, Values)
+		if values is None:
+			continue
+		n_kept = n_kept + 1
+		if key in rows:
+			rows[key].append(values)
+		else:
+			rows[key] = [values]
+	return [rows, n_kept]
+
+
+def read_group_table(Split_dir, Location, Group, Stores=None):
+	""" Read a split group's rows from where the interval index says they are.
+
+		Handles each output format and layout of the splitters: csv and bgzip
+		files, npz files, and stores (Location is then the store's index).
+
+		Arguments:
+			Split_dir:	"/my_directory/" the split's output directory
+			Location:	where the group is, relative to Split_dir (see IntervalIndex.location)
+			Group:		the group
+			Stores:		dictionary of store index -> GroupStore, kept open between calls, or None
+
+		Returns: [header, list of rows (lists of strings)]
+	"""
+	path = os.path.join(Split_dir, Location)
+	if Location.endswith(".idx"):
+		if Stores is None:
+			Stores = dict()
+		if path not in Stores:
+			Stores[path] = GroupStore(Store_dir = os.path.dirname(path),
+						Name = os.path.basename(path)[:-len(".idx")])
+		return [Stores[path].head, Stores[path].rows(Group)]
+	if Location.endswith(".npz"):
+		try:
+			import numpy
+		except ImportError:
+			raise ImportError("Reading npz shards needs numpy. Please install it.")
+		arrays = numpy.load(path)
+		head = list(arrays["__columns__"])
+		columns = [["NA" if value != value else str(value) for value in arrays[name].tolist()]
+			for name in head]
+		return [head, [list(row) for row in zip(*columns)]]
+	if Location.endswith(".gz"):
+		with gzip.open(path, 'rb') as f_IN:
+			lines = f_IN.read().splitlines()
+		rows = [line.split('\t') for line in lines]
+	else:
+		with open(path, 'rb') as f_IN:
+			rows = list(csv.reader(f_IN))
+	if len(rows) == 0:
+		return [list(), list()]
+	return [rows[0], rows[1:]]
+
+
+class BinnedTable(object):
+	""" Read rows of a table split into position bins (see bin_by_position.py) by genomic
+		window, reading only the bins that overlap it.
+
+		Example usage:
+			table = BinnedTable("/my_directory/LDL_bins/")
+			rows = table.rows("1", 109000000, 111000000)
+			table.close()
+
+		Arguments:
+			Bin_dir:	"/my_directory/" the binned split's output directory, with its bins.idx
+
+		Attributes:
+			head:		list of the column names of the rows
+			bins:		genomic_index.PositionBins the table was split with (its columns
+							are those of the rows)
+			bins_read:	how many bins have been read so far
+	"""
+	def __init__(self, Bin_dir):
+		path = os.path.join(Bin_dir, BIN_INDEX)
+		if not os.path.isfile(path):
+			raise ValueError(path+" not found. Was the table split with bin_by_position.py?")
+		self.bin_dir = Bin_dir
+		self.index = IntervalIndex(path)
+		try:
+			self.bins = PositionBins(Chr_col = int(self.index.meta["chr_col"][0]),
+						Pos_col = int(self.index.meta["pos_col"][0]),
+						Bin_bp = int(self.index.meta["bin_bp"][0]))
+			self.head = self.index.meta["columns"]
+		except (KeyError, IndexError, ValueError):
+			raise ValueError(path+" doesn't say how its table was binned (#bin_bp, #chr_col, #pos_col, #columns).")
+		self.bins_read = 0
+		self.stores = dict()
+
+	def __contains__(self, Bin):
+		return Bin in self.index.locations
+
+	def __len__(self):
+		return len(self.index.locations)
+
+	def bin_rows(self, Bin):
+		""" Return every row (a list of strings) of a bin, or [] if there's no such bin.
+		"""
+		if Bin not in self.index.locations:
+			return []
+		self.bins_read = self.bins_read + 1
+		return read_group_table(self.bin_dir, self.index.location(Bin), Bin, self.stores)[1]
+
+	def rows(self, Chr, Start, End):
+		""" Return the rows at positions Start to End (inclusive) on Chr, in order of their bins.
+		"""
+		found = list()
+		pos_col = self.bins.pos_col
+		for row_bin in self.bins.bins(Chr, Start, End):
+			interval = self.index.interval(row_bin)
+			# Skip bins whose rows are all outside the window
+			if interval is None or interval[2] < Start or interval[1] > End:
+				continue
+			for row in self.bin_rows(row_bin):
+				try:
+					pos = int(row[pos_col])
+				except ValueError:
+					continue
+				if Start <= pos <= End:
+					found.append(row)
+		return found
+
+	def close(self):
+		for store in self.stores.values():
+			store.close()
+		self.stores = dict()
+
+
+class JoinBatchWriter(object):
+	""" Write joined gene/trait pairs to one binary file, plus an index of where each pair is.
+
+		Arguments:
+			Prefix:		"/my_directory/LDL" writes LDL.bin and LDL.idx
+			Columns:	list of the value columns' names, in the order rows give them
+	"""
+	def __init__(self, Prefix, Columns):
+		self.prefix = Prefix
+		self.columns = list(Columns)
+		self.f = open(Prefix+".bin", 'wb')
+		# [group, trait, chr, offset, n_rows] of each pair
+		self.entries = list()
+
+	def write_pair(self, Group, Trait, Chr, Keys, Values):
+		""" Write one pair's rows: their variant keys, and a list of values for each.
+		"""
+		offset = self.f.tell()
+		if len(Keys) > 0:
+			self.f.write(struct.pack("<%dq" % len(Keys), *Keys))
+			for col_i in range(len(self.columns)):
+				self.f.write(struct.pack("<%dd" % len(Keys), *[values[col_i] for values in Values]))
+		self.entries.append([Group, Trait, Chr, offset, len(Keys)])
+
+	def close(self):
+		""" Close the data file and write the index.
+
+			Returns: filepath of the index
+		"""
+		self.f.close()
+		with open(self.prefix+".idx", 'wb') as f_OUT:
+			f_OUT.write("#columns\t"+"\t".join(["key"] + self.columns)+"\n")
+			f_OUT.write("group\ttrait\tchr\toffset\tn_rows\n")
+			for entry in self.entries:
+				f_OUT.write("\t".join([str(value) for value in entry])+"\n")
+		return self.prefix+".idx"
+
+
+class JoinBatch(object):
+	""" Read the pairs of a batch written by JoinBatchWriter, seeking straight to each one.
+
+		Arguments:
+			Prefix:	"/my_directory/LDL" reads LDL.bin and LDL.idx
+	"""
+	def __init__(self, Prefix):
+		if not os.path.isfile(Prefix+".idx"):
+			raise ValueError(Prefix+".idx not found. Was the batch written there?")
+		self.prefix = Prefix
+		self.columns = None
+		# [group, trait] -> [chr, offset, n_rows]
+		self.index = OrderedDict()
+		with open(Prefix+".idx", 'rb') as f_IN:
+			for line in f_IN:
+				split_line = line.rstrip('\r\n').split('\t')
+				if split_line[0] == "#columns":
+					self.columns = split_line[2:]
+				elif split_line[0] == "group" and split_line[1] == "trait":
+					continue
+				else:
+					self.index[(split_line[0], split_line[1])] = [split_line[2], int(split_line[3]),
+						int(split_line[4])]
+		self.f = None
+
+	def pairs(self):
+		""" Return [group, trait] of every pair, in the order they were written.
+		"""
+		return self.index.keys()
+
+	def __len__(self):
+		return len(self.index)
+
+	def table(self, Pair):
+		""" Return a pair's rows as a dictionary of column -> numpy array, as
+			coloc_abf.coloc_abf_batch takes them ("key" holds the variant keys,
+			and "chr_pos" the "chr:pos" names make_gene_trait_tables.R used).
+		"""
+		try:
+			import numpy
+		except ImportError:
+			raise ImportError("JoinBatch.table needs numpy. Please install it.")
+		chrom, offset, n_rows = self.index[tuple(Pair)]
+		if self.f is None:
+			self.f = open(self.prefix+".bin", 'rb')
+		self.f.seek(offset)
+		data = self.f.read(8*n_rows*(1 + len(self.columns)))
+		table = {"key": numpy.frombuffer(data, dtype="<i8", count=n_rows)}
+		for col_i, name in enumerate(self.columns):
+			table[name] = numpy.frombuffer(data, dtype="<f8", count=n_rows, offset=8*n_rows*(col_i+1))
+		table["chr_pos"] = [key_chromosome(key)+":"+str(key_position(key)) for key in table["key"].tolist()]
+		return table
+
+	def close(self):
+		if self.f is not None:
+			self.f.close()
+			self.f = None
+
+
+def join_gene_trait(Gwas_file, Gwas_chr_col, Gwas_pos_col, Gwas_values, Split_dir, Groups,
+	Eqtl_chr_col, Eqtl_pos_col, Eqtl_values, Out_prefix, Trait, Bin_bp=1000000, Window=1000000,
+	Temp_dir="", N_procs=1, Progress=None, Stage=None):
+	""" Join each group's (gene's) split rows to a GWAS table on their variant keys,
+		and write every gene/trait pair to one batch (see JoinBatchWriter).
+
+		Like merge(gene_table, trait_table, by = "chr_pos") in make_gene_trait_tables.R,
+		each pair gets a row for every shared variant (rows with a missing value
+		are left out first, as read_eQTL and read_GWAS do).
+
+		Only GWAS rows within Window bp of a gene's interval in the split's
+		intervals.idx are read in, so Window needs to cover how far a gene's rows
+		reach past its interval (0 if the index was made from the rows' own
+		positions, with --interval_cols; the cis window if it came from a gene table).
+
+		If Gwas_file is a directory split with bin_by_position.py, there's no
+		partition stage: only the bins the genes need are read (see BinnedTable),
+		and the chromosome and position columns and the bin width are its own.
+
+		Arguments:
+			Gwas_file:		"/my_directory/gwas.txt[.gz]" tab delimited, single line header,
+								or "/my_directory/gwas_bins/" (see above)
+			Gwas_chr_col, Gwas_pos_col:	integers. The GWAS chromosome and position columns
+								(not used with a binned Gwas_file).
+			Gwas_values:	values carried from the GWAS rows (see parse_value_columns; of the
+								binned rows' columns, with a binned Gwas_file)
+			Split_dir:		"/my_directory/" the eQTL split's output, with its intervals.idx
+			Groups:			list of groups to join, or None for every group in intervals.idx
+			Eqtl_chr_col, Eqtl_pos_col:	integers. The chromosome and position columns of the split's rows.
+			Eqtl_values:	values carried from the split's rows (see parse_value_columns)
+			Out_prefix:		"/my_directory/LDL" writes LDL.bin and LDL.idx
+			Trait:			name of the trait, recorded with each pair
+			Bin_bp:			integer > 0. Width of the GWAS position bins (not used with a binned
+								Gwas_file).
+			Window:			integer >= 0. See above.
+			Temp_dir:		where the bin files are written (default: the system temp directory)
+			N_procs:		integer > 0. If Gwas_file is a bgzip file, the number of
+								processes decompressing it.
+			Progress:		function or None. Passed to partition_gwas.
+			Stage:			function or None. Called with the name of each stage as it starts
+								("partition", then "join"; just "join" with a binned Gwas_file).
+
+		Returns: dictionary of counts: pairs, groups_missing, gwas_rows, gwas_rows_kept,
+			bins, bin_loads, rows_joined
+	"""
+	index_path = os.path.join(Split_dir, "intervals.idx")
+	if not os.path.isfile(index_path):
+		raise ValueError(index_path+" not found. Was the split run with --interval_cols or --gene_table?")
+	if type(Window) is not int or Window < 0:
+		raise ValueError("Window needs to be an integer >= 0.")
+	names = [value[0] for value in Eqtl_values + Gwas_values]
+	if len(set(names)) != len(names) or "key" in names:
+		raise ValueError("The value names need to be different from each other, and from 'key': "+str(names))
+	index = IntervalIndex(index_path)
+	if os.path.isdir(Gwas_file):
+		table = BinnedTable(Gwas_file)
+		Gwas_chr_col = table.bins.chr_col
+		Gwas_pos_col = table.bins.pos_col
+		Bin_bp = table.bins.bin_bp
+	else:
+		table = None
+	if Groups is None:
+		Groups = index.intervals.keys()
+	# [chromosome code, start, end, chr, group] of each gene, in order along the genome
+	genes = list()
+	n_missing = 0
+	for group in Groups:
+		interval = index.interval(group)
+		code = chromosome_code(interval[0]) if interval is not None else None
+		if code is None:
+			n_missing = n_missing + 1
+			continue
+		genes.append([code, interval[1], interval[2], interval[0], group])
+	genes.sort()
+
+	work_dir = tempfile.mkdtemp(prefix="join_", dir=Temp_dir if len(Temp_dir) > 0 else None)
+	try:
+		if table is not None:
+			# bin -> [bin name, rows kept], for the bins read
+			bin_files = dict()
+			n_gwas = 0
+		else:
+			bins = set()
+			for code, start, end, chrom, group in genes:
+				for bin_i in range(max(start - Window, 0)/Bin_bp, (end + Window)/Bin_bp + 1):
+					bins.add((code, bin_i))
+			if Stage is not None:
+				Stage("partition")
+			bin_files, n_gwas = partition_gwas(In_file = Gwas_file,
+						Chr_col = Gwas_chr_col,
+						Pos_col = Gwas_pos_col,
+						Values = Gwas_values,
+						Bins = bins,
+						Bin_bp = Bin_bp,
+						Work_dir = work_dir,
+						N_procs = N_procs,
+						Progress = Progress)
+
+		if Stage is not None:
+			Stage("join")
+		writer = JoinBatchWriter(Out_prefix, names)
+		eqtl_fields = max([Eqtl_chr_col, Eqtl_pos_col] + [value[1] for value in Eqtl_values
+			if value[1] is not None]) + 1
+		# bin -> dictionary of variant key -> GWAS values, for the bins in use
+		loaded = dict()
+		n_loads = 0
+		n_joined = 0
+		stores = dict()
+		for code, start, end, chrom, group in genes:
+			# Genes are in order, so bins left of this one's window won't be needed again
+			first_bin = (code, max(start - Window, 0)/Bin_bp)
+			for row_bin in loaded.keys():
+				if row_bin < first_bin:
+					del loaded[row_bin]
+			head, rows = read_group_table(Split_dir, index.location(group), group, stores)
+			keys = list()
+			joined = list()
+			for row in rows:
+				if len(row) < eqtl_fields:
+					continue
+				key = variant_key(row[Eqtl_chr_col], row[Eqtl_pos_col])
+				if key is None:
+					continue
+				row_bin = (key_code(key), key_position(key)/Bin_bp)
+				if row_bin not in loaded:
+					if table is not None:
+						bin_name = table.bins.bin_name(row_bin[0], row_bin[1])
+						if bin_name in table:
+							bin_rows = table.bin_rows(bin_name)
+							loaded[row_bin], n_kept = key_rows(bin_rows, Gwas_chr_col, Gwas_pos_col, Gwas_values)
+							n_loads = n_loads + 1
+							if row_bin not in bin_files:
+								bin_files[row_bin] = [bin_name, n_kept]
+								n_gwas = n_gwas + len(bin_rows)
+						else:
+							loaded[row_bin] = dict()
+					elif row_bin in bin_files:
+						loaded[row_bin] = load_bin(bin_files[row_bin][0], len(Gwas_values))
+						n_loads = n_loads + 1
+					else:
+						loaded[row_bin] = dict()
+				gwas_rows = loaded[row_bin].get(key)
+				if gwas_rows is None:
+					continue
+				values = row_values(row, Eqtl_values)
+				if values is None:
+					continue
+				for gwas_values in gwas_rows:
+					keys.append(key)
+					joined.append(values + gwas_values)
+			writer.write_pair(group, Trait, normalize_chromosome(chrom), keys, joined)
+			n_joined = n_joined + len(keys)
+		writer.close()
+		for store in stores.values():
+			store.close()
+	finally:
+		shutil.rmtree(work_dir)
+		if table is not None:
+			table.close()
+	return {"pairs": len(genes), "groups_missing": n_missing, "gwas_rows": n_gwas,
+		"gwas_rows_kept": sum([bin_file[1] for bin_file in bin_files.values()]),
+		"bins": len(bin_files), "bin_loads": n_loads, "rows_joined": n_joined}
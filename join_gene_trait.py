@@ -0,0 +1,184 @@
+#!/usr/bin/python
+
+### join_gene_trait.py
+### 2026_10_18
+
+### This script joins a GWAS table to the genes of a split eQTL file (the output
+###  of fileize_by_column.py or folderize_by_column.py, with its intervals.idx)
+###  on shared variants, and writes every gene/trait pair to one binary batch
+###  (see join_functions.py), instead of an _analyze_me text file per pair
+###  (as make_gene_trait_tables.R does).
+###
+###  The GWAS table is read once. Each of its position bins is loaded once,
+###  and joined to every gene that overlaps it on an integer variant key
+###  (chromosome and position). A GWAS table split with bin_by_position.py
+###  isn't read whole: only the bins the genes need are.
+###
+###  Arguments:
+###    gwas_file.txt: GWAS summary statistics txt (or txt.gz) file, or the output
+###      directory of bin_by_position.py (ending in a forward slash)
+###	 valid filepath
+###    Chr_col#,Pos_col#: the GWAS chromosome and position columns
+###	 integers (0 = first column; for a bin_by_position.py directory, only used
+###      to read --sentinels, its bins.idx records the columns of its rows)
+###    split_directory/: the eQTL split's output directory, with intervals.idx
+###      (split with --interval_cols, or --gene_table)
+###    Chr_col#,Pos_col#: the chromosome and position columns of the split's rows
+###	 integers (0 = first column, of the kept columns)
+###    output_prefix: writes output_prefix.bin and output_prefix.idx
+###
+###  Options:
+###    --gwas_values name:#,name:#^2,name=number: values to carry from the GWAS rows.
+###      name:# is the number in column #, name:#^2 its square (e.g. a variance from a
+###      standard error), name=number the same number for every row (e.g. a sample size).
+###      (default beta_GWAS:8,varbeta_GWAS:9^2,MAF:7,N_GWAS=100; for a bin_by_position.py
+###      directory, the columns are those it kept)
+###    --eqtl_values name:#,...: values to carry from the split's rows, as above
+###      (default beta_eQTL:4,varbeta_eQTL:5^2,N_eQTL=100)
+###      Rows with a missing (NA) value are left out, as read_eQTL and read_GWAS do.
+###    --trait name: the trait's name in the index (default: the GWAS file's name)
+###    --groups keys.txt: only join these genes, one per line ("-" reads them from stdin)
+###    --sentinels sentinels.txt: only join genes within --range bp of these SNPs
+###      (written by get_sentinel_snps.py; same columns as the GWAS file)
+###    --range #: see --sentinels (default 100000)
+###    --bin_bp #: width of the GWAS position bins (default 1000000; a bin_by_position.py
+###      directory's own bins are used instead)
+###    --window #: how far a gene's rows may be from its interval in intervals.idx
+###      (default 1000000; 0 is enough if the split used --interval_cols)
+###    --temp_dir /scratch_dir/: where the GWAS bins are written (default: the system temp directory)
+###    --n_procs #: with a bgzip GWAS file, the number of processes decompressing it (default 1)
+###    --metrics on: log each stage's time, progress, and memory to output_prefix.metrics.jsonl (default)
+###    --metrics off: only print them
+###    --progress_seconds #: how often to report progress (default 60)
+###
+###  Usage:
+###    python join_gene_trait.py LDL.txt.gz 2,3 /data/eQTLs/Liver/ 2,3 /data/joined/Liver_LDL --sentinels LDL_sentinels.txt
+###    python join_gene_trait.py /data/GWAS/LDL_bins/ 0,1 /data/eQTLs/Liver/ 2,3 /data/joined/Liver_LDL --trait LDL
+
+import sys
+import os
+from helper_functions import get_command_args
+from split_functions import read_group_list
+from genomic_index import IntervalIndex, normalize_chromosome
+from join_functions import parse_value_columns, join_gene_trait, BIN_INDEX
+from metrics_functions import SplitMetrics
+
+print "Initiating join_gene_trait.py"
+print "Argument List:", str(sys.argv[1:])
+
+if (len(sys.argv) < 6):
+	raise Exception("Expected at least five command arguments.")
+gwas_FILE = str(sys.argv[1])
+Gwas_cols = str(sys.argv[2])
+split_DIR = str(sys.argv[3])
+Eqtl_cols = str(sys.argv[4])
+out_PREFIX = str(sys.argv[5])
+options = get_command_args(sys.argv[6:])
+Gwas_values = options.get("gwas_values", "beta_GWAS:8,varbeta_GWAS:9^2,MAF:7,N_GWAS=100")
+Eqtl_values = options.get("eqtl_values", "beta_eQTL:4,varbeta_eQTL:5^2,N_eQTL=100")
+Trait = options.get("trait", os.path.basename(gwas_FILE.rstrip("/")).split(".")[0])
+Groups = options.get("groups", "")
+Sentinels = options.get("sentinels", "")
+Range = int(float(options.get("range", 1e5)))
+Bin_bp = int(float(options.get("bin_bp", 1e6)))
+Window = int(float(options.get("window", 1e6)))
+Temp_dir = options.get("temp_dir", "")
+N_procs = int(options.get("n_procs", 1))
+Metrics = options.get("metrics", "on")
+Progress_seconds = float(options.get("progress_seconds", 60))
+
+if os.path.isdir(gwas_FILE):
+	if gwas_FILE[-1] != "/":
+		raise ValueError("The GWAS bin directory needs to end with a forward slash.")
+	if not os.path.isfile(gwas_FILE+BIN_INDEX):
+		raise ValueError(gwas_FILE+BIN_INDEX+" not found. Was the GWAS table split with bin_by_position.py?")
+elif not (os.path.isfile(gwas_FILE)):
+	raise ValueError(gwas_FILE+" not found. Is it a *full* and valid file path?")
+cols = list()
+for col_arg in [Gwas_cols, Eqtl_cols]:
+	split_cols = col_arg.split(",")
+	if len(split_cols) != 2 or not all(col.isdigit() for col in split_cols):
+		raise ValueError("Expected the column arguments to look like Chr_col#,Pos_col#, instead got: "+col_arg)
+	cols.append([int(col) for col in split_cols])
+if not (os.path.isdir(split_DIR)):
+	raise ValueError(split_DIR+" not found. Is it a valid directory?")
+if split_DIR[-1] != "/":
+	raise ValueError("The split directory needs to end with a forward slash.")
+if not os.path.isfile(split_DIR+"intervals.idx"):
+	raise ValueError(split_DIR+"intervals.idx not found. Was the split run with --interval_cols or --gene_table?")
+if not os.path.isdir(os.path.dirname(os.path.abspath(out_PREFIX))):
+	raise ValueError("The directory of "+out_PREFIX+" wasn't found.")
+gwas_values = parse_value_columns(Gwas_values)
+eqtl_values = parse_value_columns(Eqtl_values)
+if len(Groups) > 0 and len(Sentinels) > 0:
+	raise ValueError("Please only choose one: --groups or --sentinels.")
+if len(Sentinels) > 0 and not os.path.isfile(Sentinels):
+	raise ValueError(Sentinels+" not found. Is it a *full* and valid file path?")
+if Range < 0 or Window < 0:
+	raise ValueError("--range and --window need to be >= 0.")
+if Bin_bp < 1:
+	raise ValueError("--bin_bp needs to be an integer > 0.")
+if len(Temp_dir) > 0 and not os.path.isdir(Temp_dir):
+	raise ValueError(Temp_dir+" not found. Is it a valid directory?")
+if N_procs < 1:
+	raise ValueError("--n_procs needs to be an integer > 0.")
+if Metrics != "on" and Metrics != "off":
+	raise ValueError("Expected --metrics to be on or off, instead got: "+Metrics)
+if Progress_seconds < 0:
+	raise ValueError("--progress_seconds needs to be >= 0.")
+
+print "Passed script checks."
+
+if len(Groups) > 0:
+	groups = read_group_list(Groups)
+elif len(Sentinels) > 0:
+	# Genes within Range of a sentinel SNP, as make_gene_trait_tables.R picks them
+	index = IntervalIndex(split_DIR+"intervals.idx")
+	positions = dict()
+	with open(Sentinels, 'rb') as f_IN:
+		f_IN.readline()
+		for line in f_IN:
+			split_line = line.rstrip('\r\n').split('\t')
+			try:
+				positions.setdefault(normalize_chromosome(split_line[cols[0][0]]), list()).append(
+					int(split_line[cols[0][1]]))
+			except (ValueError, IndexError):
+				continue
+	groups = list()
+	for chrom, chr_positions in positions.items():
+		groups.extend(index.genes_near(chrom, chr_positions, Range))
+	print str(len(groups))+" gene(s) within "+str(Range)+" bp of "+str(sum([len(chr_positions)
+		for chr_positions in positions.values()]))+" sentinel SNP(s)."
+else:
+	groups = None
+
+metrics = SplitMetrics(Log_file = out_PREFIX+".metrics.jsonl" if Metrics == "on" else None,
+			In_file = gwas_FILE,
+			Interval_seconds = Progress_seconds,
+			Fields = {"trait": Trait, "split_dir": split_DIR})
+counts = join_gene_trait(Gwas_file = gwas_FILE,
+			Gwas_chr_col = cols[0][0],
+			Gwas_pos_col = cols[0][1],
+			Gwas_values = gwas_values,
+			Split_dir = split_DIR,
+			Groups = groups,
+			Eqtl_chr_col = cols[1][0],
+			Eqtl_pos_col = cols[1][1],
+			Eqtl_values = eqtl_values,
+			Out_prefix = out_PREFIX,
+			Trait = Trait,
+			Bin_bp = Bin_bp,
+			Window = Window,
+			Temp_dir = Temp_dir,
+			N_procs = N_procs,
+			Progress = metrics.progress,
+			Stage = metrics.start_stage)
+metrics.finish(counts)
+
+if counts["groups_missing"] > 0:
+	print "Warning: "+str(counts["groups_missing"])+" gene(s) weren't in "+split_DIR+"intervals.idx (or had no usable chromosome)."
+print "Read "+str(counts["gwas_rows"])+" GWAS row(s), kept "+str(counts["gwas_rows_kept"])+" in " \
+	+str(counts["bins"])+" bin(s) (loaded "+str(counts["bin_loads"])+" time(s))."
+print "Joined "+str(counts["pairs"])+" gene/trait pair(s), "+str(counts["rows_joined"])+" shared row(s): " \
+	+out_PREFIX+".bin, "+out_PREFIX+".idx"
+print "Completed join_gene_trait.py"
@@ -0,0 +1,172 @@
+#/usr/bin/python
+
+# metrics_functions.py
+# 2026_10_18
+
+### Instrumentation for long running scripts like fileize_by_column.py and
+###  folderize_by_column.py: how long each stage took, how far through its
+###  input a stage is (with an ETA), and the process' memory and open files,
+###  printed and written to a JSON-lines log (one JSON object per line).
+###
+###  Example log lines:
+###    {"event": "start", "run": "host:1234:1760000000", "input": "/data/Liver.txt", ...}
+###    {"event": "progress", "stage": "split", "rows": 4000000, "fraction": 0.41, "eta_seconds": 52.3, ...}
+###    {"event": "stage", "stage": "split", "seconds": 88.1, "rows": 9750000, ...}
+###    {"event": "finish", "stages": {"sort": 120.4, "split": 88.1}, "peak_rss_mb": 612.0, ...}
+
+import os
+import sys
+import json
+import time
+import socket
+import resource
+
+# Page size, for reading the resident set size from /proc
+PAGE_BYTES = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb():
+	""" Return this process' resident set size in MB, or None if it can't be read (not Linux).
+	"""
+	try:
+		with open("/proc/self/statm", 'rb') as f_IN:
+			return int(f_IN.read().split()[1])*PAGE_BYTES/1048576.0
+	except (IOError, IndexError, ValueError):
+		return None
+
+def peak_rss_mb():
+	""" Return the peak resident set size of this process, and of its largest finished child, in MB.
+	"""
+	# ru_maxrss is in kilobytes on Linux, bytes on Mac OS
+	scale = 1048576.0 if sys.platform == "darwin" else 1024.0
+	return [resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/scale,
+		resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss/scale]
+
+def open_file_count():
+	""" Return how many file descriptors this process has open, or None if it can't tell (not Linux).
+	"""
+	try:
+		return len(os.listdir("/proc/self/fd"))
+	except OSError:
+		return None
+
+
+class SplitMetrics(object):
+	""" Record a run's stages, progress, and resource use in a JSON-lines log.
+
+		Call start_stage() and end_stage() around each stage, pass progress()
+		as the Progress callback of the split functions, and call finish()
+		at the end. Progress is logged (and printed) at most every
+		Interval_seconds, with an ETA from how far through In_file it is.
+
+		Arguments:
+			Log_file:			"/my_directory/split.metrics.jsonl" appended to (or None to only print)
+			In_file:			"/my_directory/my_fav_file.txt" the input, for its size
+			Interval_seconds:	number >= 0. Least time between progress lines.
+			Fields:				dictionary of more fields to log at the start (e.g. settings)
+	"""
+	def __init__(self, Log_file, In_file, Interval_seconds=60, Fields=None):
+		self.log_file = Log_file
+		self.in_file = In_file
+		self.in_bytes = os.path.getsize(In_file)
+		self.interval_seconds = Interval_seconds
+		self.start_time = time.time()
+		self.run = socket.gethostname()+":"+str(os.getpid())+":"+str(int(self.start_time))
+		# [stage, seconds] for each finished stage
+		self.stages = list()
+		self.stage = None
+		self.stage_start = None
+		self.stage_bytes = self.in_bytes
+		self.last_progress = 0
+		self.max_open_files = open_file_count()
+		fields = {"input": In_file, "input_bytes": self.in_bytes, "argv": sys.argv}
+		if Fields is not None:
+			fields.update(Fields)
+		self.log("start", fields)
+
+	def log(self, Event, Fields):
+		""" Write one event to the log, with the time since the run started.
+		"""
+		if self.log_file is None:
+			return
+		record = {"event": Event, "run": self.run, "time": time.time(),
+			"elapsed_seconds": round(time.time() - self.start_time, 3)}
+		record.update(Fields)
+		with open(self.log_file, 'ab') as f_OUT:
+			f_OUT.write(json.dumps(record, sort_keys=True)+"\n")
+
+	def start_stage(self, Stage, In_file=None):
+		""" Start timing a stage (ending the current one, if any).
+
+			If the stage reads a file other than the run's input (e.g. a sorted
+			copy), give it as In_file, so progress is measured against its size.
+		"""
+		if self.stage is not None:
+			self.end_stage()
+		self.stage = Stage
+		self.stage_bytes = os.path.getsize(In_file) if In_file is not None else self.in_bytes
+		self.stage_start = time.time()
+		self.last_progress = self.stage_start
+		print "Starting "+Stage+"."
+		sys.stdout.flush()
+
+	def end_stage(self, Fields=None):
+		""" Finish timing the current stage, logging its time and any other Fields.
+		"""
+		if self.stage is None:
+			return
+		seconds = time.time() - self.stage_start
+		self.stages.append([self.stage, seconds])
+		fields = {"stage": self.stage, "seconds": round(seconds, 3)}
+		if Fields is not None:
+			fields.update(Fields)
+		fields.update(self._resources())
+		self.log("stage", fields)
+		print "Finished "+self.stage+" in "+"%.1f" % seconds+"s."
+		sys.stdout.flush()
+		self.stage = None
+
+	def progress(self, Rows, Position):
+		""" Note that the current stage has read Rows rows, and Position bytes of the input.
+
+			Logs and prints a progress line if Interval_seconds have passed since the last.
+		"""
+		now = time.time()
+		if now - self.last_progress < self.interval_seconds:
+			return
+		self.last_progress = now
+		elapsed = now - self.stage_start
+		fraction = min(float(Position)/self.stage_bytes, 1.0) if self.stage_bytes > 0 else 1.0
+		fields = {"stage": self.stage, "rows": Rows, "bytes": Position, "fraction": round(fraction, 4),
+			"rows_per_second": round(Rows/max(elapsed, 1e-9), 1),
+			"mb_per_second": round(Position/1048576.0/max(elapsed, 1e-9), 3),
+			"eta_seconds": round(elapsed*(1-fraction)/fraction, 1) if fraction > 0 else None}
+		fields.update(self._resources())
+		self.log("progress", fields)
+		print self.stage+": "+str(Rows)+" rows, "+"%.1f" % (100*fraction)+"% of the input, " \
+			+"%.0f" % fields["rows_per_second"]+" rows/s" \
+			+(", about "+"%.0f" % fields["eta_seconds"]+"s to go" if fields["eta_seconds"] is not None else "")
+		sys.stdout.flush()
+
+	def _resources(self):
+		rss = current_rss_mb()
+		open_files = open_file_count()
+		if open_files is not None:
+			self.max_open_files = max(self.max_open_files, open_files)
+		return {"rss_mb": round(rss, 1) if rss is not None else None, "open_files": open_files}
+
+	def finish(self, Fields=None):
+		""" Log the run's totals: each stage's time, peak memory and open files, and any other Fields.
+		"""
+		if self.stage is not None:
+			self.end_stage()
+		peak, child_peak = peak_rss_mb()
+		fields = {"stages": dict([[stage, round(seconds, 3)] for stage, seconds in self.stages]),
+			"seconds": round(time.time() - self.start_time, 3),
+			"peak_rss_mb": round(peak, 1),
+			"child_peak_rss_mb": round(child_peak, 1),
+			"max_open_files": self.max_open_files}
+		if Fields is not None:
+			fields.update(Fields)
+		self.log("finish", fields)
+		return fields
@@ -8,6 +8,13 @@
 #  wrapper.R
 #
 # Note: this script depends on helper_functions.py and folderize_by_column
+#
+# To split many tissues at once, see split_tissues.py
+#
+# Options:
+#   --executor lsf: submit jobs with bsub (default)
+#   --executor local: run the jobs on this machine's cores instead
+#   --n_procs #: with --executor local, jobs run at once (default: all cores)
 
 print "Starting pre_wrapper.py"
 
@@ -24,8 +31,14 @@ import sys
 #  this scipt in the future and gets errors because they didn't properly 
 #  import my helper_functions.py module...
 sys.path.append(generally_useful)
-from helper_functions import make_consign_job_command, submit_consign_job
+from helper_functions import make_consign_job_command, submit_consign_job, get_command_args
+from job_functions import make_executor, set_executor, get_executor
 import os
+import multiprocessing
+
+options = get_command_args(sys.argv[1:])
+set_executor(make_executor(options.get("executor", "lsf"),
+	int(options.get("n_procs", multiprocessing.cpu_count()))))
 if not os.path.isfile(script+folderize_by_column):
 	raise StandardError(folderize_by_column+" wasn't found in script/ folder.")
 
@@ -47,3 +60,7 @@ print "Command for liver looks like:\n"+str(command)
 
 submit_consign_job(command)
 
+# Local jobs run in this process's pool, so wait for them (no-op with LSF)
+for job in get_executor().wait():
+	if job[1] != 0:
+		raise StandardError("Job failed with exit code "+str(job[1])+": "+job[0])
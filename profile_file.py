@@ -0,0 +1,80 @@
+#!/usr/bin/python
+
+### profile_file.py
+### 2026_10_18
+
+### This script profiles a tab delimited file from evenly spaced samples of
+###  its lines, without reading all of it (see profile_functions.profile_file):
+###  its columns and their types, and (estimates of) its row count, the number
+###  of distinct values in a column and the size of the largest group, and
+###  whether the file is already sorted by that column. It then says which
+###  fileize_by_column.py / folderize_by_column.py --mode would split it best.
+###
+###  Arguments:
+###    input_file.txt: input txt (or txt.gz) file
+###	 valid filepath
+###    Column_#: which column to group by
+###	 integer (0 = first column)
+###
+###  Assumptions:
+###    There is a single line header
+###
+###  Options:
+###    --samples #: how many samples to read (default 32)
+###    --sample_kb #: size of each sample (default 64)
+###    --memory_mb #: memory the split may use (default 1024)
+###    --max_open #: most files the split may keep open at once (default 256)
+###    --n_procs #: processes the split may use (default: all cores)
+###
+###  Usage:
+###    python profile_file.py eqtls.txt.gz 0 [--memory_mb 4096]
+
+import sys
+import os
+import multiprocessing
+from helper_functions import get_command_args
+from profile_functions import profile_file, choose_split_mode
+
+print "Initiating profile_file.py"
+print "Argument List:", str(sys.argv[1:])
+
+if (len(sys.argv) < 3):
+	raise Exception("Expected at least two command arguments.")
+in_FILE = str(sys.argv[1])
+Column_index = str(sys.argv[2])
+options = get_command_args(sys.argv[3:])
+N_samples = int(options.get("samples", 32))
+Sample_kb = int(options.get("sample_kb", 64))
+Memory_mb = int(options.get("memory_mb", 1024))
+Max_open = int(options.get("max_open", 256))
+N_procs = int(options.get("n_procs", multiprocessing.cpu_count()))
+
+if not (os.path.isfile(in_FILE)):
+	raise ValueError(in_FILE+" not found. Is it a *full* and valid file path?")
+if not Column_index.isdigit():
+	raise ValueError("Column index needs to be an integer >= 0.")
+if N_samples < 1:
+	raise ValueError("--samples needs to be an integer > 0.")
+if Sample_kb < 1:
+	raise ValueError("--sample_kb needs to be an integer > 0.")
+if Memory_mb < 1:
+	raise ValueError("--memory_mb needs to be an integer > 0.")
+if Max_open < 1:
+	raise ValueError("--max_open needs to be an integer > 0.")
+if N_procs < 1:
+	raise ValueError("--n_procs needs to be an integer > 0.")
+
+print "Passed script checks."
+
+profile = profile_file(File = in_FILE,
+			Column_index = int(Column_index),
+			N_samples = N_samples,
+			Sample_bytes = Sample_kb*1024)
+for line in profile.report():
+	print line
+mode, reason = choose_split_mode(Profile = profile,
+			Memory_mb = Memory_mb,
+			Max_open = Max_open,
+			N_procs = N_procs)
+print "Suggested split: --mode "+mode+" ("+reason+")"
+print "Completed profile_file.py"
@@ -0,0 +1,283 @@
+#/usr/bin/python
+
+# profile_functions.py
+# 2026_10_18
+
+### Functions for profiling a tab delimited file from a sample of its lines
+###  (without reading all of it), and planning how to split it by a column
+###  (see profile_file and choose_split_mode, and profile_file.py).
+###
+###  Sampling:
+###    plain text: evenly spaced blocks, read with seeks
+###    bgzip: evenly spaced BGZF blocks
+###    gzip: the start of the file (gzip can't seek), with sizes scaled
+###      by how far into the compressed file the sample reached
+
+import os
+import gzip
+from math import sqrt
+from collections import OrderedDict
+from helper_functions import open_input, is_gzipped, is_bgzf, get_bgzf_blocks, read_bgzf_lines
+from split_functions import NA_VALUES
+
+# Rough bytes of memory per byte of text, for rows held as lists of strings
+MEMORY_PER_BYTE = 10
+# Split modes choose_split_mode picks from
+SPLIT_MODES = ["presorted", "memory", "hash", "parallel", "sort"]
+
+
+def sample_file(File, N_samples=32, Sample_bytes=65536):
+	""" Read evenly spaced samples of File's lines, without reading all of it.
+
+		A file no bigger than N_samples*Sample_bytes is read in full.
+
+		Arguments:
+			File:			"/my_directory/my_fav_file.txt[.gz]" single line header
+			N_samples:		integer > 0. How many samples to read.
+			Sample_bytes:	integer > 0. Size of each sample (a bgzip sample is one block).
+
+		Returns: [header line, list of samples (each a list of consecutive lines, in file order),
+			bytes of sampled lines, estimated bytes of all lines after the header
+			(uncompressed), True if every line was read]
+	"""
+	if type(N_samples) is not int or N_samples < 1:
+		raise ValueError("N_samples needs to be an integer > 0.")
+	if type(Sample_bytes) is not int or Sample_bytes < 1:
+		raise ValueError("Sample_bytes needs to be an integer > 0.")
+	size = os.path.getsize(File)
+	if is_bgzf(File):
+		blocks = get_bgzf_blocks(File)
+		# The last block is bgzip's empty end of file marker
+		n_blocks = len(blocks) - 1
+		if n_blocks > N_samples:
+			f_IN = open_input(File)
+			try:
+				header = f_IN.readline()
+			finally:
+				f_IN.close()
+			samples = list()
+			for sample_i in range(N_samples):
+				block_i = sample_i*(n_blocks-1)/max(N_samples-1, 1)
+				samples.append(list(read_bgzf_lines(File, blocks[block_i], blocks[block_i+1])))
+			sampled_bytes = sum([len(line) for lines in samples for line in lines])
+			return [header, samples, sampled_bytes, sampled_bytes*n_blocks/N_samples, False]
+	elif is_gzipped(File):
+		f_IN = gzip.open(File, 'rb')
+		try:
+			header = f_IN.readline()
+			lines = list()
+			sampled_bytes = 0
+			for line in f_IN:
+				lines.append(line)
+				sampled_bytes = sampled_bytes + len(line)
+				if sampled_bytes >= N_samples*Sample_bytes:
+					break
+			else:
+				return [header, [lines], sampled_bytes, sampled_bytes, True]
+			# Compressed bytes read so far (gzip reads ahead a little)
+			compressed_at = f_IN.fileobj.tell()
+		finally:
+			f_IN.close()
+		return [header, [lines], sampled_bytes, sampled_bytes*size/max(compressed_at, 1), False]
+	elif size > N_samples*Sample_bytes:
+		with open(File, 'rb') as f_IN:
+			header = f_IN.readline()
+			data_start = len(header)
+			step = (size - data_start - Sample_bytes)/max(N_samples-1, 1)
+			samples = list()
+			for sample_i in range(N_samples):
+				at = data_start + sample_i*step
+				# Read the byte before the sample too, to tell if it starts on a line
+				f_IN.seek(at-1)
+				chunk = f_IN.read(Sample_bytes+1)
+				lines = chunk[1:].splitlines(True)
+				if chunk[0] != "\n" and len(lines) > 0:
+					lines = lines[1:]
+				if len(lines) > 0 and lines[-1][-1] != "\n" and at+Sample_bytes < size:
+					lines = lines[:-1]
+				samples.append(lines)
+		sampled_bytes = sum([len(line) for lines in samples for line in lines])
+		return [header, samples, sampled_bytes, size-data_start, False]
+
+	# Small enough to read in full
+	f_IN = open_input(File)
+	try:
+		header = f_IN.readline()
+		lines = list(f_IN)
+	finally:
+		f_IN.close()
+	sampled_bytes = sum([len(line) for line in lines])
+	return [header, [lines], sampled_bytes, sampled_bytes, True]
+
+def infer_type(Values):
+	""" Return "int", "float", or "str": the narrowest type all of Values parse as (NA_VALUES aside).
+	"""
+	values = [value for value in Values if value not in NA_VALUES]
+	for type_name, parse in [["int", int], ["float", float]]:
+		try:
+			for value in values:
+				parse(value)
+			return type_name
+		except ValueError:
+			pass
+	return "str"
+
+
+class FileProfile(object):
+	""" What profile_file learned about a file.
+
+		Attributes:
+			file:			the file profiled
+			compression:	"none", "gzip", or "bgzip"
+			size:			bytes on disk
+			data_bytes:		(estimated) uncompressed bytes after the header
+			columns:		list of column names (from the header)
+			types:			list of "int", "float", or "str", one per column
+			n_rows:			(estimated) rows after the header
+			column_index:	the key column
+			n_groups:		(estimated) distinct values of the key column
+			largest_group:	(estimated) rows of the most common key
+			sorted:			True if the key column looked sorted (as strings)
+			grouped:		True if each key's rows looked contiguous (as sorted_split needs)
+			exact:			True if every line was read, so none of this is estimated
+	"""
+	def report(self):
+		""" Return a list of printable lines describing the profile.
+		"""
+		estimated = "" if self.exact else " (estimated)"
+		lines = [self.file+": "+str(self.size)+" bytes, compression: "+self.compression]
+		lines.append(str(len(self.columns))+" column(s):")
+		for col_i in range(len(self.columns)):
+			lines.append("  "+str(col_i)+"\t"+self.columns[col_i]+"\t"+self.types[col_i])
+		lines.append("rows"+estimated+": "+str(self.n_rows))
+		lines.append("distinct values of column "+str(self.column_index)+estimated+": "+str(self.n_groups))
+		lines.append("largest group"+estimated+": "+str(self.largest_group)+" row(s)")
+		lines.append("sorted by column "+str(self.column_index)+": "+str(self.sorted)
+			+", grouped: "+str(self.grouped))
+		return lines
+
+
+def profile_file(File, Column_index, N_samples=32, Sample_bytes=65536):
+	""" Profile a tab delimited file from a sample of its lines (see sample_file).
+
+		Estimates scale the sample up to the whole file: rows by bytes per row,
+		distinct keys by how often the key changes (for a grouped file) or by the
+		GEE estimator (sqrt(rows/sampled rows)*keys seen once + keys seen more),
+		and the largest group by its share of the sample. Sortedness is judged
+		from the sampled rows only.
+
+		Arguments:
+			File:			"/my_directory/my_fav_file.txt[.gz]" tab delimited, single line header
+			Column_index:	integer. Which column is the key? [0 = first column]
+			N_samples:		integer > 0. See sample_file.
+			Sample_bytes:	integer > 0. See sample_file.
+
+		Returns: FileProfile
+	"""
+	if not os.path.isfile(File):
+		raise ValueError(File+" not found.")
+	if type(Column_index) is not int or Column_index < 0:
+		raise ValueError("Column_index needs to be an integer >= 0.")
+	header, samples, sampled_bytes, data_bytes, exact = sample_file(File, N_samples, Sample_bytes)
+	head = header.rstrip('\r\n').split('\t')
+	if Column_index >= len(head):
+		raise ValueError(File+" has "+str(len(head))+" column(s), there's no column "+str(Column_index))
+	rows = [[line.rstrip('\r\n').split('\t') for line in lines] for lines in samples]
+	n_sampled = sum([len(sample_rows) for sample_rows in rows])
+
+	profile = FileProfile()
+	profile.file = File
+	profile.compression = "bgzip" if is_bgzf(File) else ("gzip" if is_gzipped(File) else "none")
+	profile.size = os.path.getsize(File)
+	profile.data_bytes = data_bytes
+	profile.columns = head
+	profile.types = [infer_type([row[col_i] for sample_rows in rows for row in sample_rows if len(row) > col_i])
+		for col_i in range(len(head))]
+	profile.column_index = Column_index
+	profile.exact = exact
+	if exact or n_sampled == 0:
+		profile.n_rows = n_sampled
+	else:
+		profile.n_rows = int(round(float(data_bytes)*n_sampled/sampled_bytes))
+	# Rows between consecutive samples
+	if len(rows) > 1:
+		gap_rows = max(profile.n_rows - n_sampled, 0)/(len(rows)-1)
+	else:
+		gap_rows = 0
+
+	key_counts = OrderedDict()
+	profile.sorted = True
+	profile.grouped = True
+	# Keys whose run of rows has ended
+	closed = set()
+	runs = list()
+	changes = 0
+	last_key = None
+	for sample_i in range(len(rows)):
+		for row_i in range(len(rows[sample_i])):
+			key = rows[sample_i][row_i][Column_index]
+			key_counts[key] = key_counts.get(key, 0) + 1
+			if key == last_key:
+				if row_i == 0:
+					# The run carries on through the rows between samples
+					runs[-1] = runs[-1] + gap_rows
+				runs[-1] = runs[-1] + 1
+				continue
+			if last_key is not None:
+				closed.add(last_key)
+				if key < last_key:
+					profile.sorted = False
+				if row_i > 0:
+					changes = changes + 1
+			if key in closed:
+				profile.grouped = False
+			runs.append(1)
+			last_key = key
+
+	if exact:
+		profile.n_groups = len(key_counts)
+		profile.largest_group = max(key_counts.values()) if len(key_counts) > 0 else 0
+	elif profile.grouped:
+		# Keys change about as often between samples as within them
+		within_rows = max(n_sampled - len(rows), 1)
+		profile.n_groups = max(len(key_counts), int(round(float(changes)*profile.n_rows/within_rows)) + 1)
+		profile.largest_group = max(runs) if len(runs) > 0 else 0
+	else:
+		seen_once = len([count for count in key_counts.values() if count == 1])
+		profile.n_groups = int(round(sqrt(float(profile.n_rows)/n_sampled)*seen_once)) \
+			+ len(key_counts) - seen_once
+		profile.n_groups = min(profile.n_groups, profile.n_rows)
+		profile.largest_group = int(round(float(max(key_counts.values()))*profile.n_rows/n_sampled))
+	return profile
+
+def choose_split_mode(Profile, Memory_mb=1024, Max_open=256, N_procs=1):
+	""" Pick how to split a profiled file by its key column.
+
+		In order of preference:
+			presorted:	the file is already grouped by the key, so scan it without sorting
+							(only if every line was profiled: a sample can't show that a
+							key never comes back, and sorted_split fails if one does)
+			memory:		the file fits in Memory_mb (at about MEMORY_PER_BYTE bytes per
+							byte of text), so group it in memory and write each group once
+			hash:		there are no more groups than Max_open, so split it in one pass
+							without ever closing a file
+			parallel:	several processes can read byte ranges of it (it isn't plain gzip)
+			sort:		sort it by the key on disk, then scan it
+
+		Arguments:
+			Profile:	FileProfile (see profile_file)
+			Memory_mb:	integer > 0. Memory the split may use.
+			Max_open:	integer > 0. Most output files allowed open at once.
+			N_procs:	integer > 0. Processes the split may use.
+
+		Returns: [mode (one of SPLIT_MODES), reason]
+	"""
+	if Profile.grouped and Profile.exact:
+		return ["presorted", "rows are already grouped by column "+str(Profile.column_index)]
+	if Profile.data_bytes*MEMORY_PER_BYTE <= Memory_mb*1024*1024:
+		return ["memory", str(Profile.data_bytes/(1024*1024))+" MB of rows fit in "+str(Memory_mb)+" MB"]
+	if Profile.n_groups <= Max_open:
+		return ["hash", "about "+str(Profile.n_groups)+" group(s), at most "+str(Max_open)+" files open"]
+	if N_procs > 1 and Profile.compression != "gzip":
+		return ["parallel", "about "+str(Profile.n_groups)+" group(s), "+str(N_procs)+" processes"]
+	return ["sort", "about "+str(Profile.n_groups)+" group(s) in "+str(Profile.data_bytes/(1024*1024))+" MB of rows"]
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+
+### run_task_array.py
+### 2026_10_18
+
+### This script runs one job array element's slice of a task manifest
+###  (see job_functions.make_job_array_commands), one task after the other.
+###  A failed task doesn't stop the rest; the script exits with an error if
+###  any task failed.
+###
+###  Arguments:
+###    manifest_file: task manifest written by job_functions.write_task_manifest
+###	 valid filepath
+###
+###  Options:
+###    --tasks_per_element #: tasks run by each element (default 1)
+###    --offset #: elements before this job array's first element (default 0)
+###    --element #: which element this is (default: $LSB_JOBINDEX)
+###    --status_db status.db: record each task's state and exit code in this
+###      job_functions.JobTracker database
+###    --heartbeat_seconds #: with --status_db, how often a running task records that
+###      it's still alive (default job_functions.HEARTBEAT_SECONDS; keep it well under
+###      the stale cutoff of whatever waits on the tasks)
+###
+###  Usage:
+###    python run_task_array.py tasks.manifest --tasks_per_element 50 --offset 0
+
+import sys
+import os
+import time
+from subprocess import Popen
+from helper_functions import get_command_args
+from job_functions import read_task_manifest, task_slice, manifest_task_keys, JobTracker, HEARTBEAT_SECONDS
+
+print "Initiating run_task_array.py"
+print "Argument List:", str(sys.argv[1:])
+
+if (len(sys.argv) < 2):
+	raise Exception("Expected at least one command argument.")
+manifest_FILE = str(sys.argv[1])
+options = get_command_args(sys.argv[2:])
+Tasks_per_element = int(options.get("tasks_per_element", 1))
+Offset = int(options.get("offset", 0))
+Element = options.get("element", os.environ.get("LSB_JOBINDEX", ""))
+Status_db = options.get("status_db", "")
+Heartbeat_seconds = float(options.get("heartbeat_seconds", HEARTBEAT_SECONDS))
+
+if not (os.path.isfile(manifest_FILE)):
+	raise ValueError(manifest_FILE+" not found. Is it a *full* and valid file path?")
+if Tasks_per_element < 1:
+	raise ValueError("--tasks_per_element needs to be an integer > 0.")
+if Offset < 0:
+	raise ValueError("--offset needs to be an integer >= 0.")
+if not Element.isdigit() or int(Element) < 1:
+	raise ValueError("Expected --element (or $LSB_JOBINDEX) to be an integer > 0, instead got: '"+Element+"'")
+if Heartbeat_seconds <= 0:
+	raise ValueError("--heartbeat_seconds needs to be > 0.")
+
+commands = read_task_manifest(manifest_FILE)
+task_indeces = task_slice(len(commands), Tasks_per_element, int(Element), Offset)
+print "Element "+Element+" running task(s) "+str(task_indeces)
+if len(Status_db) > 0:
+	tracker = JobTracker(Status_db)
+	task_keys = manifest_task_keys(manifest_FILE, len(commands))
+else:
+	tracker = None
+
+failed = list()
+for task_i in task_indeces:
+	print "Task "+str(task_i)+": "+commands[task_i]
+	sys.stdout.flush()
+	if tracker is not None:
+		tracker.start(task_keys[task_i])
+	process = Popen(commands[task_i], shell=True)
+	last_heartbeat = time.time()
+	while process.poll() is None:
+		time.sleep(min(1.0, Heartbeat_seconds))
+		# So whatever waits on the task can tell it from one whose job was killed
+		if tracker is not None and time.time() - last_heartbeat >= Heartbeat_seconds:
+			tracker.heartbeat(task_keys[task_i])
+			last_heartbeat = time.time()
+	exit_code = process.returncode
+	if tracker is not None:
+		tracker.finish(task_keys[task_i], exit_code)
+	if exit_code != 0:
+		print "Task "+str(task_i)+" failed with exit code "+str(exit_code)
+		failed.append(task_i)
+
+if len(failed) > 0:
+	raise StandardError(str(len(failed))+" task(s) failed: "+str(failed))
+print "Completed run_task_array.py"
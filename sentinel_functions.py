@@ -0,0 +1,126 @@
+#/usr/bin/python
+
+# sentinel_functions.py
+# 2026_10_18
+
+### Streaming sentinel SNP detection for GWAS summary statistics
+###  (see get_sentinel_snps.py).
+###
+###  A GWAS file is read once, keeping only its significant rows in compact
+###  arrays (read_significant_snps), then those are clumped into sentinel SNPs,
+###  each at least Range bp from the others (clump_sentinel_snps).
+###
+###  Example usage:
+###    snps = read_significant_snps("/my_directory/LDL.txt.gz", Chr_col=0, Pos_col=1, PV_col=7)
+###    for i in clump_sentinel_snps(snps, Range=9e5):
+###      print snps.lines[i],
+
+from array import array
+from bisect import bisect_left, insort
+from helper_functions import chromosome_rank, open_input
+from genomic_index import normalize_chromosome
+
+
+class SignificantSnps(object):
+	""" The significant rows of a GWAS file, in compact arrays.
+
+		Attributes:
+			head:		header line of the file (newline included)
+			chr_names:	list of chromosome names; chr_ids index into it
+			chr_ids:	array of each row's chromosome
+			positions:	array of each row's position
+			pvalues:	array of each row's p-value
+			lines:		list of each row's line (newline included)
+	"""
+	def __init__(self, Head):
+		self.head = Head
+		self.chr_names = list()
+		self.chr_lookup = dict()
+		self.chr_ids = array('H')
+		self.positions = array('l')
+		self.pvalues = array('d')
+		self.lines = list()
+
+	def append(self, Chr, Pos, Pvalue, Line):
+		chrom = normalize_chromosome(Chr)
+		if chrom not in self.chr_lookup:
+			self.chr_lookup[chrom] = len(self.chr_names)
+			self.chr_names.append(chrom)
+		self.chr_ids.append(self.chr_lookup[chrom])
+		self.positions.append(Pos)
+		self.pvalues.append(Pvalue)
+		self.lines.append(Line)
+
+	def __len__(self):
+		return len(self.positions)
+
+
+def read_significant_snps(File, Chr_col, Pos_col, PV_col, Cutoff_PV=5e-8, Sep="\t", N_procs=1):
+	""" Read a GWAS file once, keeping only the rows with a p-value <= Cutoff_PV.
+
+		Rows whose position or p-value can't be read (e.g. NA) are skipped.
+
+		Arguments:
+			File:		"/my_directory/my_gwas.txt" single line header (may be gzip or bgzip compressed)
+			Chr_col:	integer. Chromosome column [0 = first column]
+			Pos_col:	integer. Position column
+			PV_col:		integer. P-value column
+			Cutoff_PV:	float. Largest p-value kept.
+			Sep:		column separator, or None to split on any whitespace
+			N_procs:	integer > 0. If File is a bgzip file, the number of
+							processes decompressing it.
+
+		Returns: SignificantSnps
+	"""
+	f_IN = open_input(File, N_procs)
+	try:
+		snps = SignificantSnps(f_IN.readline())
+		for line in f_IN:
+			split_line = line.rstrip('\r\n').split(Sep)
+			try:
+				pvalue = float(split_line[PV_col])
+			except ValueError:
+				continue
+			# Compare before anything else, most rows are not significant
+			if not pvalue <= Cutoff_PV:
+				continue
+			try:
+				pos = int(split_line[Pos_col])
+			except ValueError:
+				continue
+			snps.append(split_line[Chr_col], pos, pvalue, line)
+	finally:
+		f_IN.close()
+	return snps
+
+
+def clump_sentinel_snps(Snps, Range=9e5):
+	""" Pick sentinel SNPs: the SNPs with the smallest p-value in each region of the genome.
+
+		Greedy, as get_sentinal_snp_regions in import.R: going from smallest to
+		largest p-value within each chromosome, a SNP is kept if it is at least
+		Range bp from every SNP kept so far. The kept positions are held in a
+		sorted list, so each check is a bisect instead of a scan.
+
+		Arguments:
+			Snps:	SignificantSnps
+			Range:	how far apart sentinel SNPs need to be
+
+		Returns: list of row indeces into Snps, ordered by chromosome then p-value
+	"""
+	chr_ranks = [chromosome_rank(chrom) for chrom in Snps.chr_names]
+	order = sorted(range(len(Snps)), key=lambda i: (chr_ranks[Snps.chr_ids[i]], Snps.pvalues[i], i))
+	# chr id -> sorted positions of the sentinel SNPs so far
+	kept_positions = dict()
+	sentinels = list()
+	for i in order:
+		kept = kept_positions.setdefault(Snps.chr_ids[i], list())
+		pos = Snps.positions[i]
+		j = bisect_left(kept, pos)
+		if j < len(kept) and kept[j] - pos < Range:
+			continue
+		if j > 0 and pos - kept[j-1] < Range:
+			continue
+		insort(kept, pos)
+		sentinels.append(i)
+	return sentinels
@@ -0,0 +1,1815 @@
+#/usr/bin/python
+
+# split_functions.py
+# 2026_10_18
+
+### Functions shared by fileize_by_column.py and folderize_by_column.py for
+###  splitting a tab delimited file into one file per group of rows.
+###
+###  Output formats:
+###    csv: comma separated text (default)
+###    bgzip: tab separated text, bgzip compressed, with a .gzi block index
+###    npz: one typed NumPy array per column (needs numpy)
+###
+###  Output layouts:
+###    files: one file per group (default)
+###    store: every group in a few large data files, plus an index of where
+###      each group is (see GroupStoreWriter and GroupStore)
+###
+###  Re-split cache: a split manifest records the input's fingerprint, the
+###  split settings, and a hash of each group's rows, so a rerun can skip
+###  the split, or rewrite only the groups that changed
+###  (see fingerprint_file, GroupHashes, hash_groups, and write_split_manifest).
+###
+###  Checkpoints: a sorted split can record how far it got (see
+###  write_split_checkpoint), and be resumed from there with sorted_split's Start.
+###
+###  split_by_column runs a whole split (cache, resume, interval index, and
+###  manifest included) the way the fileize and folderize scripts do.
+###
+###  Row filters: the splitters can drop rows that fail numeric thresholds,
+###  aren't on chosen chromosomes, or have missing values, before they're
+###  written (see RowFilter and parse_row_filter).
+
+import os
+import re
+import sys
+import time
+import csv
+import gzip
+import shutil
+import hashlib
+import tempfile
+import multiprocessing
+import operator
+from operator import itemgetter
+from collections import OrderedDict
+from cStringIO import StringIO
+from helper_functions import open_input, input_position, is_gzipped, is_bgzf, get_bgzf_blocks, read_bgzf_lines
+from helper_functions import get_byte_ranges, read_byte_range_lines
+from helper_functions import BgzfWriter, write_bgzf_index, bash_sort
+from genomic_index import normalize_chromosome, read_gene_table, write_interval_index
+
+OUTPUT_FORMATS = ["csv", "bgzip", "npz"]
+# Values read as missing when typing npz columns
+NA_VALUES = set(["", "NA", "NaN", "nan"])
+# Rows read between calls to a split's Progress function
+PROGRESS_ROWS = 100000
+# Comparisons a RowFilter threshold can use
+FILTER_OPERATORS = OrderedDict([["<=", operator.le], [">=", operator.ge], ["!=", operator.ne],
+	["<", operator.lt], [">", operator.gt], ["=", operator.eq]])
+
+
+def split_row(Line, N_fields):
+	""" Split the first N_fields tab separated fields off Line, without splitting the rest of it.
+
+		Returns: list of the fields (followed by the unsplit rest of Line, if there's more)
+	"""
+	fields = Line.split('\t', N_fields)
+	if len(fields) <= N_fields:
+		# The last field is the end of the line
+		fields[-1] = fields[-1].rstrip('\r\n')
+	return fields
+
+def row_key(Line, Column_index):
+	""" Return the Column_index field of Line, without splitting the rest of it.
+	"""
+	if Column_index == 0:
+		end = Line.find('\t')
+		return Line[:end] if end >= 0 else Line.rstrip('\r\n')
+	return split_row(Line, Column_index+1)[Column_index]
+
+def row_projection(Column_index, Cols_to_keep, Extents=None, Row_filter=None, Group_key=None,
+	Variant_key=None):
+	""" Return what a split needs from each row: [fields to split off each line (see split_row),
+		function returning a row's kept fields].
+
+		With a Variant_key (genomic_index.VariantKey), a row's kept fields are
+		followed by its variant key.
+	"""
+	needed = [Column_index] + list(Cols_to_keep)
+	if Group_key is not None:
+		needed = needed + Group_key.columns()
+	if Variant_key is not None:
+		needed = needed + Variant_key.columns()
+	if Extents is not None:
+		needed = needed + [Extents.chr_col, Extents.pos_col]
+	if Row_filter is not None:
+		needed = needed + Row_filter.columns()
+	if len(Cols_to_keep) == 1:
+		col_i = Cols_to_keep[0]
+		keep = lambda split_line: [split_line[col_i]]
+	else:
+		keep = itemgetter(*Cols_to_keep)
+	if Variant_key is not None:
+		project = keep
+		key_text = Variant_key.text
+		keep = lambda split_line: list(project(split_line)) + [key_text(split_line)]
+	return [max(needed)+1, keep]
+
+def kept_head(Head, Cols_to_keep, Variant_key=None):
+	""" Return the header of a split's output: the kept columns' names, then the
+		variant key's (if there is one).
+	"""
+	head = [Head[col_i] for col_i in Cols_to_keep]
+	if Variant_key is not None:
+		head.append(Variant_key.name)
+	return head
+
+
+class RowFilter(object):
+	""" Decide which rows a split keeps. A row is kept only if it passes every test.
+
+		Arguments:
+			Thresholds:		list of [column, operator, number] (operator is a key of
+								FILTER_OPERATORS), e.g. [[10, "<=", 1e-5], [7, ">", 0]].
+								Rows whose value isn't a number (e.g. NA) fail.
+			Chromosomes:	[column, list of chromosomes] or None, e.g. [2, ["1", "2", "X"]].
+								'chr1' and '1' match (see genomic_index.normalize_chromosome).
+			Not_na:			list of columns that can't be empty or one of NA_VALUES
+	"""
+	def __init__(self, Thresholds=None, Chromosomes=None, Not_na=None):
+		self.thresholds = list()
+		for col_i, op, value in (Thresholds if Thresholds is not None else list()):
+			if type(col_i) is not int or col_i < 0:
+				raise ValueError("Threshold columns need to be integers >= 0, instead got: "+str(col_i))
+			if op not in FILTER_OPERATORS:
+				raise ValueError("Expected a threshold operator in "+str(FILTER_OPERATORS.keys())+", instead got: "+str(op))
+			self.thresholds.append([col_i, op, float(value)])
+		if Chromosomes is not None:
+			if type(Chromosomes[0]) is not int or Chromosomes[0] < 0:
+				raise ValueError("The chromosome column needs to be an integer >= 0.")
+			self.chr_col = Chromosomes[0]
+			self.chromosomes = set([normalize_chromosome(chrom) for chrom in Chromosomes[1]])
+		else:
+			self.chr_col = None
+			self.chromosomes = None
+		self.not_na = list(Not_na) if Not_na is not None else list()
+		# Chromosome value -> whether it's allowed (there are few distinct values)
+		self.chr_allowed = dict()
+
+	def columns(self):
+		""" Return the columns the filter reads.
+		"""
+		cols = [threshold[0] for threshold in self.thresholds] + self.not_na
+		if self.chr_col is not None:
+			cols.append(self.chr_col)
+		return cols
+
+	def keep(self, Split_line):
+		""" Return True if the row (a list of its fields) passes every test.
+		"""
+		for col_i in self.not_na:
+			if Split_line[col_i] in NA_VALUES:
+				return False
+		if self.chr_col is not None:
+			chrom = Split_line[self.chr_col]
+			allowed = self.chr_allowed.get(chrom)
+			if allowed is None:
+				allowed = normalize_chromosome(chrom) in self.chromosomes
+				self.chr_allowed[chrom] = allowed
+			if not allowed:
+				return False
+		for col_i, op, threshold in self.thresholds:
+			value = Split_line[col_i]
+			if value in NA_VALUES:
+				return False
+			try:
+				if not FILTER_OPERATORS[op](float(value), threshold):
+					return False
+			except ValueError:
+				return False
+		return True
+
+	def describe(self):
+		""" Return the filter as a string, e.g. for a split's settings.
+		"""
+		tests = [str(col_i)+op+repr(threshold) for col_i, op, threshold in self.thresholds]
+		if self.chr_col is not None:
+			tests.append(str(self.chr_col)+":"+",".join(sorted(self.chromosomes)))
+		if len(self.not_na) > 0:
+			tests.append("not_na:"+",".join([str(col_i) for col_i in self.not_na]))
+		return ";".join(tests)
+
+def parse_row_filter(Filter="", Chromosomes="", Drop_na="", Cols_to_keep="all", In_file=None):
+	""" Make a RowFilter from command line options, or return None if they're all empty.
+
+		Arguments:
+			Filter:			"#<=number,#>number,..." thresholds on (input) columns,
+								with operators from FILTER_OPERATORS, e.g. "10<=1e-5,7>0"
+			Chromosomes:	"#:chromosome,chromosome,..." the chromosome column and the
+								chromosomes to keep; "a-b" is a range of numbered ones,
+								e.g. "2:1-22,X"
+			Drop_na:		"#,#,..." columns that can't be empty or NA,
+								or "kept" for every kept column
+			Cols_to_keep:	"all" or a list of column indeces (for Drop_na "kept")
+			In_file:		the file being split (its header is read for Drop_na "kept"
+								with Cols_to_keep "all")
+
+		Returns: RowFilter or None
+	"""
+	if len(Filter) == 0 and len(Chromosomes) == 0 and len(Drop_na) == 0:
+		return None
+	thresholds = list()
+	for test in Filter.split(","):
+		if len(test) == 0:
+			continue
+		match = re.match(r"^(\d+)("+"|".join([re.escape(op) for op in FILTER_OPERATORS])+r")(.+)$", test)
+		if match is None:
+			raise ValueError("Expected filters like 10<=1e-5, instead got: "+test)
+		try:
+			thresholds.append([int(match.group(1)), match.group(2), float(match.group(3))])
+		except ValueError:
+			raise ValueError("Expected a number to compare column "+match.group(1)+" to, instead got: "+match.group(3))
+
+	chromosomes = None
+	if len(Chromosomes) > 0:
+		chr_col, sep, chr_list = Chromosomes.partition(":")
+		if not chr_col.isdigit() or len(chr_list) == 0:
+			raise ValueError("Expected chromosomes like 2:1-22,X, instead got: "+Chromosomes)
+		chroms = list()
+		for chrom in chr_list.split(","):
+			first, dash, last = chrom.partition("-")
+			if len(dash) > 0 and first.isdigit() and last.isdigit():
+				chroms.extend([str(number) for number in range(int(first), int(last)+1)])
+			elif len(chrom) > 0:
+				chroms.append(chrom)
+		chromosomes = [int(chr_col), chroms]
+
+	if Drop_na == "kept":
+		if Cols_to_keep == "all":
+			f_IN = open_input(In_file)
+			try:
+				not_na = range(len(f_IN.readline().rstrip('\r\n').split('\t')))
+			finally:
+				f_IN.close()
+		else:
+			not_na = list(Cols_to_keep)
+	elif len(Drop_na) > 0:
+		if not all(col_i.isdigit() for col_i in Drop_na.split(",")):
+			raise ValueError("Expected Drop_na to look like #,#,... or kept, instead got: "+Drop_na)
+		not_na = [int(col_i) for col_i in Drop_na.split(",")]
+	else:
+		not_na = None
+	return RowFilter(Thresholds = thresholds, Chromosomes = chromosomes, Not_na = not_na)
+
+
+class BufferedRowWriter(object):
+	""" Write csv rows to a file, holding at most Flush_rows rows in memory.
+
+		Rows are formatted as they're written. Fields that csv.writer wouldn't
+		quote are just joined with commas, which is the same text, only faster.
+
+		Arguments:
+			Path:		"/my_directory/my_fav_file.txt" file to write to, or a file opened
+							for writing (which is left open by close())
+			Mode:		"wb" to start a new file, "ab" to append to an existing one
+			Head:		list or None. Header row, written if Mode is "wb".
+			Flush_rows:	integer > 0. Rows to hold before writing them to file.
+	"""
+	def __init__(self, Path, Mode="wb", Head=None, Flush_rows=1000):
+		if type(Flush_rows) is not int or Flush_rows < 1:
+			raise ValueError("Flush_rows needs to be an integer > 0.")
+		self._open(Path, Mode)
+		self.flush_rows = Flush_rows
+		# Formatted lines of the held rows
+		self.lines = list()
+		if Head is not None and Mode == "wb":
+			self.lines.append(self._format_row(Head))
+
+	def writerow(self, Row):
+		self.lines.append(self._format_row(Row))
+		if len(self.lines) >= self.flush_rows:
+			self.flush()
+
+	def flush(self):
+		""" Write the held rows to file.
+		"""
+		if len(self.lines) > 0:
+			self.f.write("".join(self.lines))
+			self.lines = list()
+
+	def close(self):
+		self.flush()
+		if self.owns_file:
+			self.f.close()
+
+	def _open(self, Path, Mode):
+		self.owns_file = not hasattr(Path, "write")
+		if self.owns_file:
+			self.f = open(Path, Mode)
+		else:
+			self.f = Path
+		# For the rows that need quoting
+		self.buffer = StringIO()
+		self.writer = csv.writer(self.buffer)
+
+	def _format_row(self, Row):
+		line = ",".join(Row)
+		if line.count(",") != len(Row)-1 or '"' in line or "\r" in line or "\n" in line or len(line) == 0:
+			self.buffer.seek(0)
+			self.buffer.truncate()
+			self.writer.writerow(Row)
+			return self.buffer.getvalue()
+		return line+"\r\n"
+
+
+class BgzfRowWriter(BufferedRowWriter):
+	""" Write tab separated rows to a bgzip file, holding at most Flush_rows rows in memory.
+
+		Call finish_group_file once the file is complete to write its .gzi index.
+	"""
+	def _open(self, Path, Mode):
+		self.owns_file = True
+		self.f = BgzfWriter(Path, Mode)
+
+	def _format_row(self, Row):
+		return "\t".join(Row)+"\n"
+
+
+class NpzRowWriter(BufferedRowWriter):
+	""" Collect tab separated rows in Path.tmp, holding at most Flush_rows rows in memory.
+
+		Call finish_group_file once all rows are written to turn Path.tmp into
+		a .npz file of typed columns at Path.
+	"""
+	def _open(self, Path, Mode):
+		self.owns_file = True
+		self.f = open(Path+".tmp", Mode)
+
+	def _format_row(self, Row):
+		return "\t".join(Row)+"\n"
+
+
+def open_row_writer(Path, Mode="wb", Head=None, Flush_rows=1000, Format="csv"):
+	""" Return a row writer for Path in the given output format (see OUTPUT_FORMATS).
+	"""
+	if Format == "csv":
+		return BufferedRowWriter(Path, Mode, Head, Flush_rows)
+	if Format == "bgzip":
+		return BgzfRowWriter(Path, Mode, Head, Flush_rows)
+	if Format == "npz":
+		return NpzRowWriter(Path, Mode, Head, Flush_rows)
+	raise ValueError("Expected Format to be one of "+str(OUTPUT_FORMATS)+", instead got: "+str(Format))
+
+def _column_array(Values):
+	""" Return Values as an int64, float64 (missing values are nan), or string NumPy array.
+	"""
+	import numpy
+	try:
+		return numpy.array([int(value) for value in Values], dtype=numpy.int64)
+	except ValueError:
+		pass
+	try:
+		return numpy.array([numpy.nan if value in NA_VALUES else float(value) for value in Values],
+				dtype=numpy.float64)
+	except ValueError:
+		return numpy.array(Values, dtype=str)
+
+def finish_group_file(Path, Format="csv"):
+	""" Finish a group's file once every row has been written to it.
+
+		bgzip: write the Path.gzi block index
+		npz: type each column of Path.tmp and save them to Path, then remove Path.tmp
+			 (the column names, in order, are saved as the array '__columns__')
+	"""
+	if Format == "bgzip":
+		write_bgzf_index(Path)
+	elif Format == "npz":
+		try:
+			import numpy
+		except ImportError:
+			raise ImportError("The npz output format needs numpy. Please install it, or use csv or bgzip.")
+		with open(Path+".tmp", 'rb') as f_IN:
+			head = f_IN.readline().rstrip('\r\n').split('\t')
+			columns = [list() for col_name in head]
+			for line in f_IN:
+				split_line = line.rstrip('\r\n').split('\t')
+				for col_i in range(len(head)):
+					columns[col_i].append(split_line[col_i])
+		arrays = dict()
+		for col_i in range(len(head)):
+			arrays[head[col_i]] = _column_array(columns[col_i])
+		arrays["__columns__"] = numpy.array(head, dtype=str)
+		with open(Path, 'wb') as f_OUT:
+			numpy.savez_compressed(f_OUT, **arrays)
+		os.remove(Path+".tmp")
+
+
+class GroupStoreWriter(object):
+	""" Write every group into a few large data files, plus an index of where each group is.
+
+		Each group is written as one contiguous segment, which is exactly what
+		its own csv (or bgzip) file would have been, header included. A new
+		data file is started once the current one reaches Max_file_mb. The
+		index, Name.idx, looks like:
+
+			#format	csv
+			#columns	gene	rsid	chr	...
+			group	file	offset	length	n_rows
+			ENSG0001	store_0.dat	0	53280	412
+			...
+
+		Arguments:
+			Out_dir:		"/my_directory/" where the data files and index are written
+			Format:			"csv" or "bgzip"
+			Max_file_mb:	integer > 0. Size at which a new data file is started.
+			Name:			prefix of the data files and index
+	"""
+	def __init__(self, Out_dir, Format="csv", Max_file_mb=4096, Name="store"):
+		if Format != "csv" and Format != "bgzip":
+			raise ValueError("The store layout needs the csv or bgzip format, instead got: "+str(Format))
+		if not os.path.isdir(Out_dir):
+			raise ValueError(Out_dir+" not found.")
+		if type(Max_file_mb) is not int or Max_file_mb < 1:
+			raise ValueError("Max_file_mb needs to be an integer > 0.")
+		self.out_dir = Out_dir
+		self.format = Format
+		self.max_file_bytes = Max_file_mb*1024*1024
+		self.name = Name
+		self.head = None
+		self.f = None
+		self.file_i = -1
+		# [group, file, offset, length, n_rows] for each group written
+		self.entries = list()
+		self.group = None
+		self._next_file()
+
+	def _next_file(self):
+		if self.f is not None:
+			self.f.close()
+		self.file_i = self.file_i + 1
+		self.file_name = self.name+"_"+str(self.file_i)+".dat"
+		self.f = open(os.path.join(self.out_dir, self.file_name), "wb")
+
+	def _start_group(self, Group):
+		if self.group is not None:
+			raise ValueError("Still writing group "+self.group+", can't start "+Group)
+		if self.f.tell() >= self.max_file_bytes:
+			self._next_file()
+		self.group = Group
+		self.offset = self.f.tell()
+
+	def _end_group(self, N_rows):
+		self.entries.append([self.group, self.file_name, self.offset, self.f.tell()-self.offset, N_rows])
+		self.group = None
+
+	def set_head(self, Head):
+		self.head = Head
+
+	def open_group(self, Group, Flush_rows=1000):
+		""" Start writing Group. Returns a row writer, close it then call close_group().
+		"""
+		self._start_group(Group)
+		return open_row_writer(self.f, "wb", self.head, Flush_rows, self.format)
+
+	def close_group(self, N_rows):
+		""" Record the group started by open_group(), once its writer is closed.
+		"""
+		self._end_group(N_rows)
+
+	def add_group_file(self, Group, Path, N_rows):
+		""" Copy a finished group file (in this store's format) into the store.
+		"""
+		self._start_group(Group)
+		with open(Path, 'rb') as f_IN:
+			shutil.copyfileobj(f_IN, self.f)
+		self._end_group(N_rows)
+
+	def close(self):
+		""" Close the data file and write the index.
+
+			Returns: filepath of the index
+		"""
+		self.f.close()
+		index_path = os.path.join(self.out_dir, self.name+".idx")
+		with open(index_path, 'wb') as f_OUT:
+			f_OUT.write("#format\t"+self.format+"\n")
+			f_OUT.write("#columns\t"+"\t".join(self.head if self.head is not None else [])+"\n")
+			f_OUT.write("group\tfile\toffset\tlength\tn_rows\n")
+			for entry in self.entries:
+				f_OUT.write("\t".join([str(value) for value in entry])+"\n")
+		return index_path
+
+
+class GroupStore(object):
+	""" Read groups from a store written by GroupStoreWriter, seeking straight to each one.
+
+		Example usage:
+			store = GroupStore("/my_directory/eQTLs/Liver/")
+			if "ENSG0001" in store:
+				rows = store.rows("ENSG0001")
+			store.close()
+
+		Arguments:
+			Store_dir:	"/my_directory/" with the data files and index
+			Name:		prefix of the data files and index
+	"""
+	def __init__(self, Store_dir, Name="store"):
+		index_path = os.path.join(Store_dir, Name+".idx")
+		if not os.path.isfile(index_path):
+			raise ValueError(index_path+" not found. Was the store written there?")
+		self.store_dir = Store_dir
+		self.format = None
+		self.head = None
+		# group -> [file, offset, length, n_rows]
+		self.index = OrderedDict()
+		self.files = dict()
+		with open(index_path, 'rb') as f_IN:
+			for line in f_IN:
+				split_line = line.rstrip('\r\n').split('\t')
+				if split_line[0] == "#format":
+					self.format = split_line[1]
+				elif split_line[0] == "#columns":
+					self.head = split_line[1:]
+				elif split_line[0] == "group" and split_line[1] == "file":
+					continue
+				else:
+					self.index[split_line[0]] = [split_line[1], int(split_line[2]),
+						int(split_line[3]), int(split_line[4])]
+
+	def keys(self):
+		return self.index.keys()
+
+	def __contains__(self, Group):
+		return Group in self.index
+
+	def __len__(self):
+		return len(self.index)
+
+	def n_rows(self, Group):
+		return self.index[Group][3]
+
+	def read_bytes(self, Group):
+		""" Return Group's segment as it is stored (a whole csv or bgzip file, header included).
+		"""
+		if Group not in self.index:
+			raise KeyError(Group+" is not in the store.")
+		file_name, offset, length, n_rows = self.index[Group]
+		if file_name not in self.files:
+			self.files[file_name] = open(os.path.join(self.store_dir, file_name), 'rb')
+		f_IN = self.files[file_name]
+		f_IN.seek(offset)
+		return f_IN.read(length)
+
+	def rows(self, Group):
+		""" Return Group's rows (not including the header) as lists of strings.
+		"""
+		data = self.read_bytes(Group)
+		if self.format == "bgzip":
+			data = gzip.GzipFile(fileobj=StringIO(data)).read()
+			rows = [line.split('\t') for line in data.splitlines()]
+		else:
+			rows = list(csv.reader(StringIO(data)))
+		return rows[1:]
+
+	def close(self):
+		for f_IN in self.files.values():
+			f_IN.close()
+		self.files = dict()
+
+
+def read_group_list(File):
+	""" Read group keys, one per line (the first tab separated field), from File ("-" for stdin).
+
+		Blank lines, and lines starting with #, are skipped.
+
+		Returns: list of the keys, in file order, without repeats
+	"""
+	if File == "-":
+		f_IN = sys.stdin
+	else:
+		if not os.path.isfile(File):
+			raise ValueError(File+" not found.")
+		f_IN = open(File, 'rb')
+	groups = OrderedDict()
+	try:
+		for line in f_IN:
+			if line.strip() == "" or line[0] == "#":
+				continue
+			groups[line.rstrip('\r\n').split('\t')[0].strip()] = True
+	finally:
+		if f_IN is not sys.stdin:
+			f_IN.close()
+	return groups.keys()
+
+def store_split(Store, Groups, Cols_to_keep, Group_path, Flush_rows=1000, Format="csv",
+	Extents=None, Row_filter=None, Variant_key=None):
+	""" Write Groups out of a store (see GroupStore), seeking straight to each one.
+
+		Nothing but the requested groups is read. With every column kept, no
+		filter or extents, and the store's own format, each group's segment is
+		copied as is.
+
+		Arguments:
+			Store:			GroupStore
+			Groups:			list of groups to write (those not in the store are skipped)
+			Cols_to_keep:	"all" or a list of column indeces (of the store's columns)
+			Group_path:		function. Given a group, return the filepath to write to.
+			Flush_rows:		integer > 0. Rows held in memory before writing them.
+			Format:			output format, one of OUTPUT_FORMATS.
+			Extents:		genomic_index.GroupExtents or None. If given, every row kept is added
+								to it (its columns are the store's columns).
+			Row_filter:		RowFilter or None. If given, rows it doesn't keep are skipped
+								(its columns are the store's columns).
+			Variant_key:	genomic_index.VariantKey or None. If given, each row's variant key
+								is written as an extra, last column (its columns are the
+								store's columns).
+
+		Returns: list of [row_group, n_rows], in the order of Groups
+	"""
+	if Cols_to_keep == "all":
+		Cols_to_keep = range(len(Store.head))
+	copy = (Format == Store.format and list(Cols_to_keep) == range(len(Store.head))
+		and Extents is None and Row_filter is None and Variant_key is None)
+	keep = row_projection(0, Cols_to_keep, Variant_key = Variant_key)[1]
+	head = kept_head(Store.head, Cols_to_keep, Variant_key)
+	row_group_counts = list()
+	for row_group in Groups:
+		if row_group not in Store:
+			continue
+		if copy:
+			path = Group_path(row_group)
+			with open(path, 'wb') as f_OUT:
+				f_OUT.write(Store.read_bytes(row_group))
+			n_rows = Store.n_rows(row_group)
+		else:
+			rows = Store.rows(row_group)
+			if Row_filter is not None:
+				rows = [row for row in rows if Row_filter.keep(row)]
+			if len(rows) == 0:
+				continue
+			path = Group_path(row_group)
+			writer = open_row_writer(path, "wb", head, Flush_rows, Format)
+			for row in rows:
+				writer.writerow(keep(row))
+				if Extents is not None:
+					Extents.add(row_group, row)
+			writer.close()
+			n_rows = len(rows)
+		finish_group_file(path, Format)
+		row_group_counts.append([row_group, n_rows])
+	return row_group_counts
+
+
+class FileHandlePool(object):
+	""" A bounded pool of open row writers, one per group.
+
+		When more than Max_open files would be open, the least recently used
+		file is closed. If that group shows up again, its file is re-opened in
+		append mode, so each group's file is only ever created (and given a
+		header) once.
+
+		Arguments:
+			Group_path:	function. Given a group, return the filepath to write to.
+							Only called the first time a group is seen.
+			Head:		list. Header row written at the top of each new file.
+			Max_open:	integer > 0. Most files allowed open at once.
+			Flush_rows:	integer > 0. Rows each open file holds before writing them.
+			Format:		output format, one of OUTPUT_FORMATS.
+	"""
+	def __init__(self, Group_path, Head, Max_open=256, Flush_rows=1000, Format="csv"):
+		if type(Max_open) is not int or Max_open < 1:
+			raise ValueError("Max_open needs to be an integer > 0.")
+		self.group_path = Group_path
+		self.head = Head
+		self.max_open = Max_open
+		self.flush_rows = Flush_rows
+		self.format = Format
+		# group -> row writer, ordered from least to most recently used
+		self.open_files = OrderedDict()
+		# group -> filepath, for every group that has been created
+		self.paths = dict()
+
+	def writer(self, Group):
+		""" Return a writer for Group, opening (or re-opening) its file if needed.
+		"""
+		if Group in self.open_files:
+			# Mark as most recently used
+			writer = self.open_files.pop(Group)
+			self.open_files[Group] = writer
+			return writer
+		if len(self.open_files) >= self.max_open:
+			# Evict the least recently used file
+			evicted, writer = self.open_files.popitem(last=False)
+			writer.close()
+		if Group in self.paths:
+			writer = open_row_writer(self.paths[Group], "ab", None, self.flush_rows, self.format)
+		else:
+			path = self.group_path(Group)
+			self.paths[Group] = path
+			writer = open_row_writer(path, "wb", self.head, self.flush_rows, self.format)
+		self.open_files[Group] = writer
+		return writer
+
+	def close(self):
+		""" Close every open file.
+		"""
+		while len(self.open_files) > 0:
+			group, writer = self.open_files.popitem(last=False)
+			writer.close()
+
+	def finish(self):
+		""" Close every open file, then finish every group's file (see finish_group_file).
+		"""
+		self.close()
+		for path in self.paths.values():
+			finish_group_file(path, self.format)
+
+
+def hash_split(In_file, Column_index, Cols_to_keep, Group_path, Max_open=256, Flush_rows=1000,
+	N_procs=1, Format="csv", Store=None, Temp_dir="", Extents=None, Only_groups=None, Progress=None,
+	Row_filter=None, Group_key=None, Variant_key=None, Hashes=None):
+	""" Split a file by a column in a single pass, without sorting it first.
+
+		Each row is appended straight to its group's file through a
+		FileHandlePool, so the input does not need to be sorted by the column.
+
+		Arguments:
+			In_file:		"/my_directory/my_fav_file.txt" tab delimited, single line header
+								(may be gzip or bgzip compressed)
+			Column_index:	integer. Which column to group by? [0 = first column]
+			Cols_to_keep:	"all" or a list of column indeces to write out
+			Group_path:		function. Given a group, return the filepath to write to.
+			Max_open:		integer > 0. Most output files allowed open at once.
+			Flush_rows:		integer > 0. Rows each open file holds before writing them.
+			N_procs:		integer > 0. If In_file is a bgzip file, the number of
+								processes decompressing it.
+			Format:			output format, one of OUTPUT_FORMATS.
+			Store:			GroupStoreWriter or None. If given, groups are split into
+								temporary files under Temp_dir, then copied into the store
+								(Group_path and Format are not used).
+			Temp_dir:		"/scratch_dir/" [optional, defaults to the system temp directory]
+			Extents:		genomic_index.GroupExtents or None. If given, every row kept is added
+								to it (for writing an interval index).
+			Only_groups:	set or None. If given, only these groups are split out.
+			Progress:		function or None. Called every PROGRESS_ROWS rows with the rows
+								read so far and the bytes of In_file read (see input_position).
+			Row_filter:		RowFilter or None. If given, rows it doesn't keep are skipped.
+			Group_key:		object or None. If given, rows are grouped by Group_key.key(split_line)
+								instead of by Column_index, and rows it returns None for are
+								skipped (e.g. genomic_index.PositionBins). Its columns() are
+								split off each line. Can't be used with Only_groups.
+			Variant_key:	genomic_index.VariantKey or None. If given, each row's variant key
+								is written as an extra, last column.
+			Hashes:			GroupHashes or None. If given, every row written is added to it.
+
+		Returns: list of [row_group, n_rows], in the order groups were first seen.
+	"""
+	if Group_key is not None and Only_groups is not None:
+		raise ValueError("Only_groups can't be used with a Group_key.")
+	group_counts = OrderedDict()
+	pool = None
+	if Store is not None:
+		Format = Store.format
+		work_dir = tempfile.mkdtemp(prefix="split_", dir=Temp_dir if len(Temp_dir) > 0 else None)
+		# Number the temporary files, group names may not make good file names
+		n_groups = [0]
+		def Group_path(row_group):
+			n_groups[0] = n_groups[0] + 1
+			return os.path.join(work_dir, str(n_groups[0]))
+	f_IN = open_input(In_file, N_procs)
+	try:
+		line_i = 1
+		for line in f_IN:
+			if Progress is not None and line_i % PROGRESS_ROWS == 0:
+				Progress(line_i - 1, input_position(f_IN))
+			# First line is header
+			if line_i == 1:
+				split_line = line.rstrip('\r\n').split('\t')
+				if Cols_to_keep == "all":
+					Cols_to_keep = range(len(split_line))
+				head = kept_head(split_line, Cols_to_keep, Variant_key)
+				n_fields, keep = row_projection(Column_index, Cols_to_keep, Extents, Row_filter, Group_key,
+					Variant_key)
+				pool = FileHandlePool(Group_path, head, Max_open, Flush_rows, Format)
+				if Store is not None:
+					Store.set_head(head)
+				line_i = line_i + 1
+				continue
+
+			# Check the group before splitting the rest of the line
+			if Only_groups is not None and row_key(line, Column_index) not in Only_groups:
+				line_i = line_i + 1
+				continue
+			# Split by tab, only as far as the last column needed
+			split_line = split_row(line, n_fields)
+			if Group_key is not None:
+				row_group = Group_key.key(split_line)
+				if row_group is None:
+					line_i = line_i + 1
+					continue
+			else:
+				row_group = split_line[Column_index]
+				if row_group == "":
+					raise ValueError("Row value was empty at line: "+str(line_i)+". That's not cool.")
+			if Row_filter is not None and not Row_filter.keep(split_line):
+				line_i = line_i + 1
+				continue
+
+			row = keep(split_line)
+			pool.writer(row_group).writerow(row)
+			group_counts[row_group] = group_counts.get(row_group, 0) + 1
+			if Extents is not None:
+				Extents.add(row_group, split_line)
+			if Hashes is not None:
+				Hashes.add(row_group, row)
+			line_i = line_i + 1
+	finally:
+		f_IN.close()
+		if pool is not None:
+			pool.close()
+		if Store is not None and pool is None:
+			shutil.rmtree(work_dir)
+	if Store is not None and pool is not None:
+		try:
+			for row_group, n_rows in group_counts.items():
+				Store.add_group_file(row_group, pool.paths[row_group], n_rows)
+		finally:
+			shutil.rmtree(work_dir)
+	elif pool is not None:
+		pool.finish()
+
+	return [[row_group, n_rows] for row_group, n_rows in group_counts.items()]
+
+
+def sorted_split(In_file, Column_index, Cols_to_keep, Group_path, Flush_rows=1000, Format="csv",
+	Store=None, Extents=None, Only_groups=None, Start=None, Checkpoint=None, Progress=None,
+	Row_filter=None, Variant_key=None, Hashes=None):
+	""" Split a file that is already sorted by a column.
+
+		Rows are written to their group's file as they are read, so at most
+		Flush_rows rows are held in memory no matter how big a group is.
+
+		Arguments:
+			In_file:		"/my_directory/my_fav_file.txt" tab delimited, single line header,
+								sorted by Column_index (may be gzip or bgzip compressed)
+			Column_index:	integer. Which column to group by? [0 = first column]
+			Cols_to_keep:	"all" or a list of column indeces to write out
+			Group_path:		function. Given a group, return the filepath to write to.
+			Flush_rows:		integer > 0. Rows to hold before writing them to file.
+			Format:			output format, one of OUTPUT_FORMATS.
+			Store:			GroupStoreWriter or None. If given, each group is streamed
+								into the store (Group_path and Format are not used).
+			Extents:		genomic_index.GroupExtents or None. If given, every row kept is added
+								to it (for writing an interval index).
+			Only_groups:	set or None. If given, only these groups are split out.
+			Start:			[byte offset, line number] or None. Resume from this line, which
+								must start a group (In_file can't be compressed).
+			Checkpoint:		function or None. Called as each group starts, once every group
+								before it is finished, with the line's byte offset, its line
+								number, and the [row_group, n_rows] of the finished groups
+								(so the split can be resumed with Start).
+			Progress:		function or None. Called every PROGRESS_ROWS rows with the rows
+								read so far and the bytes of In_file read (see input_position).
+			Row_filter:		RowFilter or None. If given, rows it doesn't keep are skipped.
+			Variant_key:	genomic_index.VariantKey or None. If given, each row's variant key
+								is written as an extra, last column.
+			Hashes:			GroupHashes or None. If given, every row written is added to it.
+
+		Returns: list of [row_group, n_rows], in file order (from Start, if given).
+	"""
+	row_group_counts = list()
+	finished_groups = set()
+	row_group = None
+	path = None
+	writer = None
+	if Store is not None:
+		Format = Store.format
+
+	def finish_group():
+		if Store is not None:
+			Store.close_group(row_group_counts[-1][1])
+		else:
+			finish_group_file(path, Format)
+
+	if Start is not None:
+		if is_gzipped(In_file):
+			raise ValueError("Can't resume part way through "+In_file+", it's compressed.")
+		f_IN = open(In_file, 'rb')
+	else:
+		f_IN = open_input(In_file)
+	try:
+		# First line is header
+		header = f_IN.readline()
+		split_line = header.rstrip('\r\n').split('\t')
+		if Cols_to_keep == "all":
+			Cols_to_keep = range(len(split_line))
+		head = kept_head(split_line, Cols_to_keep, Variant_key)
+		n_fields, keep = row_projection(Column_index, Cols_to_keep, Extents, Row_filter,
+			Variant_key = Variant_key)
+		if Store is not None:
+			Store.set_head(head)
+		if Start is not None:
+			offset, line_i = Start
+			f_IN.seek(offset)
+		else:
+			offset = len(header)
+			line_i = 2
+		for line in f_IN:
+			if Progress is not None and line_i % PROGRESS_ROWS == 0:
+				Progress(line_i - 1, input_position(f_IN))
+			line_start = offset
+			offset = offset + len(line)
+			# Check the group before splitting the rest of the line
+			if Only_groups is not None and row_key(line, Column_index) not in Only_groups:
+				line_i = line_i + 1
+				continue
+			# Split by tab, only as far as the last column needed
+			split_line = split_row(line, n_fields)
+
+			if split_line[Column_index] == "":
+				raise ValueError("Row value was empty at line: "+str(line_i)+". That's not cool.")
+			if Row_filter is not None and not Row_filter.keep(split_line):
+				line_i = line_i + 1
+				continue
+
+			# Check if this line's row_group is different from the last line's
+			if split_line[Column_index] != row_group:
+				if writer is not None:
+					writer.close()
+					writer = None
+					finish_group()
+					finished_groups.add(row_group)
+				if Checkpoint is not None:
+					Checkpoint(line_start, line_i, [list(counts) for counts in row_group_counts])
+				row_group = split_line[Column_index]
+				if row_group in finished_groups:
+					raise ValueError(In_file+" isn't sorted by column "+str(Column_index)
+						+": saw "+row_group+" again at line: "+str(line_i))
+				if Store is not None:
+					writer = Store.open_group(row_group, Flush_rows)
+				else:
+					path = Group_path(row_group)
+					writer = open_row_writer(path, "wb", head, Flush_rows, Format)
+				row_group_counts.append([row_group, 0])
+
+			row = keep(split_line)
+			writer.writerow(row)
+			row_group_counts[-1][1] = row_group_counts[-1][1] + 1
+			if Extents is not None:
+				Extents.add(row_group, split_line)
+			if Hashes is not None:
+				Hashes.add(row_group, row)
+			line_i = line_i + 1
+	finally:
+		f_IN.close()
+		# Close out the last group
+		if writer is not None:
+			writer.close()
+	if writer is not None:
+		finish_group()
+
+	return row_group_counts
+
+
+def memory_split(In_file, Column_index, Cols_to_keep, Group_path, N_procs=1, Format="csv",
+	Store=None, Extents=None, Only_groups=None, Progress=None, Row_filter=None, Group_key=None,
+	Variant_key=None, Hashes=None):
+	""" Split a file by a column by reading all of it into memory, then writing each group once.
+
+		Needs memory for every kept row (see profile_functions.choose_split_mode),
+		but doesn't sort, and opens each output file only once.
+
+		Arguments:
+			In_file:		"/my_directory/my_fav_file.txt" tab delimited, single line header
+								(may be gzip or bgzip compressed)
+			Column_index:	integer. Which column to group by? [0 = first column]
+			Cols_to_keep:	"all" or a list of column indeces to write out
+			Group_path:		function. Given a group, return the filepath to write to.
+			N_procs:		integer > 0. If In_file is a bgzip file, the number of
+								processes decompressing it.
+			Format:			output format, one of OUTPUT_FORMATS.
+			Store:			GroupStoreWriter or None. If given, each group is written
+								into the store (Group_path and Format are not used).
+			Extents:		genomic_index.GroupExtents or None. If given, every row kept is added
+								to it (for writing an interval index).
+			Only_groups:	set or None. If given, only these groups are split out.
+			Progress:		function or None. Called every PROGRESS_ROWS rows with the rows
+								read so far and the bytes of In_file read (see input_position).
+			Row_filter:		RowFilter or None. If given, rows it doesn't keep are skipped.
+			Group_key:		object or None. If given, rows are grouped by Group_key.key(split_line)
+								instead of by Column_index, and rows it returns None for are
+								skipped (e.g. genomic_index.PositionBins). Its columns() are
+								split off each line. Can't be used with Only_groups.
+			Variant_key:	genomic_index.VariantKey or None. If given, each row's variant key
+								is written as an extra, last column.
+			Hashes:			GroupHashes or None. If given, every row written is added to it.
+
+		Returns: list of [row_group, n_rows], in the order groups were first seen.
+	"""
+	if Group_key is not None and Only_groups is not None:
+		raise ValueError("Only_groups can't be used with a Group_key.")
+	groups = OrderedDict()
+	head = None
+	f_IN = open_input(In_file, N_procs)
+	try:
+		line_i = 1
+		for line in f_IN:
+			if Progress is not None and line_i % PROGRESS_ROWS == 0:
+				Progress(line_i - 1, input_position(f_IN))
+			# First line is header
+			if line_i == 1:
+				split_line = line.rstrip('\r\n').split('\t')
+				if Cols_to_keep == "all":
+					Cols_to_keep = range(len(split_line))
+				head = kept_head(split_line, Cols_to_keep, Variant_key)
+				n_fields, keep = row_projection(Column_index, Cols_to_keep, Extents, Row_filter, Group_key,
+					Variant_key)
+				line_i = line_i + 1
+				continue
+
+			# Check the group before splitting the rest of the line
+			if Only_groups is not None and row_key(line, Column_index) not in Only_groups:
+				line_i = line_i + 1
+				continue
+			# Split by tab, only as far as the last column needed
+			split_line = split_row(line, n_fields)
+			if Group_key is not None:
+				row_group = Group_key.key(split_line)
+				if row_group is None:
+					line_i = line_i + 1
+					continue
+			else:
+				row_group = split_line[Column_index]
+				if row_group == "":
+					raise ValueError("Row value was empty at line: "+str(line_i)+". That's not cool.")
+			if Row_filter is not None and not Row_filter.keep(split_line):
+				line_i = line_i + 1
+				continue
+
+			rows = groups.get(row_group)
+			if rows is None:
+				rows = list()
+				groups[row_group] = rows
+			row = keep(split_line)
+			rows.append(row)
+			if Extents is not None:
+				Extents.add(row_group, split_line)
+			if Hashes is not None:
+				Hashes.add(row_group, row)
+			line_i = line_i + 1
+	finally:
+		f_IN.close()
+	if head is None:
+		return list()
+
+	if Store is not None:
+		Format = Store.format
+		Store.set_head(head)
+	row_group_counts = [[row_group, len(rows)] for row_group, rows in groups.items()]
+	for row_group, n_rows in row_group_counts:
+		# Let go of each group's rows once they're written
+		rows = groups.pop(row_group)
+		if Store is not None:
+			writer = Store.open_group(row_group, n_rows + 1)
+		else:
+			path = Group_path(row_group)
+			writer = open_row_writer(path, "wb", head, n_rows + 1, Format)
+		for row in rows:
+			writer.writerow(row)
+		writer.close()
+		if Store is not None:
+			Store.close_group(n_rows)
+		else:
+			finish_group_file(path, Format)
+
+	return row_group_counts
+
+
+def _split_byte_range(Args):
+	""" Worker for parallel_split: hash split one byte range into headerless partial files.
+
+		If Bgzf is True, Start and End are bgzip block offsets (see read_bgzf_lines).
+
+		Partial files are numbered in the order groups were first seen, since a
+		group (a value from the file) can't be trusted to be a file name.
+
+		Returns: [list of [row_group, n_rows] in the order groups were first seen,
+				  the range's GroupExtents (or None),
+				  dictionary of row_group -> its partial file]
+	"""
+	(In_file, Start, End, Bgzf, Column_index, Cols_to_keep, Part_dir, Max_open, Flush_rows, Extents,
+		Only_groups, Row_filter, Group_key, Variant_key) = Args
+	group_counts = OrderedDict()
+	# Only called the first time a group is seen, before it's counted
+	pool = FileHandlePool(lambda row_group: os.path.join(Part_dir, "group_"+str(len(group_counts))),
+			None, Max_open, Flush_rows)
+	n_fields, keep = row_projection(Column_index, Cols_to_keep, Extents, Row_filter, Group_key, Variant_key)
+	if Bgzf:
+		lines = read_bgzf_lines(In_file, Start, End)
+	else:
+		lines = read_byte_range_lines(In_file, Start, End)
+	try:
+		for line in lines:
+			# Check the group before splitting the rest of the line
+			if Only_groups is not None and row_key(line, Column_index) not in Only_groups:
+				continue
+			# Split by tab, only as far as the last column needed
+			split_line = split_row(line, n_fields)
+			if Group_key is not None:
+				row_group = Group_key.key(split_line)
+				if row_group is None:
+					continue
+			else:
+				row_group = split_line[Column_index]
+				if row_group == "":
+					raise ValueError("Row value was empty in byte range "+str(Start)+"-"+str(End)
+						+" of "+In_file+". That's not cool.")
+			if Row_filter is not None and not Row_filter.keep(split_line):
+				continue
+			pool.writer(row_group).writerow(keep(split_line))
+			group_counts[row_group] = group_counts.get(row_group, 0) + 1
+			if Extents is not None:
+				Extents.add(row_group, split_line)
+	finally:
+		pool.close()
+	return [[[row_group, n_rows] for row_group, n_rows in group_counts.items()], Extents, pool.paths]
+
+def _merge_partials(Args):
+	""" Worker for parallel_split: write a header, then each partial file in order, to Path.
+
+		Returns: [n_rows, sha1] of the rows (see GroupHashes) if Hash is True, otherwise None
+	"""
+	Path, Head, Partials, Flush_rows, Format, Finish, Hash = Args
+	group_hash = GroupHashes()
+	if Format == "csv" and not Hash:
+		# The partials are already csv, so just copy them
+		with open(Path, "wb") as f:
+			csv.writer(f).writerow(Head)
+			for partial in Partials:
+				with open(partial, "rb") as part:
+					shutil.copyfileobj(part, f)
+	else:
+		writer = open_row_writer(Path, "wb", Head, Flush_rows, Format)
+		try:
+			for partial in Partials:
+				with open(partial, "rb") as part:
+					for row in csv.reader(part):
+						writer.writerow(row)
+						if Hash:
+							group_hash.add(Path, row)
+		finally:
+			writer.close()
+		if Finish:
+			finish_group_file(Path, Format)
+	if Hash:
+		return group_hash.hashes()[Path]
+	return None
+
+def parallel_split(In_file, Column_index, Cols_to_keep, Group_path,
+	N_procs=multiprocessing.cpu_count(), Temp_dir="", Max_open=256, Flush_rows=1000, Format="csv",
+	Store=None, Extents=None, Only_groups=None, Progress=None, Row_filter=None, Group_key=None,
+	Variant_key=None, Hashes=None):
+	""" Split a file by a column with N_procs worker processes.
+
+		The file is divided into newline aligned byte ranges (or, for a bgzip
+		file, ranges of compressed blocks that each worker decompresses). Each worker
+		splits its range into headerless partial files (one per group) in a
+		temporary directory, then the partials for each group are concatenated
+		in file order beneath a single header. Rows within a group keep the
+		order they had in the input file.
+
+		Arguments:
+			In_file:		"/my_directory/my_fav_file.txt" tab delimited, single line header
+								(may be bgzip compressed, but not plain gzip compressed)
+			Column_index:	integer. Which column to group by? [0 = first column]
+			Cols_to_keep:	"all" or a list of column indeces to write out
+			Group_path:		function. Given a group, return the filepath to write to.
+			N_procs:		integer > 0. Number of worker processes.
+			Temp_dir:		"/scratch_dir/" where partial files are written
+								[optional, defaults to the system temp directory]
+			Max_open:		integer > 0. Most partial files each worker keeps open at once.
+			Flush_rows:		integer > 0. Rows each open file holds before writing them.
+			Format:			output format, one of OUTPUT_FORMATS.
+			Store:			GroupStoreWriter or None. If given, groups are merged into
+								temporary files, then copied into the store
+								(Group_path and Format are not used).
+			Extents:		genomic_index.GroupExtents or None. If given, every row kept is added
+								to it (for writing an interval index).
+			Only_groups:	set or None. If given, only these groups are split out.
+			Progress:		function or None. Called as each byte range is split, with the
+								rows split so far and the end of the range (in bytes of In_file).
+			Row_filter:		RowFilter or None. If given, rows it doesn't keep are skipped.
+			Group_key:		object or None. If given, rows are grouped by Group_key.key(split_line)
+								instead of by Column_index, and rows it returns None for are
+								skipped (e.g. genomic_index.PositionBins). Its columns() are
+								split off each line. Can't be used with Only_groups.
+			Variant_key:	genomic_index.VariantKey or None. If given, each row's variant key
+								is written as an extra, last column.
+			Hashes:			GroupHashes or None. If given, every row written is added to it.
+
+		Returns: list of [row_group, n_rows], in the order groups were first seen.
+	"""
+	if Group_key is not None and Only_groups is not None:
+		raise ValueError("Only_groups can't be used with a Group_key.")
+	if type(N_procs) is not int or N_procs < 1:
+		raise ValueError("N_procs needs to be an integer > 0.")
+	if len(Temp_dir) > 0 and not os.path.isdir(Temp_dir):
+		raise ValueError(Temp_dir+" not found.")
+
+	bgzf = is_bgzf(In_file)
+	if is_gzipped(In_file) and not bgzf:
+		raise ValueError(In_file+" is gzip compressed, which can't be split into ranges. "
+			+"Please recompress it with bgzip, or use --mode hash.")
+
+	f_IN = open_input(In_file)
+	header = f_IN.readline()
+	f_IN.close()
+	split_line = header.rstrip('\r\n').split('\t')
+	if Cols_to_keep == "all":
+		Cols_to_keep = range(len(split_line))
+	head = kept_head(split_line, Cols_to_keep, Variant_key)
+	if Store is not None:
+		Format = Store.format
+		Store.set_head(head)
+
+	if bgzf:
+		blocks = get_bgzf_blocks(In_file)
+		blocks.append(os.path.getsize(In_file))
+		step = max((len(blocks)-1+N_procs-1)/N_procs, 1)
+		starts = range(0, len(blocks)-1, step)
+		ranges = [[blocks[start_i], blocks[min(start_i+step, len(blocks)-1)]] for start_i in starts]
+	else:
+		ranges = get_byte_ranges(In_file, len(header), N_procs)
+	work_dir = tempfile.mkdtemp(prefix="split_", dir=Temp_dir if len(Temp_dir) > 0 else None)
+	try:
+		jobs = list()
+		for range_i, byte_range in enumerate(ranges):
+			part_dir = os.path.join(work_dir, "part_"+str(range_i))
+			os.mkdir(part_dir)
+			jobs.append([In_file, byte_range[0], byte_range[1], bgzf, Column_index,
+				Cols_to_keep, part_dir, Max_open, Flush_rows, Extents, Only_groups, Row_filter, Group_key,
+				Variant_key])
+
+		workers = multiprocessing.Pool(N_procs)
+		try:
+			range_counts = list()
+			n_rows = 0
+			for counts, range_extents, partials in workers.imap(_split_byte_range, jobs):
+				range_counts.append([counts, range_extents, partials])
+				if Progress is not None:
+					n_rows = n_rows + sum([group[1] for group in counts])
+					Progress(n_rows, ranges[len(range_counts)-1][1])
+
+			# Tally rows per group and which partial files each group is in
+			group_counts = OrderedDict()
+			group_partials = dict()
+			for counts, range_extents, partials in range_counts:
+				if Extents is not None:
+					Extents.update(range_extents)
+				for row_group, n_rows in counts:
+					if row_group not in group_counts:
+						group_counts[row_group] = 0
+						group_partials[row_group] = list()
+					group_counts[row_group] = group_counts[row_group] + n_rows
+					group_partials[row_group].append(partials[row_group])
+
+			if Store is not None:
+				group_paths = [os.path.join(work_dir, "group_"+str(group_i))
+						for group_i in range(len(group_counts))]
+			else:
+				group_paths = [Group_path(row_group) for row_group in group_counts]
+			merges = [[group_paths[group_i], head, group_partials[row_group], Flush_rows, Format,
+					Store is None, Hashes is not None] for group_i, row_group in enumerate(group_counts)]
+			merged_hashes = workers.map(_merge_partials, merges)
+			if Hashes is not None:
+				for group_i, row_group in enumerate(group_counts):
+					Hashes.set(row_group, merged_hashes[group_i][0], merged_hashes[group_i][1])
+			if Store is not None:
+				for group_i, row_group in enumerate(group_counts):
+					Store.add_group_file(row_group, group_paths[group_i], group_counts[row_group])
+		finally:
+			workers.close()
+			workers.join()
+	finally:
+		shutil.rmtree(work_dir)
+
+	return [[row_group, n_rows] for row_group, n_rows in group_counts.items()]
+
+
+def fingerprint_file(File, N_samples=16, Sample_bytes=65536):
+	""" Return a cheap fingerprint of a file: [size, mtime, sha1 of N_samples evenly spaced blocks].
+
+		The first and last blocks are always sampled, so appended or truncated
+		files are caught even if the mtime was kept.
+	"""
+	size = os.path.getsize(File)
+	sha1 = hashlib.sha1()
+	with open(File, 'rb') as f_IN:
+		if size <= N_samples*Sample_bytes:
+			sha1.update(f_IN.read())
+		else:
+			step = (size-Sample_bytes)/(N_samples-1)
+			for sample_i in range(N_samples):
+				f_IN.seek(sample_i*step)
+				sha1.update(f_IN.read(Sample_bytes))
+	return [str(size), "%.6f" % os.path.getmtime(File), sha1.hexdigest()]
+
+class GroupHashes(object):
+	""" Count and hash each group's kept rows, in the order they're added.
+
+		A group's hash changes if any of its kept values, or their order, changes.
+		The splitters add the rows they write (see their Hashes), so a split's
+		manifest doesn't need another read of the input (see hash_groups).
+	"""
+	def __init__(self):
+		# row_group -> [n_rows, sha1 (or its hex digest, see set)]
+		self.groups = OrderedDict()
+
+	def add(self, Group, Row):
+		""" Add Row, a list of kept values, to Group's hash.
+		"""
+		group_hash = self.groups.get(Group)
+		if group_hash is None:
+			group_hash = [0, hashlib.sha1()]
+			self.groups[Group] = group_hash
+		group_hash[0] = group_hash[0] + 1
+		group_hash[1].update("\t".join(Row)+"\n")
+
+	def set(self, Group, N_rows, Sha1):
+		""" Record a group hashed elsewhere (e.g. by a worker process), with its hex digest.
+		"""
+		self.groups[Group] = [N_rows, Sha1]
+
+	def hashes(self):
+		""" Returns: OrderedDict of row_group -> [n_rows, sha1], in the order groups were first added
+		"""
+		return OrderedDict([[row_group, [group_hash[0], group_hash[1] if type(group_hash[1]) is str
+			else group_hash[1].hexdigest()]] for row_group, group_hash in self.groups.items()])
+
+def hash_groups(In_file, Column_index, Cols_to_keep, N_procs=1, Extents=None, Progress=None, Row_filter=None,
+	Variant_key=None):
+	""" Read a file once, without writing anything, and hash each group's kept rows.
+
+		A group's hash changes if any of its kept values, or their order, changes.
+
+		Arguments:
+			In_file:		"/my_directory/my_fav_file.txt" tab delimited, single line header
+								(may be gzip or bgzip compressed)
+			Column_index:	integer. Which column to group by? [0 = first column]
+			Cols_to_keep:	"all" or a list of column indeces
+			N_procs:		integer > 0. If In_file is a bgzip file, the number of
+								processes decompressing it.
+			Extents:		genomic_index.GroupExtents or None. If given, every row kept is added to it.
+			Progress:		function or None. Called every PROGRESS_ROWS rows with the rows
+								read so far and the bytes of In_file read (see input_position).
+			Row_filter:		RowFilter or None. If given, rows it doesn't keep are skipped.
+			Variant_key:	genomic_index.VariantKey or None. If given, each row's variant key
+								is hashed with its kept values.
+
+		Returns: OrderedDict of row_group -> [n_rows, sha1], in the order groups were first seen
+	"""
+	hashes = GroupHashes()
+	f_IN = open_input(In_file, N_procs)
+	try:
+		split_line = f_IN.readline().rstrip('\r\n').split('\t')
+		if Cols_to_keep == "all":
+			Cols_to_keep = range(len(split_line))
+		n_fields, keep = row_projection(Column_index, Cols_to_keep, Extents, Row_filter,
+			Variant_key = Variant_key)
+		for row_i, line in enumerate(f_IN):
+			if Progress is not None and row_i % PROGRESS_ROWS == 0:
+				Progress(row_i, input_position(f_IN))
+			split_line = split_row(line, n_fields)
+			if Row_filter is not None and not Row_filter.keep(split_line):
+				continue
+			row_group = split_line[Column_index]
+			hashes.add(row_group, keep(split_line))
+			if Extents is not None:
+				Extents.add(row_group, split_line)
+	finally:
+		f_IN.close()
+	return hashes.hashes()
+
+def read_split_manifest(Path):
+	""" Read a manifest written by write_split_manifest.
+
+		Returns: [fingerprint, settings, OrderedDict of row_group -> [location, n_rows, sha1]]
+	"""
+	fingerprint = None
+	settings = None
+	groups = OrderedDict()
+	with open(Path, 'rb') as f_IN:
+		for line in f_IN:
+			split_line = line.rstrip('\r\n').split('\t')
+			if split_line[0] == "#input":
+				fingerprint = split_line[1:]
+			elif split_line[0] == "#settings":
+				settings = split_line[1:]
+			elif split_line[0] == "group" and split_line[1] == "location":
+				continue
+			else:
+				groups[split_line[0]] = [split_line[1], int(split_line[2]), split_line[3]]
+	return [fingerprint, settings, groups]
+
+def write_split_manifest(Path, Fingerprint, Settings, Groups):
+	""" Write the split manifest, replacing any old one only once it is complete.
+
+			#input	size	mtime	sha1
+			#settings	column=0	keep=keep_0_1_2_3_8_9	...
+			group	location	n_rows	sha1
+			ENSG0001	ENSG0001/ENSG0001.BED.csv	412	5b0c...
+
+		Arguments:
+			Path:			"/my_directory/split.manifest"
+			Fingerprint:	from fingerprint_file
+			Settings:		list of "name=value" strings that change the output
+			Groups:			list of [row_group, location, n_rows, sha1]
+	"""
+	with open(Path+".tmp", 'wb') as f_OUT:
+		f_OUT.write("\t".join(["#input"]+Fingerprint)+"\n")
+		f_OUT.write("\t".join(["#settings"]+Settings)+"\n")
+		f_OUT.write("group\tlocation\tn_rows\tsha1\n")
+		for group in Groups:
+			f_OUT.write("\t".join([str(value) for value in group])+"\n")
+	os.rename(Path+".tmp", Path)
+
+
+def write_split_checkpoint(Path, Fingerprint, Settings, Sorted_file, Start, Row_group_counts, Extents=None):
+	""" Record how far a sorted split got, replacing any old checkpoint only once it is complete.
+
+			#input	size	mtime	sha1
+			#settings	column=0	keep=keep_0_1_2_3_8_9	...
+			#sorted	/my_directory/my_fav_file_sorted.txt	size
+			#start	offset	line
+			group	ENSG0001	412
+			extent	ENSG0001	1	109274570	109817590	412
+
+		Arguments:
+			Path:				"/my_directory/split.checkpoint"
+			Fingerprint:		of the unsorted input, from fingerprint_file
+			Settings:			list of "name=value" strings that change the output
+			Sorted_file:		the sorted file being split
+			Start:				[byte offset, line number] of the first unfinished group
+			Row_group_counts:	[row_group, n_rows] of each finished group
+			Extents:			genomic_index.GroupExtents or None
+	"""
+	with open(Path+".tmp", 'wb') as f_OUT:
+		f_OUT.write("\t".join(["#input"]+Fingerprint)+"\n")
+		f_OUT.write("\t".join(["#settings"]+Settings)+"\n")
+		f_OUT.write("\t".join(["#sorted", Sorted_file, str(os.path.getsize(Sorted_file))])+"\n")
+		f_OUT.write("\t".join(["#start", str(Start[0]), str(Start[1])])+"\n")
+		for row_group, n_rows in Row_group_counts:
+			f_OUT.write("group\t"+row_group+"\t"+str(n_rows)+"\n")
+		if Extents is not None:
+			for extent in Extents.extent_rows():
+				f_OUT.write("\t".join(["extent"]+[str(value) for value in extent])+"\n")
+	os.rename(Path+".tmp", Path)
+
+def read_split_checkpoint(Path, Extents=None):
+	""" Read a checkpoint written by write_split_checkpoint.
+
+		Arguments:
+			Path:		"/my_directory/split.checkpoint"
+			Extents:	genomic_index.GroupExtents or None. If given, the saved extents are added to it.
+
+		Returns: [fingerprint, settings, [sorted file, its size], Start, Row_group_counts]
+	"""
+	checkpoint = [None, None, None, None, list()]
+	with open(Path, 'rb') as f_IN:
+		for line in f_IN:
+			split_line = line.rstrip('\r\n').split('\t')
+			if split_line[0] == "#input":
+				checkpoint[0] = split_line[1:]
+			elif split_line[0] == "#settings":
+				checkpoint[1] = split_line[1:]
+			elif split_line[0] == "#sorted":
+				checkpoint[2] = [split_line[1], int(split_line[2])]
+			elif split_line[0] == "#start":
+				checkpoint[3] = [int(split_line[1]), int(split_line[2])]
+			elif split_line[0] == "group":
+				checkpoint[4].append([split_line[1], int(split_line[2])])
+			elif split_line[0] == "extent" and Extents is not None:
+				Extents.add_extent(split_line[1], split_line[2], int(split_line[3]), int(split_line[4]),
+					int(split_line[5]))
+	return checkpoint
+
+
+def split_settings(Column_index, Keep, Format, Layout, Interval_cols="", Gene_table="", Row_filter=None,
+	Variant_key=None):
+	""" Return the "name=value" strings, recorded in the split manifest and checkpoint,
+		of the settings that change a split's output.
+	"""
+	settings = ["column="+str(Column_index), "keep="+Keep, "format="+Format, "layout="+Layout,
+		"interval_cols="+Interval_cols,
+		"gene_table="+(",".join(fingerprint_file(Gene_table)) if len(Gene_table) > 0 else "")]
+	if Row_filter is not None:
+		settings.append("filter="+Row_filter.describe())
+	if Variant_key is not None:
+		settings.append("variant_key="+Variant_key.describe())
+	return settings
+
+def split_by_column(In_file, Column_index, Cols_to_keep, Out_dir, Group_path, Settings, Metrics,
+	Mode="sort", Max_open=256, Flush_rows=1000, N_procs=1, Temp_dir="", Memory_mb=1024, Format="csv",
+	Layout="files", Store_file_mb=4096, Extents=None, Gene_table="", Store_in=None, Groups=None,
+	Cache=True, Checkpoint_seconds=300, Resume=False, Row_filter=None, Variant_key=None):
+	""" Split a file by a column into Out_dir, the way fileize_by_column.py and
+		folderize_by_column.py do (they only differ in Group_path).
+
+		With Cache, the split is skipped, or only the changed groups are rewritten,
+		if split.manifest in Out_dir allows it, and the manifest is written
+		afterwards. With Resume (--mode sort, one file per group), the split picks
+		up from split.checkpoint. An interval index (intervals.idx) is written if
+		Extents or Gene_table are given.
+
+		Arguments:
+			In_file:			"/my_directory/my_fav_file.txt" tab delimited, single line header
+			Column_index:		integer. Which column to group by? [0 = first column]
+			Cols_to_keep:		"all" or a list of column indeces to write out
+			Out_dir:			"/my_directory/output/"
+			Group_path:			function. Given a group, return the filepath to write to.
+			Settings:			from split_settings
+			Metrics:			metrics_functions.SplitMetrics
+			Mode:				sort, presorted, memory, hash, parallel, or auto (see fileize_by_column.py)
+			Max_open, Flush_rows, N_procs, Temp_dir, Memory_mb, Format, Layout, Store_file_mb:
+								as in the splitters (see fileize_by_column.py)
+			Extents:			genomic_index.GroupExtents or None
+			Gene_table:			"/my_directory/genes.txt" or ""
+			Store_in:			GroupStore or None. If given, groups are split out of it instead of In_file.
+			Groups:				list or None. If given, only these groups are split out (Cache needs to be off).
+			Cache:				Boolean. Use and write split.manifest.
+			Checkpoint_seconds:	integer >= 0. With --mode sort, how often to write split.checkpoint.
+			Resume:				Boolean. Pick up from split.checkpoint.
+			Row_filter:			RowFilter or None
+			Variant_key:		genomic_index.VariantKey or None
+
+		Returns: [list of [row_group, n_rows], the mode used, the set of groups split out
+				  (or None if every group was), whether the split was skipped]
+	"""
+	def group_location(row_group):
+		""" Return where the rows of row_group are, relative to Out_dir.
+		"""
+		if Layout == "store":
+			return "store.idx"
+		return Group_path(row_group)[len(Out_dir):]
+
+	# Skip the split, or only rewrite changed groups, if the last split's manifest allows it
+	manifest_path = Out_dir+"split.manifest"
+	fingerprint = fingerprint_file(In_file)
+	group_hashes = None
+	split_hashes = None
+	only_groups = None
+	old_groups = dict()
+	if Cache:
+		if os.path.isfile(manifest_path):
+			old_fingerprint, old_settings, old_groups = read_split_manifest(manifest_path)
+		else:
+			old_fingerprint, old_settings, old_groups = [None, None, dict()]
+		outputs_exist = all([os.path.isfile(Out_dir+group[0]) for group in old_groups.values()])
+		if Extents is not None or len(Gene_table) > 0:
+			outputs_exist = outputs_exist and os.path.isfile(Out_dir+"intervals.idx")
+		if old_settings == Settings and outputs_exist and old_fingerprint == fingerprint:
+			print "Output in "+Out_dir+" is current (see "+manifest_path+"), nothing to do."
+			row_group_counts = [[row_group, group[1]] for row_group, group in old_groups.items()]
+			Metrics.finish({"groups": len(old_groups), "rows": sum([group[1] for group in old_groups.values()]),
+				"skipped": True})
+			return [row_group_counts, Mode, None, True]
+		if old_settings == Settings and outputs_exist and Layout == "files" and len(old_groups) > 0:
+			# Only the changed groups need rewriting, but finding them takes a read of the input
+			Metrics.start_stage("cache")
+			group_hashes = hash_groups(In_file = In_file,
+						Column_index = Column_index,
+						Cols_to_keep = Cols_to_keep,
+						N_procs = N_procs,
+						Extents = Extents,
+						Progress = Metrics.progress,
+						Row_filter = Row_filter,
+						Variant_key = Variant_key)
+			Metrics.end_stage({"groups": len(group_hashes)})
+			only_groups = set([row_group for row_group in group_hashes
+				if row_group not in old_groups or old_groups[row_group][2] != group_hashes[row_group][1]])
+			print str(len(only_groups))+" of "+str(len(group_hashes))+" group(s) changed since the last split."
+			if (Mode == "sort" or Mode == "auto") and len(only_groups) > 0:
+				# Rows keep their file order within each group either way, so skip the sort
+				print "Splitting the changed groups with --mode hash."
+				Mode = "hash"
+		else:
+			# Everything is split, so hash the rows as they're written
+			split_hashes = GroupHashes()
+	if Groups is not None:
+		only_groups = set(Groups)
+		if Store_in is None and (Mode == "sort" or Mode == "auto"):
+			# There's no need to sort the whole file to pull out a few groups
+			print "Extracting "+str(len(Groups))+" group(s) with --mode hash."
+			Mode = "hash"
+	if Mode == "auto" and Store_in is None:
+		# Imported here, profile_functions imports this module
+		from profile_functions import profile_file, choose_split_mode
+		Metrics.start_stage("profile")
+		profile = profile_file(File = In_file, Column_index = Column_index)
+		for line in profile.report():
+			print line
+		Mode, reason = choose_split_mode(Profile = profile,
+					Memory_mb = Memory_mb,
+					Max_open = Max_open,
+					N_procs = N_procs)
+		print "Using --mode "+Mode+": "+reason
+		Metrics.end_stage({"mode": Mode})
+	# Extents were already tracked while hashing
+	split_extents = Extents if group_hashes is None else None
+
+	if Layout == "store":
+		store = GroupStoreWriter(Out_dir = Out_dir,
+					Format = Format,
+					Max_file_mb = Store_file_mb)
+	else:
+		store = None
+
+	if Store_in is not None:
+		Metrics.start_stage("split")
+		row_group_counts = store_split(Store = Store_in,
+					Groups = Groups if Groups is not None else Store_in.keys(),
+					Cols_to_keep = Cols_to_keep,
+					Group_path = Group_path,
+					Flush_rows = Flush_rows,
+					Format = Format,
+					Extents = split_extents,
+					Row_filter = Row_filter,
+					Variant_key = Variant_key)
+		Store_in.close()
+	elif only_groups is not None and len(only_groups) == 0:
+		row_group_counts = list()
+	elif Mode == "hash":
+		Metrics.start_stage("split")
+		row_group_counts = hash_split(In_file = In_file,
+					Column_index = Column_index,
+					Cols_to_keep = Cols_to_keep,
+					Group_path = Group_path,
+					Max_open = Max_open,
+					Flush_rows = Flush_rows,
+					N_procs = N_procs,
+					Format = Format,
+					Store = store,
+					Temp_dir = Temp_dir,
+					Extents = split_extents,
+					Only_groups = only_groups,
+					Progress = Metrics.progress,
+					Row_filter = Row_filter,
+					Variant_key = Variant_key,
+					Hashes = split_hashes)
+	elif Mode == "memory":
+		Metrics.start_stage("split")
+		row_group_counts = memory_split(In_file = In_file,
+					Column_index = Column_index,
+					Cols_to_keep = Cols_to_keep,
+					Group_path = Group_path,
+					N_procs = N_procs,
+					Format = Format,
+					Store = store,
+					Extents = split_extents,
+					Only_groups = only_groups,
+					Progress = Metrics.progress,
+					Row_filter = Row_filter,
+					Variant_key = Variant_key,
+					Hashes = split_hashes)
+	elif Mode == "parallel":
+		Metrics.start_stage("split")
+		row_group_counts = parallel_split(In_file = In_file,
+					Column_index = Column_index,
+					Cols_to_keep = Cols_to_keep,
+					Group_path = Group_path,
+					N_procs = N_procs,
+					Temp_dir = Temp_dir,
+					Max_open = Max_open,
+					Flush_rows = Flush_rows,
+					Format = Format,
+					Store = store,
+					Extents = split_extents,
+					Only_groups = only_groups,
+					Progress = Metrics.progress,
+					Row_filter = Row_filter,
+					Variant_key = Variant_key,
+					Hashes = split_hashes)
+	else:
+		checkpoint_path = Out_dir+"split.checkpoint"
+		split_file = In_file
+		start = None
+		resumed_counts = list()
+		if Resume and os.path.isfile(checkpoint_path):
+			saved = read_split_checkpoint(checkpoint_path)
+			if (saved[0] == fingerprint and saved[1] == Settings and os.path.isfile(saved[2][0])
+				and os.path.getsize(saved[2][0]) == saved[2][1]):
+				if split_extents is not None:
+					read_split_checkpoint(checkpoint_path, split_extents)
+				split_file = saved[2][0]
+				start = saved[3]
+				resumed_counts = saved[4]
+				print "Resuming from "+checkpoint_path+": "+str(len(resumed_counts)) \
+					+" group(s) already split, continuing from line "+str(start[1])+" of "+split_file
+			else:
+				print checkpoint_path+" doesn't match the input or settings, starting over."
+		elif Resume:
+			print "No checkpoint in "+Out_dir+", starting from the beginning."
+
+		if start is None and Mode == "sort":
+			Metrics.start_stage("sort")
+			try:
+				split_file = bash_sort(File = In_file,
+							In_dir = "",
+							Out_dir = "",
+							Col = Column_index+1,
+							Header = True,
+							Memory_mb = Memory_mb,
+							Temp_dir = Temp_dir,
+							N_procs = N_procs)
+			except BaseException:
+				raise StandardError("bash_sort failed.")
+			Metrics.end_stage()
+
+		# The first checkpoint is written as soon as the sort is done
+		last_checkpoint = [0]
+		def checkpoint(Offset, Line_i, Row_group_counts):
+			""" Record progress in split.checkpoint, at most every Checkpoint_seconds.
+			"""
+			if time.time() - last_checkpoint[0] < Checkpoint_seconds:
+				return
+			write_split_checkpoint(Path = checkpoint_path,
+						Fingerprint = fingerprint,
+						Settings = Settings,
+						Sorted_file = split_file,
+						Start = [Offset, Line_i],
+						Row_group_counts = resumed_counts + Row_group_counts,
+						Extents = split_extents)
+			last_checkpoint[0] = time.time()
+
+		Metrics.start_stage("split", In_file = split_file)
+		row_group_counts = resumed_counts + sorted_split(In_file = split_file,
+					Column_index = Column_index,
+					Cols_to_keep = Cols_to_keep,
+					Group_path = Group_path,
+					Flush_rows = Flush_rows,
+					Format = Format,
+					Store = store,
+					Extents = split_extents,
+					Only_groups = only_groups,
+					Start = start,
+					Checkpoint = checkpoint if Checkpoint_seconds > 0 and store is None and Mode == "sort" else None,
+					Progress = Metrics.progress,
+					Row_filter = Row_filter,
+					Variant_key = Variant_key,
+					Hashes = split_hashes)
+		if os.path.isfile(checkpoint_path):
+			os.remove(checkpoint_path)
+		if start is not None and split_hashes is not None:
+			# The groups split before the checkpoint weren't hashed
+			Metrics.start_stage("cache")
+			split_hashes = None
+			group_hashes = hash_groups(In_file = In_file,
+						Column_index = Column_index,
+						Cols_to_keep = Cols_to_keep,
+						N_procs = N_procs,
+						Progress = Metrics.progress,
+						Row_filter = Row_filter,
+						Variant_key = Variant_key)
+			Metrics.end_stage({"groups": len(group_hashes)})
+
+	Metrics.end_stage({"groups": len(row_group_counts), "rows": sum([group[1] for group in row_group_counts])})
+	if Groups is not None and len(row_group_counts) < len(Groups):
+		print "Warning: "+str(len(Groups)-len(row_group_counts))+" of the "+str(len(Groups)) \
+			+" group(s) asked for weren't found (or none of their rows pass the filters)."
+
+	if store is not None:
+		print "Wrote store index: "+store.close()
+
+	if split_hashes is not None:
+		group_hashes = split_hashes.hashes()
+	if group_hashes is not None:
+		row_group_counts = [[row_group, group_hash[0]] for row_group, group_hash in group_hashes.items()]
+		if Layout == "files":
+			# Groups can disappear from the input, or have every row filtered out
+			for row_group, group in old_groups.items():
+				if row_group not in group_hashes:
+					print "Removing "+row_group+", it's no longer in "+In_file+" (or none of its rows pass the filters)"
+					old_path = Out_dir+group[0]
+					for path in [old_path, old_path+".gzi"]:
+						if os.path.isfile(path):
+							os.remove(path)
+					if os.path.dirname(old_path)+"/" != Out_dir and os.path.isdir(os.path.dirname(old_path)) \
+						and len(os.listdir(os.path.dirname(old_path))) == 0:
+						os.rmdir(os.path.dirname(old_path))
+
+	if Extents is not None or len(Gene_table) > 0:
+		row_groups = [row_group[0] for row_group in row_group_counts]
+		locations = dict([[row_group, group_location(row_group)] for row_group in row_groups])
+		n_indexed = write_interval_index(Path = Out_dir+"intervals.idx",
+					Groups = row_groups,
+					Locations = locations,
+					Extents = Extents,
+					Gene_table = read_gene_table(Gene_table) if len(Gene_table) > 0 else None)
+		print "Wrote interval index for "+str(n_indexed)+" of "+str(len(row_groups))+" group(s): "+Out_dir+"intervals.idx"
+		if Extents is not None and len(Extents.split_chromosome_groups()) > 0:
+			print "Warning: rows of these groups are on more than one chromosome (indexed on the most common): " \
+				+str(Extents.split_chromosome_groups())
+
+	if group_hashes is not None:
+		write_split_manifest(Path = manifest_path,
+					Fingerprint = fingerprint,
+					Settings = Settings,
+					Groups = [[row_group, group_location(row_group), group_hash[0], group_hash[1]]
+						for row_group, group_hash in group_hashes.items()])
+
+	Metrics.finish({"mode": Mode, "groups": len(row_group_counts),
+		"rows": sum([group[1] for group in row_group_counts]),
+		"changed_groups": len(only_groups) if only_groups is not None else None})
+	return [row_group_counts, Mode, only_groups, False]
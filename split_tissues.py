@@ -0,0 +1,168 @@
+#!/usr/bin/python
+
+### split_tissues.py
+### 2026_10_18
+
+### This script splits many files (e.g. one per GTEx tissue) by a column, each
+###  with folderize_by_column.py (or fileize_by_column.py) in its own job, and
+###  runs the jobs at the same time, but never more than --max_readers jobs
+###  reading from, or --max_writers jobs writing to, any one filesystem.
+###  The biggest files are started first.
+###
+###  Arguments:
+###    tissues.txt: tab delimited manifest of the files to split, one per line:
+###      tissue	input_file	column	keep_*	output_directory/	[options]
+###      e.g.
+###      Liver	/data/eQTLs/Liver_eqtl.txt	0	keep_0_1_2_3_8_9	/data/eQTLs/Liver/	--mode hash
+###      (options are passed on to the split script; lines starting with # are skipped)
+###	 valid filepath
+###    script_directory/: where the split script and run_task_array.py are
+###    log_directory/: where the task manifest, status database, and job logs are written
+###
+###  Options:
+###    --script folderize_by_column.py: the split script (default; or fileize_by_column.py)
+###    --max_readers #: most jobs reading from one filesystem at once (default 2)
+###    --max_writers #: most jobs writing to one filesystem at once (default 2)
+###      (a job writes to the filesystem of its output directory, and of its --temp_dir)
+###    --executor lsf: submit jobs with bsub (default)
+###    --executor local: run the jobs on this machine's cores instead
+###    --n_procs #: with --executor local, jobs run at once (default: all cores)
+###    --queue name: bsub -q queue
+###    --status_db status.db: job state database (default: log_directory/split_tissues.db;
+###      needs a filesystem with working locks)
+###    --poll_seconds #: how often to check for finished jobs (default 5)
+###    --fail_fast on: stop submitting jobs once one fails (default off)
+###    --timeout #: give up after this many seconds (default: wait as long as it takes)
+###    --stale_seconds #: count a running job as failed once it hasn't sent a heartbeat
+###      in this long, e.g. because LSF killed it, freeing its filesystem slots
+###      (default job_functions.STALE_SECONDS)
+###
+###  Usage:
+###    python split_tissues.py tissues.txt /project/script/ /project/log/ --max_readers 4
+
+import sys
+import os
+import multiprocessing
+from helper_functions import get_command_args
+from job_functions import make_executor, set_executor, get_executor, make_job_array_commands
+from job_functions import manifest_task_keys, mount_point, submit_with_limits, JobTracker, STALE_SECONDS
+
+print "Initiating split_tissues.py"
+print "Argument List:", str(sys.argv[1:])
+
+if (len(sys.argv) < 4):
+	raise Exception("Expected at least three command arguments.")
+tissues_FILE = str(sys.argv[1])
+script_DIR = str(sys.argv[2])
+log_DIR = str(sys.argv[3])
+options = get_command_args(sys.argv[4:])
+Script = options.get("script", "folderize_by_column.py")
+Max_readers = int(options.get("max_readers", 2))
+Max_writers = int(options.get("max_writers", 2))
+Executor = options.get("executor", "lsf")
+N_procs = int(options.get("n_procs", multiprocessing.cpu_count()))
+Queue = options.get("queue", "")
+Status_db = options.get("status_db", log_DIR+"split_tissues.db")
+Poll_seconds = float(options.get("poll_seconds", 5))
+Fail_fast = options.get("fail_fast", "off")
+Timeout = options.get("timeout", "")
+Stale_seconds = float(options.get("stale_seconds", STALE_SECONDS))
+
+if not (os.path.isfile(tissues_FILE)):
+	raise ValueError(tissues_FILE+" not found. Is it a *full* and valid file path?")
+for directory in [script_DIR, log_DIR]:
+	if not (os.path.isdir(directory)):
+		raise ValueError(directory+" not found. Is it a valid directory?")
+	if directory[-1] != "/":
+		raise ValueError(directory+" needs to end with a forward slash.")
+if Script != "folderize_by_column.py" and Script != "fileize_by_column.py":
+	raise ValueError("Expected --script to be folderize_by_column.py or fileize_by_column.py, instead got: "+Script)
+if Max_readers < 1 or Max_writers < 1:
+	raise ValueError("--max_readers and --max_writers need to be integers > 0.")
+if Poll_seconds <= 0:
+	raise ValueError("--poll_seconds needs to be > 0.")
+if Fail_fast != "on" and Fail_fast != "off":
+	raise ValueError("Expected --fail_fast to be on or off, instead got: "+Fail_fast)
+Timeout = float(Timeout) if len(Timeout) > 0 else None
+if Timeout is not None and Timeout <= 0:
+	raise ValueError("--timeout needs to be > 0.")
+if Stale_seconds <= 0:
+	raise ValueError("--stale_seconds needs to be > 0.")
+set_executor(make_executor(Executor, N_procs))
+
+# [tissue, input file, column, keep_*, output directory, options] for each file
+tissues = list()
+with open(tissues_FILE, 'rb') as f_IN:
+	line_i = 0
+	for line in f_IN:
+		line_i = line_i + 1
+		if line.strip() == "" or line[0] == "#":
+			continue
+		split_line = line.rstrip('\r\n').split('\t')
+		if len(split_line) < 5:
+			raise ValueError("Expected at least 5 tab separated columns at line "+str(line_i)
+				+" of "+tissues_FILE+", instead got: "+line.rstrip('\r\n'))
+		tissue, in_file, column, keep, out_dir = split_line[:5]
+		if not os.path.isfile(in_file):
+			raise ValueError(in_file+" (line "+str(line_i)+") not found. Is it a *full* and valid file path?")
+		if not column.isdigit():
+			raise ValueError("Expected the column at line "+str(line_i)+" to be an integer >= 0, instead got: "+column)
+		if not keep.startswith("keep_"):
+			raise ValueError("Expected keep_* at line "+str(line_i)+", instead got: "+keep)
+		if not os.path.isdir(out_dir) or out_dir[-1] != "/":
+			raise ValueError(out_dir+" (line "+str(line_i)+") needs to be an extant directory ending with a forward slash.")
+		tissues.append([tissue, in_file, column, keep, out_dir, " ".join(split_line[5:]).strip()])
+if len(tissues) == 0:
+	raise ValueError("No files to split in "+tissues_FILE)
+
+print "Passed script checks."
+
+# Biggest files first, so a big file isn't the last one left running
+tissues.sort(key=lambda tissue: os.path.getsize(tissue[1]), reverse=True)
+
+tasks = list()
+task_resources = list()
+limits = dict()
+for tissue, in_file, column, keep, out_dir, extra in tissues:
+	tasks.append([script_DIR+Script, " ".join([in_file, column, out_dir, keep, extra]).strip()])
+	resources = ["read:"+mount_point(in_file), "write:"+mount_point(out_dir)]
+	temp_dir = get_command_args(extra.split()).get("temp_dir", "")
+	if len(temp_dir) > 0 and "write:"+mount_point(temp_dir) not in resources:
+		resources.append("write:"+mount_point(temp_dir))
+	for resource in resources:
+		limits[resource] = Max_readers if resource.startswith("read:") else Max_writers
+	task_resources.append(resources)
+
+manifest_file = log_DIR+"split_tissues.manifest"
+commands = make_job_array_commands(Tasks = tasks,
+			Manifest_file = manifest_file,
+			ScriptDir = script_DIR,
+			Tasks_per_element = 1,
+			Job_name = "split_tissues",
+			ErrOutDir = log_DIR,
+			Queue = Queue,
+			Use_arrays = False,
+			Status_db = Status_db)
+task_keys = manifest_task_keys(manifest_file, len(tasks))
+for task_i in range(len(tissues)):
+	print tissues[task_i][0]+": "+log_DIR+"split_tissues."+str(task_i+1)+".out " \
+		+str(task_resources[task_i])
+
+exit_codes = submit_with_limits(Commands = [command[0] for command in commands],
+			Task_keys = task_keys,
+			Task_resources = task_resources,
+			Limits = limits,
+			Tracker = JobTracker(Status_db),
+			Poll_seconds = Poll_seconds,
+			Fail_fast = Fail_fast == "on",
+			Timeout = Timeout,
+			Stale_seconds = Stale_seconds)
+# Close the local process pool (no-op with LSF)
+get_executor().wait()
+
+# Lost jobs have no exit code (None)
+failed = [tissues[task_i][0] for task_i in range(len(tissues)) if exit_codes[task_keys[task_i]] != 0]
+if len(failed) > 0:
+	raise StandardError(str(len(failed))+" of "+str(len(tissues))+" split(s) failed: "+str(failed))
+print "Split "+str(len(tissues))+" file(s)."
+print "Completed split_tissues.py"
@@ -0,0 +1,128 @@
+#/usr/bin/python
+
+# test_coloc_abf.py
+# 2026_10_18
+
+### Tests for coloc_abf.py.
+###
+###  Usage:
+###    python -m unittest test_coloc_abf
+
+import math
+import unittest
+import numpy
+from coloc_abf import two_sided_z, coloc_abf_batch, labf_from_estimates, labf_from_pvalues, sdY_estimate
+from coloc_abf import logsum, combine_abf, credible_sets, pad_rows, P1, P2, P12
+
+# R: qnorm(p/2, lower.tail=FALSE) (two_sided_z is good to about 1e-9 relative)
+QNORM_REFERENCE = [[1.0, 0.0],
+	[0.5, 0.6744897501960817],
+	[0.05, 1.959963984540054],
+	[0.01, 2.575829303548901],
+	[1e-4, 3.890591886413120],
+	[1e-8, 5.730728869267078],
+	[1e-20, 9.336044849234058],
+	[1e-100, 21.30594006935153],
+	[1e-300, 37.06578788077212]]
+
+
+class TwoSidedZTest(unittest.TestCase):
+	def test_reference_values(self):
+		pvalues = [reference[0] for reference in QNORM_REFERENCE]
+		expected = [reference[1] for reference in QNORM_REFERENCE]
+		numpy.testing.assert_allclose(two_sided_z(pvalues), expected, rtol=1e-9, atol=1e-12)
+
+	def test_zero_pvalue(self):
+		z = two_sided_z([0.0, 1e-320])
+		self.assertTrue(numpy.all(numpy.isfinite(z)))
+		# The smallest normal double's upper tail quantile
+		numpy.testing.assert_allclose(z, [37.5193793471445, 37.5193793471445], rtol=1e-9)
+
+	def test_zero_pvalue_posteriors(self):
+		pair = {"MAF": numpy.array([0.1, 0.3, 0.45]),
+			"N_eQTL": numpy.array([500.0, 500.0, 500.0]),
+			"N_GWAS": numpy.array([1e5, 1e5, 1e5]),
+			"PV_eQTL": numpy.array([1e-30, 0.2, 0.6]),
+			"PV_GWAS": numpy.array([0.0, 0.3, 0.9])}
+		pp = coloc_abf_batch([pair])[0]["pp"]
+		self.assertTrue(numpy.all(numpy.isfinite(pp)))
+		self.assertAlmostEqual(pp.sum(), 1.0)
+		# Both traits' signal is at the first SNP
+		self.assertGreater(pp[4], 0.99)
+
+
+def naive_posteriors(lABF1, lABF2, P1=P1, P2=P2, P12=P12):
+	""" Return the posteriors of H0-H4 and each SNP's posterior given H4, as coloc.abf
+		defines them, one SNP at a time (only for log ABFs small enough to exponentiate).
+	"""
+	abf1 = [math.exp(labf) for labf in lABF1]
+	abf2 = [math.exp(labf) for labf in lABF2]
+	shared = [abf1[i]*abf2[i] for i in range(len(abf1))]
+	h = [1.0, P1*sum(abf1), P2*sum(abf2), P1*P2*(sum(abf1)*sum(abf2) - sum(shared)), P12*sum(shared)]
+	return [[value/sum(h) for value in h], [value/sum(shared) for value in shared]]
+
+
+class AbfTest(unittest.TestCase):
+	def setUp(self):
+		random = numpy.random.RandomState(7)
+		self.maf = random.uniform(0.01, 0.5, 40)
+		self.n = 1000.0
+		self.varbeta = 1.0/(2.0*self.n*self.maf*(1.0 - self.maf))
+		self.beta = random.normal(0.0, 0.05, 40)
+
+	def test_labf_from_estimates(self):
+		labf = labf_from_estimates(self.beta, self.varbeta, 0.15)
+		for i in range(len(labf)):
+			r = 0.15**2/(0.15**2 + self.varbeta[i])
+			expected = 0.5*math.log(1.0 - r) + 0.5*r*self.beta[i]**2/self.varbeta[i]
+			self.assertAlmostEqual(labf[i], expected, places=10)
+
+	def test_labf_from_pvalues(self):
+		# The same z scores as effect estimates with sdY 1
+		pvalues = numpy.array([1.0, 0.5, 0.05, 1e-4, 1e-20])
+		maf = self.maf[:5]
+		varbeta = self.varbeta[:5]
+		beta = two_sided_z(pvalues)*numpy.sqrt(varbeta)
+		numpy.testing.assert_allclose(labf_from_pvalues(pvalues, maf, self.n, 0.15),
+			labf_from_estimates(beta, varbeta, 0.15), rtol=1e-12, atol=1e-12)
+
+	def test_sdY_estimate(self):
+		mask = numpy.ones((1, 40), dtype=bool)
+		sdY = sdY_estimate((4.0*self.varbeta)[numpy.newaxis], self.maf[numpy.newaxis], self.n, mask)
+		numpy.testing.assert_allclose(sdY, [2.0])
+
+	def test_logsum(self):
+		x = numpy.array([[1.0, 2.0, 3.0], [1000.0, 1000.0, -numpy.inf], [5.0, 6.0, 7.0]])
+		mask = numpy.array([[True, True, True], [True, True, True], [False, False, False]])
+		expected = [math.log(math.exp(1.0) + math.exp(2.0) + math.exp(3.0)), 1000.0 + math.log(2.0), -numpy.inf]
+		numpy.testing.assert_allclose(logsum(x, mask), expected)
+		mask[0, 2] = False
+		self.assertAlmostEqual(logsum(x, mask)[0], math.log(math.exp(1.0) + math.exp(2.0)))
+
+	def test_combine_abf(self):
+		random = numpy.random.RandomState(11)
+		rows1 = [random.normal(1.0, 3.0, n_snps) for n_snps in [1, 7, 40]]
+		rows2 = [random.normal(0.0, 4.0, n_snps) for n_snps in [1, 7, 40]]
+		lABF1, mask = pad_rows(rows1)
+		lABF2 = pad_rows(rows2)[0]
+		pp, snp_pp_h4 = combine_abf(lABF1, lABF2, mask)
+		for row_i in range(len(rows1)):
+			expected_pp, expected_snp_pp_h4 = naive_posteriors(list(rows1[row_i]), list(rows2[row_i]))
+			numpy.testing.assert_allclose(pp[row_i], expected_pp, rtol=1e-9, atol=1e-15)
+			numpy.testing.assert_allclose(snp_pp_h4[row_i, :len(rows1[row_i])], expected_snp_pp_h4, rtol=1e-9)
+			self.assertTrue(numpy.all(snp_pp_h4[row_i, len(rows1[row_i]):] == 0.0))
+
+	def test_credible_sets(self):
+		labf = numpy.log(numpy.array([[0.5, 3.0, 1.0, 0.5, 5.0, numpy.nan]]))
+		mask = numpy.array([[True, True, True, True, True, False]])
+		# Posteriors 0.05, 0.3, 0.1, 0.05, 0.5
+		probability, snps = credible_sets(labf, mask, 0.75)[0]
+		self.assertEqual(list(snps), [4, 1])
+		self.assertAlmostEqual(probability, 0.8)
+		probability, snps = credible_sets(labf, mask, 0.92)[0]
+		self.assertEqual(list(snps), [4, 1, 2, 0])
+		self.assertAlmostEqual(probability, 0.95)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,115 @@
+#/usr/bin/python
+
+# test_helper_functions.py
+# 2026_10_18
+
+### Tests for the bgzip (BGZF) reading and writing in helper_functions.py.
+###
+###  Usage:
+###    python -m unittest test_helper_functions
+
+import os
+import gzip
+import struct
+import shutil
+import tempfile
+import unittest
+from helper_functions import BgzfWriter, BgzfReader, write_bgzf_index, get_bgzf_blocks, read_bgzf_lines
+from helper_functions import is_bgzf, is_gzipped, open_input, BGZF_EOF, BGZF_BLOCK_SIZE
+
+
+def make_lines(N_lines):
+	""" Return a header and N_lines rows of different lengths, so rows straddle BGZF blocks.
+	"""
+	lines = ["gene\trsid\tpos\tbeta\n"]
+	for i in range(N_lines):
+		lines.append("ENSG"+str(i % 97)+"\trs"+str(i)+"\t"+str(i*7919)+"\t"+str(i % 13)*(1 + i % 17)+"\n")
+	return lines
+
+
+class BgzfTest(unittest.TestCase):
+	def setUp(self):
+		self.work_dir = tempfile.mkdtemp(prefix="test_bgzf_")
+		self.lines = make_lines(30000)
+		self.data = "".join(self.lines)
+		self.bgzip_file = os.path.join(self.work_dir, "rows.txt.gz")
+		writer = BgzfWriter(self.bgzip_file)
+		# Writes of uneven sizes, that don't line up with blocks
+		for i in range(0, len(self.data), 10007):
+			writer.write(self.data[i:i+10007])
+		writer.close()
+
+	def tearDown(self):
+		shutil.rmtree(self.work_dir)
+
+	def test_readable_as_gzip(self):
+		self.assertTrue(is_gzipped(self.bgzip_file))
+		self.assertTrue(is_bgzf(self.bgzip_file))
+		self.assertGreater(len(get_bgzf_blocks(self.bgzip_file)), 4)
+		with open(self.bgzip_file, 'rb') as f_IN:
+			self.assertTrue(f_IN.read().endswith(BGZF_EOF))
+		f_IN = gzip.open(self.bgzip_file, 'rb')
+		self.assertTrue(f_IN.read() == self.data)
+		f_IN.close()
+
+	def test_reader(self):
+		for batch_blocks in [1, 2, 64]:
+			reader = BgzfReader(self.bgzip_file, N_procs=3, Batch_blocks=batch_blocks)
+			self.assertEqual(reader.readline(), self.lines[0])
+			self.assertTrue(list(reader) == self.lines[1:])
+			self.assertEqual(reader.readline(), "")
+			reader.close()
+		for n_procs in [1, 2]:
+			f_IN = open_input(self.bgzip_file, n_procs)
+			self.assertTrue(list(f_IN) == self.lines)
+			f_IN.close()
+
+	def test_reader_without_last_newline(self):
+		bgzip_file = os.path.join(self.work_dir, "no_newline.txt.gz")
+		writer = BgzfWriter(bgzip_file)
+		writer.write(self.data[:-1])
+		writer.close()
+		reader = BgzfReader(bgzip_file, N_procs=2)
+		self.assertTrue(list(reader) == self.lines[:-1] + [self.lines[-1][:-1]])
+		reader.close()
+
+	def test_block_ranges(self):
+		blocks = get_bgzf_blocks(self.bgzip_file)
+		ends = blocks[1:] + [os.path.getsize(self.bgzip_file)]
+		# Ranges of one block, two blocks, and the whole file
+		for step in [1, 2, len(blocks)]:
+			lines = list()
+			for i in range(0, len(blocks), step):
+				lines.extend(read_bgzf_lines(self.bgzip_file, blocks[i], ends[min(i+step, len(blocks))-1]))
+			# The header isn't read
+			self.assertTrue(lines == self.lines[1:], "ranges of "+str(step)+" block(s)")
+
+	def test_index(self):
+		blocks = get_bgzf_blocks(self.bgzip_file)
+		index_file = write_bgzf_index(self.bgzip_file)
+		self.assertEqual(index_file, self.bgzip_file+".gzi")
+		with open(index_file, 'rb') as f_IN:
+			n_entries = struct.unpack("<Q", f_IN.read(8))[0]
+			entries = [struct.unpack("<QQ", f_IN.read(16)) for i in range(n_entries)]
+			self.assertEqual(f_IN.read(), "")
+		# An entry for every block but the first, with the uncompressed bytes before it
+		self.assertEqual([entry[0] for entry in entries], blocks[1:])
+		self.assertEqual([entry[1] for entry in entries],
+			[min(i*BGZF_BLOCK_SIZE, len(self.data)) for i in range(1, len(blocks))])
+
+	def test_append(self):
+		bgzip_file = os.path.join(self.work_dir, "appended.txt.gz")
+		half = len(self.data)/2
+		for data, mode in [[self.data[:half], "wb"], [self.data[half:], "ab"]]:
+			writer = BgzfWriter(bgzip_file, mode)
+			writer.write(data)
+			writer.close()
+		with open(bgzip_file, 'rb') as f_IN:
+			self.assertEqual(f_IN.read().count(BGZF_EOF), 1)
+		f_IN = open_input(bgzip_file, 2)
+		self.assertTrue(list(f_IN) == self.lines)
+		f_IN.close()
+
+
+if __name__ == "__main__":
+	unittest.main()
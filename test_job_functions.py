@@ -0,0 +1,91 @@
+#/usr/bin/python
+
+# test_job_functions.py
+# 2026_10_18
+
+### Tests for job_functions.JobTracker, on a temporary database.
+###
+###  Usage:
+###    python -m unittest test_job_functions
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from job_functions import JobTracker
+
+
+class JobTrackerTest(unittest.TestCase):
+	def setUp(self):
+		self.work_dir = tempfile.mkdtemp(prefix="test_jobs_")
+		self.tracker = JobTracker(os.path.join(self.work_dir, "status.db"))
+
+	def tearDown(self):
+		shutil.rmtree(self.work_dir)
+
+	def test_states(self):
+		# More tasks than are looked up per query
+		tasks = ["task_"+str(i) for i in range(2*JobTracker.QUERY_CHUNK + 7)]
+		self.tracker.add(tasks[:-3])
+		self.tracker.start(tasks[0])
+		self.tracker.finish(tasks[1], 0)
+		self.tracker.finish(tasks[2], 3)
+		states = self.tracker.states(tasks)
+		self.assertEqual(sorted(states.keys()), sorted(tasks))
+		self.assertEqual([states[task][:2] for task in tasks[:4]],
+			[["running", None], ["done", 0], ["failed", 3], ["submitted", None]])
+		self.assertEqual([states[task] for task in tasks[-3:]], [None, None, None])
+
+	def test_mark_lost(self):
+		self.tracker.add(["quiet", "alive", "finished", "waiting"])
+		self.tracker.start("quiet")
+		self.tracker.start("alive")
+		self.tracker.start("finished")
+		time.sleep(0.3)
+		self.tracker.heartbeat("alive")
+		self.tracker.finish("finished", 0)
+		# Only a running task without a recent heartbeat is lost
+		self.assertEqual(self.tracker.mark_lost(["quiet", "alive", "finished", "waiting"], Stale_seconds=0.2),
+			["quiet"])
+		states = self.tracker.states(["quiet", "alive", "finished", "waiting"])
+		self.assertEqual([states[task][0] for task in ["quiet", "alive", "finished", "waiting"]],
+			["lost", "running", "done", "submitted"])
+		# A lost task's heartbeat doesn't bring it back
+		self.tracker.heartbeat("quiet")
+		self.assertEqual(self.tracker.states(["quiet"])["quiet"][0], "lost")
+
+	def test_wait_all(self):
+		self.tracker.add(["a", "b"])
+		self.tracker.finish("a", 0)
+		self.tracker.finish("b", 0)
+		self.assertEqual(self.tracker.wait_all(["a", "b"], Timeout=5, Poll_seconds=0.05), {"a": 0, "b": 0})
+		self.tracker.finish("b", 1)
+		with self.assertRaises(StandardError):
+			self.tracker.wait_all(["a", "b"], Timeout=5, Poll_seconds=0.05)
+		self.assertEqual(self.tracker.wait_all(["a", "b"], Timeout=5, Fail_fast=False, Poll_seconds=0.05),
+			{"a": 0, "b": 1})
+
+	def test_wait_all_lost(self):
+		# A task that stops sending heartbeats (e.g. its job was killed) doesn't hang the wait
+		self.tracker.add(["done", "killed"])
+		self.tracker.finish("done", 0)
+		self.tracker.start("killed")
+		started = time.time()
+		self.assertEqual(self.tracker.wait_all(["done", "killed"], Timeout=30, Fail_fast=False,
+			Poll_seconds=0.05, Stale_seconds=0.2), {"done": 0, "killed": None})
+		self.assertLess(time.time() - started, 5)
+		with self.assertRaises(StandardError):
+			self.tracker.wait_all(["done", "killed"], Timeout=30, Poll_seconds=0.05, Stale_seconds=0.2)
+
+	def test_wait_all_timeout(self):
+		self.tracker.add(["never_started"])
+		started = time.time()
+		with self.assertRaises(StandardError) as raised:
+			self.tracker.wait_all(["never_started"], Timeout=0.2, Poll_seconds=0.05)
+		self.assertTrue("1 never started" in str(raised.exception))
+		self.assertLess(time.time() - started, 5)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,196 @@
+#/usr/bin/python
+
+# test_join_functions.py
+# 2026_10_18
+
+### Tests for join_functions.py: joins a synthetic eQTL split to a GWAS table
+###  and compares every pair with a naive join of the unsplit tables.
+###
+###  Usage:
+###    python -m unittest test_join_functions
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+import subprocess
+from benchmark_functions import write_synthetic_eqtls, EQTL_COLUMNS, GWAS_COLUMNS
+from join_functions import join_gene_trait, parse_value_columns, row_values, JoinBatch
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Values carried from the split's rows and the GWAS rows (see parse_value_columns)
+EQTL_VALUES = "beta_eQTL:8,varbeta_eQTL:9^2,N_eQTL=500"
+GWAS_VALUES = "beta_GWAS:8,varbeta_GWAS:9^2,MAF:6,N_GWAS=1e5"
+
+
+def run_script(Args):
+	""" Run one of the repo's scripts, hiding what it prints.
+	"""
+	with open(os.devnull, 'wb') as devnull:
+		subprocess.check_call([sys.executable] + Args, cwd=REPO_DIR, stdout=devnull)
+
+def naive_join(Eqtl_file, Gwas_file):
+	""" Join the eQTL and GWAS tables one pair of rows at a time.
+
+		Returns: dictionary of gene -> sorted list of ("chr:pos", eQTL values..., GWAS values...)
+	"""
+	def read_rows(File):
+		with open(File, 'rb') as f_IN:
+			f_IN.readline()
+			return [line.rstrip("\n").split("\t") for line in f_IN]
+	def number(Value):
+		return None if Value == "NA" else float(Value)
+	def square(Value):
+		return float(Value)*float(Value)
+	joined = dict()
+	gwas_rows = read_rows(Gwas_file)
+	for eqtl_row in read_rows(Eqtl_file):
+		rows = joined.setdefault(eqtl_row[0], list())
+		if number(eqtl_row[8]) is None or number(eqtl_row[9]) is None:
+			continue
+		for gwas_row in gwas_rows:
+			gwas_chr = gwas_row[0][3:] if gwas_row[0].startswith("chr") else gwas_row[0]
+			if gwas_chr != eqtl_row[2] or int(gwas_row[1]) != int(eqtl_row[3]):
+				continue
+			if number(gwas_row[8]) is None or number(gwas_row[9]) is None or number(gwas_row[6]) is None:
+				continue
+			rows.append((eqtl_row[2]+":"+eqtl_row[3],
+				float(eqtl_row[8]), square(eqtl_row[9]), 500.0,
+				float(gwas_row[8]), square(gwas_row[9]), float(gwas_row[6]), 1e5))
+	return dict([[gene, sorted(rows)] for gene, rows in joined.items()])
+
+
+class JoinTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.work_dir = tempfile.mkdtemp(prefix="test_join_")
+		cls.eqtl_file = os.path.join(cls.work_dir, "eqtls.txt")
+		cls.gwas_file = os.path.join(cls.work_dir, "gwas.txt")
+		write_synthetic_eqtls(Out_file = cls.eqtl_file,
+					N_genes = 30,
+					Snps_per_gene = 50,
+					Order = "interleaved",
+					Seed = 3)
+		# GWAS rows at about half the eQTL variants, some twice, some with "chr" in front or a
+		#  missing value, and some just next to a variant; and a few missing eQTL values
+		choose = random.Random(5)
+		with open(cls.eqtl_file, 'rb') as f_IN:
+			f_IN.readline()
+			eqtl_rows = [line.rstrip("\n").split("\t") for line in f_IN]
+		gwas_rows = list()
+		for eqtl_row in eqtl_rows:
+			if choose.random() < 0.1:
+				eqtl_row[9] = "NA"
+			for copy_i in range(choose.choice([0, 0, 1, 1, 1, 2])):
+				chrom = ("chr" if choose.random() < 0.3 else "")+eqtl_row[2]
+				pos = int(eqtl_row[3]) + (1 if choose.random() < 0.1 else 0)
+				gwas_row = [chrom, str(pos), chrom+":"+str(pos), eqtl_row[1], eqtl_row[4], eqtl_row[5],
+					"%.4f" % choose.uniform(0.01, 0.5), "100000", "%.5f" % choose.gauss(0.0, 0.05),
+					"%.5f" % choose.uniform(0.005, 0.02), "%.4g" % choose.random()]
+				if choose.random() < 0.05:
+					gwas_row[8] = "NA"
+				gwas_rows.append(gwas_row)
+		choose.shuffle(gwas_rows)
+		with open(cls.eqtl_file, 'wb') as f_OUT:
+			f_OUT.write("\t".join(EQTL_COLUMNS)+"\n")
+			f_OUT.write("".join(["\t".join(row)+"\n" for row in eqtl_rows]))
+		with open(cls.gwas_file, 'wb') as f_OUT:
+			f_OUT.write("\t".join(GWAS_COLUMNS)+"\n")
+			f_OUT.write("".join(["\t".join(row)+"\n" for row in gwas_rows]))
+		cls.split_dir = os.path.join(cls.work_dir, "split")+"/"
+		os.mkdir(cls.split_dir)
+		run_script(["fileize_by_column.py", cls.eqtl_file, "0", cls.split_dir, "keep_all",
+			"--interval_cols", "2,3", "--metrics", "off"])
+		cls.expected = naive_join(cls.eqtl_file, cls.gwas_file)
+
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(cls.work_dir)
+
+	def join(self, Gwas_file, Out_name, **Options):
+		""" Join the split to Gwas_file.
+
+			Returns: [counts join_gene_trait returned, dictionary of gene -> sorted list of joined rows]
+		"""
+		out_prefix = os.path.join(self.work_dir, Out_name)
+		counts = join_gene_trait(Gwas_file = Gwas_file,
+					Gwas_chr_col = 0,
+					Gwas_pos_col = 1,
+					Gwas_values = parse_value_columns(GWAS_VALUES),
+					Split_dir = self.split_dir,
+					Groups = None,
+					Eqtl_chr_col = 2,
+					Eqtl_pos_col = 3,
+					Eqtl_values = parse_value_columns(EQTL_VALUES),
+					Out_prefix = out_prefix,
+					Trait = "LDL",
+					Temp_dir = self.work_dir,
+					**Options)
+		batch = JoinBatch(out_prefix)
+		joined = dict()
+		for pair in batch.pairs():
+			self.assertEqual(pair[1], "LDL")
+			table = batch.table(pair)
+			columns = [table["chr_pos"]] + [table[name].tolist() for name in batch.columns]
+			joined[pair[0]] = sorted(zip(*columns))
+		batch.close()
+		return [counts, joined]
+
+	def assertJoined(self, Counts, Joined):
+		self.assertEqual(sorted(Joined.keys()), sorted(self.expected.keys()))
+		for gene in self.expected:
+			self.assertEqual(Joined[gene], self.expected[gene], gene)
+		n_rows = sum([len(rows) for rows in self.expected.values()])
+		self.assertGreater(n_rows, 500)
+		self.assertEqual(Counts["rows_joined"], n_rows)
+		self.assertEqual(Counts["pairs"], 30)
+
+	def test_join_matches_naive(self):
+		for bin_bp, window in [[1000000, 1000000], [1000000, 0], [50000, 0]]:
+			counts, joined = self.join(self.gwas_file, "LDL_"+str(bin_bp)+"_"+str(window),
+				Bin_bp = bin_bp, Window = window)
+			self.assertJoined(counts, joined)
+
+	def test_binned_gwas(self):
+		bin_dir = os.path.join(self.work_dir, "gwas_bins")+"/"
+		os.mkdir(bin_dir)
+		run_script(["bin_by_position.py", self.gwas_file, "0,1", bin_dir, "keep_all", "--bin_bp", "200000",
+			"--metrics", "off"])
+		counts, joined = self.join(bin_dir, "LDL_binned", Window = 0)
+		self.assertJoined(counts, joined)
+
+	def test_rebinning_removes_old_bins(self):
+		bin_dir = os.path.join(self.work_dir, "gwas_rebinned")+"/"
+		os.mkdir(bin_dir)
+		run_script(["bin_by_position.py", self.gwas_file, "0,1", bin_dir, "keep_all", "--bin_bp", "200000",
+			"--layout", "store", "--store_file_mb", "1", "--metrics", "off"])
+		self.assertTrue(os.path.isfile(bin_dir+"store.idx"))
+		run_script(["bin_by_position.py", self.gwas_file, "0,1", bin_dir, "keep_all", "--bin_bp", "500000",
+			"--layout", "files", "--format", "bgzip", "--metrics", "off"])
+		names = os.listdir(bin_dir)
+		self.assertFalse(any([name.startswith("store") for name in names]))
+		# Only the new bins (with their block indexes) and bins.idx are left
+		bins = [name[:-len(".tsv.gz")] for name in names if name.endswith(".tsv.gz")]
+		self.assertEqual(sorted(names), sorted(["bins.idx"] + [row_bin+suffix for row_bin in bins
+			for suffix in [".tsv.gz", ".tsv.gz.gzi"]]))
+		counts, joined = self.join(bin_dir, "LDL_rebinned", Window = 0)
+		self.assertJoined(counts, joined)
+
+
+class RowValuesTest(unittest.TestCase):
+	def test_row_values(self):
+		values = parse_value_columns("beta:1,varbeta:2^2,N=500")
+		self.assertEqual(row_values(["rs1", "0.5", "0.25"], values), [0.5, 0.0625, 500.0])
+		for missing in ["NA", "", "NaN"]:
+			self.assertEqual(row_values(["rs1", "0.5", missing], values), None)
+
+	def test_wrong_column(self):
+		values = parse_value_columns("beta:0")
+		with self.assertRaises(ValueError):
+			row_values(["rs1", "0.5"], values)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,349 @@
+#/usr/bin/python
+
+# test_split_functions.py
+# 2026_10_18
+
+### Tests for split_functions.py, on small synthetic eQTL tables
+###  (see benchmark_functions.write_synthetic_eqtls).
+###
+###  Usage:
+###    python -m unittest test_split_functions
+
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+import unittest
+import split_functions
+from cStringIO import StringIO
+from benchmark_functions import write_synthetic_eqtls
+from genomic_index import GroupExtents
+from metrics_functions import SplitMetrics
+from split_functions import split_by_column, split_settings, GroupStore, hash_groups, read_split_manifest
+from split_functions import read_split_checkpoint
+from profile_functions import profile_file
+
+# Columns of the synthetic eQTL table (see benchmark_functions.EQTL_COLUMNS)
+GENE_COL = 0
+CHR_COL = 2
+POS_COL = 3
+BETA_COL = 8
+# Written by split_by_column, but different from run to run (split.manifest has the input's mtime)
+RUN_FILES = ["split.metrics.jsonl", "split.manifest"]
+# A store's groups can be in any order in its files, so they're compared group by group
+STORE_FILES = ["store.idx", "store_"]
+
+
+def run_quietly(Function, **Arguments):
+	""" Call Function, hiding what it prints.
+	"""
+	stdout = sys.stdout
+	sys.stdout = StringIO()
+	try:
+		return Function(**Arguments)
+	finally:
+		sys.stdout = stdout
+
+class StageLog(SplitMetrics):
+	""" SplitMetrics that also keeps the names of the stages started, in order.
+	"""
+	def __init__(self, *args, **kwargs):
+		SplitMetrics.__init__(self, *args, **kwargs)
+		self.started = list()
+
+	def start_stage(self, Stage, In_file=None):
+		self.started.append(Stage)
+		SplitMetrics.start_stage(self, Stage, In_file)
+
+def read_dir(Directory):
+	""" Return a dictionary of filepath (relative to Directory) -> contents, for every file in it.
+	"""
+	contents = dict()
+	for root, dirs, files in os.walk(Directory):
+		for name in files:
+			if name in RUN_FILES or any([name.startswith(prefix) for prefix in STORE_FILES]):
+				continue
+			path = os.path.join(root, name)
+			with open(path, 'rb') as f_IN:
+				contents[os.path.relpath(path, Directory)] = f_IN.read()
+	return contents
+
+
+class SplitTestCase(unittest.TestCase):
+	""" Makes a work directory with a synthetic eQTL table, eqtls.txt, whose genes' rows are interleaved.
+	"""
+	@classmethod
+	def setUpClass(cls):
+		cls.work_dir = tempfile.mkdtemp(prefix="test_split_")
+		cls.in_file = os.path.join(cls.work_dir, "eqtls.txt")
+		write_synthetic_eqtls(Out_file = cls.in_file,
+					N_genes = 60,
+					Snps_per_gene = 40,
+					Order = "interleaved",
+					Seed = 1)
+
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(cls.work_dir)
+
+	def split(self, Mode, In_file=None, Out_dir=None, Keep="keep_all", Cols_to_keep="all", Format="csv",
+		Layout="files", Cache=False, **Options):
+		""" Split In_file (default eqtls.txt) by gene, the way fileize_by_column.py does.
+
+			Returns: [output directory, what split_by_column returned, StageLog of the split]
+		"""
+		if In_file is None:
+			In_file = self.in_file
+		if Out_dir is None:
+			Out_dir = tempfile.mkdtemp(dir=self.work_dir)+"/"
+		extents = GroupExtents(Chr_col = CHR_COL, Pos_col = POS_COL)
+		settings = split_settings(Column_index = GENE_COL,
+					Keep = Keep,
+					Format = Format,
+					Layout = Layout,
+					Interval_cols = str(CHR_COL)+","+str(POS_COL))
+		metrics = StageLog(Log_file = None, In_file = In_file, Interval_seconds = 3600)
+		result = run_quietly(split_by_column,
+					In_file = In_file,
+					Column_index = GENE_COL,
+					Cols_to_keep = Cols_to_keep,
+					Out_dir = Out_dir,
+					Group_path = lambda row_group: Out_dir+row_group+".txt",
+					Settings = settings,
+					Metrics = metrics,
+					Mode = Mode,
+					N_procs = 3,
+					Max_open = 8,
+					Format = Format,
+					Layout = Layout,
+					Extents = extents,
+					Cache = Cache,
+					**Options)
+		return [Out_dir, result, metrics]
+
+	def assertSameDir(self, Expected_dir, Dir):
+		expected = read_dir(Expected_dir)
+		found = read_dir(Dir)
+		self.assertEqual(sorted(expected.keys()), sorted(found.keys()))
+		for path in expected:
+			self.assertTrue(expected[path] == found[path], path+" differs")
+		if os.path.isfile(os.path.join(Expected_dir, "store.idx")):
+			expected_store = GroupStore(Expected_dir)
+			store = GroupStore(Dir)
+			self.assertEqual(sorted(expected_store.keys()), sorted(store.keys()))
+			for group in expected_store.keys():
+				self.assertEqual(expected_store.n_rows(group), store.n_rows(group))
+				if store.format == "bgzip":
+					# Modes can flush a group's rows into different bgzip blocks
+					self.assertTrue(expected_store.rows(group) == store.rows(group), group+" differs")
+				else:
+					self.assertTrue(expected_store.read_bytes(group) == store.read_bytes(group), group+" differs")
+			expected_store.close()
+			store.close()
+
+
+class SplitModeTest(SplitTestCase):
+	def test_modes_match_sort(self):
+		expected_dir, result, metrics = self.split("sort")
+		self.assertEqual(len(result[0]), 60)
+		self.assertEqual(sum([group[1] for group in result[0]]),
+			sum(1 for line in open(self.in_file)) - 1)
+		for mode in ["hash", "memory", "parallel", "auto"]:
+			self.assertSameDir(expected_dir, self.split(mode)[0])
+		# --mode sort leaves the sorted copy next to the input
+		sorted_file = os.path.join(self.work_dir, "eqtls_sorted.txt")
+		self.assertSameDir(expected_dir, self.split("presorted", In_file=sorted_file)[0])
+
+	def test_store_layout(self):
+		for output_format in ["csv", "bgzip"]:
+			expected_dir = self.split("sort", Format=output_format, Layout="store")[0]
+			store = GroupStore(expected_dir)
+			self.assertEqual(len(store), 60)
+			store.close()
+			for mode in ["hash", "memory", "parallel"]:
+				self.assertSameDir(expected_dir, self.split(mode, Format=output_format, Layout="store")[0])
+
+	def test_kept_columns(self):
+		expected_dir = self.split("sort", Keep="keep_0_3_8", Cols_to_keep=[0, 3, 8])[0]
+		for mode in ["hash", "memory", "parallel"]:
+			self.assertSameDir(expected_dir, self.split(mode, Keep="keep_0_3_8", Cols_to_keep=[0, 3, 8])[0])
+		with open(os.path.join(expected_dir, os.listdir(expected_dir)[0])) as f_IN:
+			self.assertEqual(f_IN.readline().rstrip("\r\n"), "gene,pos,beta")
+
+	def test_bgzip_input(self):
+		bgzip_file = os.path.join(self.work_dir, "eqtls.txt.gz")
+		write_synthetic_eqtls(Out_file = bgzip_file,
+					N_genes = 60,
+					Snps_per_gene = 40,
+					Order = "interleaved",
+					Compress = "bgzip",
+					Seed = 1)
+		expected_dir = self.split("sort")[0]
+		for mode in ["hash", "parallel"]:
+			self.assertSameDir(expected_dir, self.split(mode, In_file=bgzip_file)[0])
+
+	def test_auto_with_a_stray_row(self):
+		# Grouped, but for one row at the end, past the ~2 MB a gzip file's profile reads
+		plain_file = os.path.join(self.work_dir, "almost_grouped.txt")
+		write_synthetic_eqtls(Out_file = plain_file,
+					N_genes = 700,
+					Snps_per_gene = 50,
+					Order = "grouped",
+					Seed = 2)
+		with open(plain_file, 'rb') as f_IN:
+			lines = f_IN.readlines()
+		self.assertGreater(os.path.getsize(plain_file), 32*65536)
+		gzip_file = plain_file+".gz"
+		f_OUT = gzip.open(gzip_file, 'wb')
+		f_OUT.write("".join(lines + [lines[600]]))
+		f_OUT.close()
+		profile = profile_file(File = gzip_file, Column_index = GENE_COL)
+		self.assertTrue(profile.grouped)
+		self.assertFalse(profile.exact)
+
+		expected_dir = self.split("hash", In_file=gzip_file)[0]
+		out_dir, result, metrics = self.split("auto", In_file=gzip_file)
+		self.assertNotEqual(result[1], "presorted")
+		self.assertSameDir(expected_dir, out_dir)
+
+	def test_groups_that_arent_file_names(self):
+		# Groups with a "/" in them can still be split into a store
+		slash_file = os.path.join(self.work_dir, "slash.txt")
+		with open(self.in_file, 'rb') as f_IN:
+			with open(slash_file, 'wb') as f_OUT:
+				f_OUT.write(f_IN.readline())
+				for line in f_IN:
+					f_OUT.write("a/"+line)
+		expected_dir = self.split("hash", In_file=slash_file, Layout="store")[0]
+		store = GroupStore(expected_dir)
+		self.assertTrue(all([group.startswith("a/") for group in store.keys()]))
+		store.close()
+		self.assertSameDir(expected_dir, self.split("parallel", In_file=slash_file, Layout="store")[0])
+
+
+class SplitCacheTest(SplitTestCase):
+	CHANGED_GENE = "ENSG00000000003"
+	REMOVED_GENE = "ENSG00000000007"
+
+	def write_changed_input(self, Out_file):
+		""" Write eqtls.txt to Out_file, with one of CHANGED_GENE's betas changed and REMOVED_GENE's rows left out.
+		"""
+		changed = False
+		with open(self.in_file, 'rb') as f_IN:
+			with open(Out_file, 'wb') as f_OUT:
+				f_OUT.write(f_IN.readline())
+				for line in f_IN:
+					split_line = line.rstrip("\n").split("\t")
+					if split_line[GENE_COL] == self.REMOVED_GENE:
+						continue
+					if split_line[GENE_COL] == self.CHANGED_GENE and not changed:
+						split_line[BETA_COL] = "0.123456"
+						changed = True
+					f_OUT.write("\t".join(split_line)+"\n")
+
+	def manifest_hashes(self, Out_dir):
+		""" Returns: dictionary of row_group -> [n_rows, sha1] from the manifest in Out_dir
+		"""
+		groups = read_split_manifest(os.path.join(Out_dir, "split.manifest"))[2]
+		return dict([[row_group, [group[1], group[2]]] for row_group, group in groups.items()])
+
+	def test_manifest_hashes(self):
+		expected = dict(hash_groups(In_file = self.in_file, Column_index = GENE_COL, Cols_to_keep = "all"))
+		for mode in ["sort", "hash", "memory", "parallel"]:
+			out_dir, result, metrics = self.split(mode, Cache=True)
+			# The groups are hashed as they're written, not in another read of the input
+			self.assertFalse("cache" in metrics.started)
+			self.assertEqual(self.manifest_hashes(out_dir), expected)
+
+	def test_current_output_is_skipped(self):
+		out_dir = self.split("sort", Cache=True)[0]
+		before = read_dir(out_dir)
+		out_dir, result, metrics = self.split("sort", Out_dir=out_dir, Cache=True)
+		self.assertTrue(result[3])
+		self.assertEqual(len(result[0]), 60)
+		self.assertEqual(metrics.started, [])
+		self.assertEqual(read_dir(out_dir), before)
+
+	def test_only_changed_groups_rewritten(self):
+		in_file = os.path.join(self.work_dir, "eqtls_rewritten.txt")
+		shutil.copy(self.in_file, in_file)
+		out_dir = self.split("sort", In_file=in_file, Cache=True)[0]
+		unchanged_path = out_dir+"ENSG00000000001.txt"
+		os.utime(unchanged_path, (1000000000, 1000000000))
+
+		self.write_changed_input(in_file)
+		out_dir, result, metrics = self.split("sort", In_file=in_file, Out_dir=out_dir, Cache=True)
+		self.assertFalse(result[3])
+		# Rows keep their file order within each group, so the sort is skipped
+		self.assertEqual(result[1], "hash")
+		self.assertEqual(result[2], set([self.CHANGED_GENE]))
+		self.assertEqual(os.path.getmtime(unchanged_path), 1000000000)
+		self.assertFalse(os.path.exists(out_dir+self.REMOVED_GENE+".txt"))
+		self.assertEqual(self.manifest_hashes(out_dir),
+			dict(hash_groups(In_file = in_file, Column_index = GENE_COL, Cols_to_keep = "all")))
+		self.assertSameDir(self.split("sort", In_file=in_file)[0], out_dir)
+
+	def test_changed_settings(self):
+		out_dir = self.split("sort", Cache=True)[0]
+		changed_file = os.path.join(self.work_dir, "eqtls_changed.txt")
+		self.write_changed_input(changed_file)
+		out_dir, result, metrics = self.split("hash", In_file=changed_file, Out_dir=out_dir, Cache=True,
+			Keep="keep_0_3_8", Cols_to_keep=[0, 3, 8])
+		# Every group is split again, and the groups no longer in the input are removed
+		self.assertEqual(result[2], None)
+		self.assertFalse("cache" in metrics.started)
+		self.assertFalse(os.path.exists(out_dir+self.REMOVED_GENE+".txt"))
+		self.assertSameDir(self.split("sort", In_file=changed_file, Keep="keep_0_3_8", Cols_to_keep=[0, 3, 8])[0],
+			out_dir)
+
+class Interrupted(Exception):
+	pass
+
+class SplitResumeTest(SplitTestCase):
+	def interrupted_split(self, After_checkpoints, **Options):
+		""" Start a --mode sort split, and stop it once split.checkpoint has been written After_checkpoints times.
+
+			Returns: the output directory
+		"""
+		write_split_checkpoint = split_functions.write_split_checkpoint
+		n_written = [0]
+		def write_and_stop(*args, **kwargs):
+			write_split_checkpoint(*args, **kwargs)
+			n_written[0] = n_written[0] + 1
+			if n_written[0] == After_checkpoints:
+				raise Interrupted()
+		out_dir = tempfile.mkdtemp(dir=self.work_dir)+"/"
+		split_functions.write_split_checkpoint = write_and_stop
+		try:
+			with self.assertRaises(Interrupted):
+				self.split("sort", Out_dir=out_dir, Checkpoint_seconds=1e-9, **Options)
+		finally:
+			split_functions.write_split_checkpoint = write_split_checkpoint
+		return out_dir
+
+	def test_resume(self):
+		for cache in [False, True]:
+			out_dir = self.interrupted_split(5, Cache=cache)
+			finished = read_split_checkpoint(out_dir+"split.checkpoint")[4]
+			self.assertEqual(len(finished), 4)
+			out_dir, result, metrics = self.split("sort", Out_dir=out_dir, Cache=cache, Resume=True)
+			self.assertFalse("sort" in metrics.started)
+			self.assertEqual(len(result[0]), 60)
+			self.assertFalse(os.path.exists(out_dir+"split.checkpoint"))
+			self.assertSameDir(self.split("sort")[0], out_dir)
+			if cache:
+				groups = read_split_manifest(out_dir+"split.manifest")[2]
+				self.assertEqual(dict([[row_group, [group[1], group[2]]] for row_group, group in groups.items()]),
+					dict(hash_groups(In_file = self.in_file, Column_index = GENE_COL, Cols_to_keep = "all")))
+
+	def test_checkpoint_for_other_settings(self):
+		out_dir = self.interrupted_split(5)
+		out_dir, result, metrics = self.split("sort", Out_dir=out_dir, Resume=True,
+			Keep="keep_0_3_8", Cols_to_keep=[0, 3, 8])
+		self.assertTrue("sort" in metrics.started)
+		self.assertSameDir(self.split("sort", Keep="keep_0_3_8", Cols_to_keep=[0, 3, 8])[0], out_dir)
+
+
+if __name__ == "__main__":
+	unittest.main()